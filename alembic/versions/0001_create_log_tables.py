@@ -0,0 +1,101 @@
+"""create log tables
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 00:00:00
+
+Existing databases were created by Base.metadata.create_all at startup, so
+tables are only created when missing; run `alembic upgrade head` on either.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def common_columns():
+    return [
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("username", sa.String(100), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "larvae_logs" not in existing:
+        op.create_table(
+            "larvae_logs",
+            *common_columns(),
+            sa.Column("days_of_age", sa.Integer, nullable=False),
+            sa.Column("larva_weight", sa.Integer, nullable=False),
+            sa.Column("larva_pct", sa.Integer, nullable=False),
+            sa.Column("lb_larvae", sa.Integer, nullable=False),
+            sa.Column("lb_feed", sa.Float, nullable=False),
+            sa.Column("lb_water", sa.Float, nullable=False),
+            sa.Column("screen_refeed", sa.Boolean),
+            sa.Column("row_number", sa.String(50)),
+            sa.Column("notes", sa.Text),
+            sa.Column("larvae_count", sa.Integer),
+            sa.Column("feed_per_larvae", sa.Float),
+            sa.Column("water_feed_ratio", sa.Float),
+            sa.Column("post_feed_condition", sa.String(50)),
+        )
+
+    if "container_logs_prepupae" not in existing:
+        op.create_table(
+            "container_logs_prepupae",
+            *common_columns(),
+            sa.Column("temperature", sa.DECIMAL(5, 2)),
+            sa.Column("humidity", sa.DECIMAL(5, 2)),
+            sa.Column("prepupae_tubs_added", sa.Integer),
+            sa.Column("egg_nests_replaced", sa.Integer),
+            sa.Column("notes", sa.Text),
+        )
+
+    if "container_logs_neonates" not in existing:
+        op.create_table(
+            "container_logs_neonates",
+            *common_columns(),
+            sa.Column("temperature", sa.DECIMAL(5, 2)),
+            sa.Column("humidity", sa.DECIMAL(5, 2)),
+            sa.Column("bait_tubs_replaced", sa.Integer),
+            sa.Column("shelf_tubs_removed", sa.Integer),
+            sa.Column("egg_nests_replaced", sa.Integer),
+            sa.Column("notes", sa.Text),
+        )
+
+    if "microwave_logs" not in existing:
+        op.create_table(
+            "microwave_logs",
+            *common_columns(),
+            sa.Column("microwave_power_gen1", sa.DECIMAL(5, 2)),
+            sa.Column("microwave_power_gen2", sa.DECIMAL(5, 2)),
+            sa.Column("fan_speed_cavity1", sa.DECIMAL(5, 2)),
+            sa.Column("fan_speed_cavity2", sa.DECIMAL(5, 2)),
+            sa.Column("belt_speed", sa.DECIMAL(5, 2)),
+            sa.Column("lb_larvae_per_tub", sa.DECIMAL(6, 2)),
+            sa.Column("num_ramp_up_tubs", sa.Integer),
+            sa.Column("num_ramp_down_tubs", sa.Integer),
+            sa.Column("tubs_live_larvae", sa.Integer),
+            sa.Column("lb_dried_larvae", sa.DECIMAL(6, 2)),
+            sa.Column("yield_percentage", sa.DECIMAL(5, 2)),
+            sa.Column("notes", sa.Text),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ["microwave_logs", "container_logs_neonates",
+                  "container_logs_prepupae", "larvae_logs"]:
+        op.drop_table(table)
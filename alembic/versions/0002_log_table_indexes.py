@@ -0,0 +1,50 @@
+"""log table indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00
+
+(username, timestamp DESC, id DESC) serves the per-user list queries and
+(timestamp DESC, id DESC) the unfiltered ones, including keyset pagination.
+Indexes are built CONCURRENTLY on Postgres so live tables aren't locked.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ["larvae_logs", "container_logs_prepupae", "container_logs_neonates", "microwave_logs"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f"ix_{table}_username_timestamp", table,
+                ["username", sa.text('"timestamp" DESC'), sa.text("id DESC")],
+                if_not_exists=True, postgresql_concurrently=True,
+            )
+            op.create_index(
+                f"ix_{table}_timestamp", table,
+                [sa.text('"timestamp" DESC'), sa.text("id DESC")],
+                if_not_exists=True, postgresql_concurrently=True,
+            )
+
+        # Superseded by the indexes above (created by the old setup script)
+        op.drop_index("idx_larvae_logs_timestamp", table_name="larvae_logs", if_exists=True)
+        op.drop_index("idx_larvae_logs_username", table_name="larvae_logs", if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_timestamp", table_name=table, if_exists=True)
+        op.drop_index(f"ix_{table}_username_timestamp", table_name=table, if_exists=True)
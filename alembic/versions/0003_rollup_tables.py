@@ -0,0 +1,76 @@
+"""rollup tables
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00
+
+Hourly/daily rollups of larvae_logs and microwave_logs, maintained
+incrementally by app/rollups.py. Existing history is rolled up here on
+Postgres; elsewhere (or at any later time) run `python -m app.rollups`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def key_columns():
+    return [
+        sa.Column("bucket_size", sa.String(8), primary_key=True),
+        sa.Column("bucket", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("username", sa.String(100), primary_key=True),
+        sa.Column("row_count", sa.Integer, nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "larvae_rollups",
+        *key_columns(),
+        sa.Column("sum_lb_feed", sa.Float, nullable=False),
+        sa.Column("sum_larvae_count", sa.BigInteger, nullable=False),
+        sa.Column("sum_feed_per_larvae", sa.Float, nullable=False),
+        sa.Column("count_feed_per_larvae", sa.Integer, nullable=False),
+    )
+    op.create_table(
+        "microwave_rollups",
+        *key_columns(),
+        sa.Column("sum_yield_percentage", sa.DECIMAL(14, 2), nullable=False),
+        sa.Column("count_yield_percentage", sa.Integer, nullable=False),
+        sa.Column("sum_belt_speed", sa.DECIMAL(14, 2), nullable=False),
+        sa.Column("count_belt_speed", sa.Integer, nullable=False),
+    )
+
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for size in ["hour", "day"]:
+        op.execute(f"""
+            INSERT INTO larvae_rollups
+            SELECT '{size}', date_trunc('{size}', "timestamp" AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', username, count(*),
+                   coalesce(sum(lb_feed), 0), coalesce(sum(larvae_count), 0),
+                   coalesce(sum(feed_per_larvae), 0), count(feed_per_larvae)
+            FROM larvae_logs
+            GROUP BY 2, 3
+        """)
+        op.execute(f"""
+            INSERT INTO microwave_rollups
+            SELECT '{size}', date_trunc('{size}', "timestamp" AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', username, count(*),
+                   coalesce(sum(yield_percentage), 0), count(yield_percentage),
+                   coalesce(sum(belt_speed), 0), count(belt_speed)
+            FROM microwave_logs
+            GROUP BY 2, 3
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("microwave_rollups")
+    op.drop_table("larvae_rollups")
@@ -0,0 +1,112 @@
+"""partition log tables by month
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 00:00:00
+
+On Postgres the four log tables become range-partitioned on "timestamp",
+one partition per calendar month (UTC) plus a DEFAULT partition for
+anything outside them. Each table is rebuilt: renamed aside, recreated as
+a partitioned table, refilled and the old heap dropped, so this takes an
+exclusive lock for the length of the copy. The primary key becomes
+(id, timestamp), since Postgres requires the partition key in every
+unique constraint.
+
+Partitions are created here for every month with data up to
+MONTHS_AHEAD months out; after that app/partitions.py keeps them coming,
+from `python -m app.migrate` on each deploy and from the daily
+`python -m app.partitions` cron job (`datalog-partitions` in render.yaml).
+Workers don't touch partitions at startup. Other databases are left as
+they are.
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import context, op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ["larvae_logs", "container_logs_prepupae", "container_logs_neonates", "microwave_logs"]
+MONTHS_AHEAD = 3
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def create_indexes(table: str) -> None:
+    op.execute(f'CREATE INDEX ix_{table}_username_timestamp ON {table} (username, "timestamp" DESC, id DESC)')
+    op.execute(f'CREATE INDEX ix_{table}_timestamp ON {table} ("timestamp" DESC, id DESC)')
+
+
+def drop_indexes(table: str) -> None:
+    op.execute(f"DROP INDEX IF EXISTS ix_{table}_username_timestamp")
+    op.execute(f"DROP INDEX IF EXISTS ix_{table}_timestamp")
+
+
+def first_month(table: str) -> datetime:
+    now = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if context.is_offline_mode():
+        return now
+    oldest = op.get_bind().exec_driver_sql(f'SELECT min("timestamp") FROM {table}').scalar()
+    if oldest is None:
+        return now
+    oldest = oldest.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return min(oldest, now)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    for table in TABLES:
+        old = f"{table}_unpartitioned"
+        op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+        op.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey")
+        drop_indexes(table)
+
+        op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, "timestamp")')
+        create_indexes(table)
+
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        month = first_month(table)
+        last = add_months(datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0),
+                          MONTHS_AHEAD)
+        while month <= last:
+            op.execute(f"CREATE TABLE {table}_{month:%Y_%m} PARTITION OF {table} "
+                       f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')")
+            month = add_months(month, 1)
+
+        # The app always sets a timestamp; a row without one gets the epoch
+        # (and lands in the default partition) rather than blocking the copy
+        op.execute(f"UPDATE {old} SET \"timestamp\" = '1970-01-01T00:00:00+00:00' WHERE \"timestamp\" IS NULL")
+        op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+        op.execute(f"DROP TABLE {old}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    for table in TABLES:
+        old = f"{table}_partitioned"
+        op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+        op.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey")
+        drop_indexes(table)
+
+        op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)")
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN "timestamp" DROP NOT NULL')
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+        create_indexes(table)
+
+        op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+        op.execute(f"DROP TABLE {old}")
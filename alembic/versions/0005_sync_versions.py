@@ -0,0 +1,63 @@
+"""sync versions and tombstones
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 00:00:00
+
+Every log row gets a "version" from a single server-wide counter
+(sync_state), bumped by each write, and deletes leave a row in
+sync_tombstones, so app/sync.py can serve "everything since version N".
+Existing rows all start at version 1. The column is added with a constant
+default (no table rewrite on Postgres 11+) which is then dropped, so a
+write that forgets to stamp a version fails instead of going unseen.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ["larvae_logs", "container_logs_prepupae", "container_logs_neonates", "microwave_logs"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.add_column(table, sa.Column("version", sa.BigInteger, nullable=False, server_default="1"))
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column("version", server_default=None)
+        op.create_index(f"ix_{table}_version", table, ["version", "id"])
+
+    sync_state = op.create_table(
+        "sync_state",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("version", sa.BigInteger, nullable=False),
+    )
+    op.bulk_insert(sync_state, [{"id": 1, "version": 1}])
+
+    op.create_table(
+        "sync_tombstones",
+        sa.Column("table_name", sa.String(64), primary_key=True),
+        sa.Column("row_id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("version", sa.BigInteger, nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_sync_tombstones_version", "sync_tombstones", ["version", "row_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_sync_tombstones_version", table_name="sync_tombstones")
+    op.drop_table("sync_tombstones")
+    op.drop_table("sync_state")
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_version", table_name=table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("version")
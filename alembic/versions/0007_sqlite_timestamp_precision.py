@@ -0,0 +1,39 @@
+"""sqlite timestamp precision
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00
+
+On SQLite, log rows stamped by the CURRENT_TIMESTAMP server default hold
+"YYYY-MM-DD HH:MM:SS", while SQLAlchemy binds and stores
+"YYYY-MM-DD HH:MM:SS.ffffff". Text comparison puts the short form before
+the same instant in the long one, so keyset cursors kept returning those
+rows. The app now stamps rows itself (app/models.py utc_now); this pads the
+existing ones. Postgres stores real timestamps and is left as it is.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ["larvae_logs", "container_logs_prepupae", "container_logs_neonates", "microwave_logs"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for table in TABLES:
+        op.execute(f"UPDATE {table} SET \"timestamp\" = \"timestamp\" || '.000000' "
+                   f"WHERE length(\"timestamp\") = 19")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The padded values are the same instants; nothing to undo
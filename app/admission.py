@@ -0,0 +1,122 @@
+import math
+import time
+from collections import OrderedDict
+
+from starlette.responses import JSONResponse
+
+from app import database, metrics
+from app.database import TimedQueuePool
+
+# Admission control, so one busy client can't take the connection pool from
+# everyone else. Checked before a request reaches its handler, cheapest
+# first; a rejected request costs a dict lookup and never touches the
+# database:
+#
+#   - rate: a token bucket per client, refilled at `rate` requests a second
+#     up to `burst`. Over it is a 429 with Retry-After set to when the next
+#     token arrives. A client is its address (see client_key); nothing the
+#     client sends about itself, such as an X-Username header, picks the
+#     bucket, or it could spread its requests over as many as it liked.
+#   - pool: once `max_pool_waiting` checkouts are already waiting for a
+#     connection, new requests get a 503 straight away rather than joining
+#     the queue until DB_POOL_TIMEOUT.
+#   - expensive: at most `expensive_limit` exports, analytics and series
+#     queries run at once (an export holds its slot until it has finished
+#     streaming); the next one is a 503.
+#
+# Page sizes are capped in the list handlers themselves (LIST_MAX_LIMIT).
+# Everything is per worker. Health checks and metrics are never limited.
+
+EXEMPT_PATHS = {"/", "/health", "/api/health", "/metrics", "/api/admin/pool"}
+EXPENSIVE_PREFIXES = ("/api/export/", "/api/analytics/")
+EXPENSIVE_SUFFIXES = ("/series",)  # /api/container-logs/{kind}/series
+POOL_RETRY_AFTER = 1  # seconds
+EXPENSIVE_RETRY_AFTER = 5  # seconds
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: int, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # client -> (tokens, updated), least recently seen first; past
+        # max_clients the oldest is dropped and starts again with a full bucket
+        self.buckets = OrderedDict()
+
+    # Take a token for `client`. Returns 0 if it had one, else the seconds
+    # until it will.
+    def take(self, client: str) -> float:
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self.buckets[client] = (tokens, now)
+        if len(self.buckets) > self.max_clients:
+            self.buckets.popitem(last=False)
+        return wait
+
+
+# The client's address. Behind a proxy that's the proxy's, unless uvicorn
+# runs with --proxy-headers and --forwarded-allow-ips listing the proxy's
+# addresses (render.yaml does): then scope["client"] is the last
+# X-Forwarded-For hop the proxies added. Not '*', which makes uvicorn take
+# the first entry, and that one the client can write itself.
+def client_key(scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def is_expensive(path: str) -> bool:
+    return path.startswith(EXPENSIVE_PREFIXES) or path.endswith(EXPENSIVE_SUFFIXES)
+
+
+def _reject(status: int, detail: str, retry_after: float, reason: str) -> JSONResponse:
+    metrics.shed_total[reason] += 1
+    return JSONResponse({"detail": detail}, status_code=status,
+                        headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, rate: float = 20, burst: int = 100, max_clients: int = 10000,
+                 expensive_limit: int = 4, max_pool_waiting: int = 10):
+        self.app = app
+        self.limiter = RateLimiter(rate, burst, max_clients) if rate > 0 else None
+        self.expensive_limit = expensive_limit
+        self.max_pool_waiting = max_pool_waiting
+        self.expensive = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+
+        response = self.check(scope)
+        if response is not None:
+            return await response(scope, receive, send)
+
+        if not is_expensive(scope["path"]):
+            return await self.app(scope, receive, send)
+        if self.expensive >= self.expensive_limit:
+            response = _reject(503, "Too many exports, analytics and series queries running; try again shortly",
+                               EXPENSIVE_RETRY_AFTER, "expensive")
+            return await response(scope, receive, send)
+        self.expensive += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.expensive -= 1
+
+    def check(self, scope):
+        if self.limiter is not None:
+            wait = self.limiter.take(client_key(scope))
+            if wait:
+                return _reject(429, "Rate limit exceeded", wait, "rate")
+
+        engine = database.engine
+        if engine is not None and isinstance(engine.pool, TimedQueuePool) \
+                and engine.pool.waiting >= self.max_pool_waiting:
+            return _reject(503, "Database is busy; try again shortly", POOL_RETRY_AFTER, "pool")
+        return None
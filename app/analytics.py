@@ -0,0 +1,115 @@
+from sqlalchemy import select, func, cast, BigInteger
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional
+
+from app import rollups
+from app.models import LarvaeLog, MicrowaveLog, LarvaeRollup, MicrowaveRollup
+
+# Time-bucketed aggregates computed in SQL (GROUP BY the UTC bucket), so
+# charts get one row per bucket instead of every raw log row. When the requested range
+# lines up with rollup buckets the (much smaller) rollup tables are read
+# instead of the log tables.
+
+BUCKETS = ["hour", "day", "week"]
+
+# Per table: model, allowed group_by columns and the aggregates to compute
+LARVAE = {
+    "model": LarvaeLog,
+    "groups": {"username": LarvaeLog.username, "row_number": LarvaeLog.row_number},
+    "aggregates": {
+        "count": func.count(),
+        "avg_feed_per_larvae": func.avg(LarvaeLog.feed_per_larvae),
+        "total_lb_feed": func.sum(LarvaeLog.lb_feed),
+        "total_larvae_count": func.sum(LarvaeLog.larvae_count),
+    },
+    "rollup": LarvaeRollup,
+    "rollup_groups": ["username"],
+    "rollup_aggregates": {
+        "count": func.sum(LarvaeRollup.row_count),
+        "avg_feed_per_larvae": func.sum(LarvaeRollup.sum_feed_per_larvae)
+                               / func.nullif(func.sum(LarvaeRollup.count_feed_per_larvae), 0),
+        "total_lb_feed": func.sum(LarvaeRollup.sum_lb_feed),
+        "total_larvae_count": cast(func.sum(LarvaeRollup.sum_larvae_count), BigInteger),
+    },
+}
+
+MICROWAVE = {
+    "model": MicrowaveLog,
+    "groups": {"username": MicrowaveLog.username},
+    "aggregates": {
+        "count": func.count(),
+        "avg_yield_percentage": func.avg(MicrowaveLog.yield_percentage),
+        "avg_belt_speed": func.avg(MicrowaveLog.belt_speed),
+    },
+    "rollup": MicrowaveRollup,
+    "rollup_groups": ["username"],
+    "rollup_aggregates": {
+        "count": func.sum(MicrowaveRollup.row_count),
+        "avg_yield_percentage": func.sum(MicrowaveRollup.sum_yield_percentage)
+                                / func.nullif(func.sum(MicrowaveRollup.count_yield_percentage), 0),
+        "avg_belt_speed": func.sum(MicrowaveRollup.sum_belt_speed)
+                          / func.nullif(func.sum(MicrowaveRollup.count_belt_speed), 0),
+    },
+}
+
+
+# Finest rollup bucket size that can answer the request exactly: the range
+# ends must fall on its boundaries, and it can't be coarser than the bucket.
+def rollup_size(bucket: str, start: Optional[datetime], end: Optional[datetime]) -> Optional[str]:
+    def aligned(size):
+        for value in (start, end):
+            if value is None:
+                continue
+            utc = value.astimezone(timezone.utc) if value.tzinfo else value
+            if rollups.truncate(value, size) != utc:
+                return False
+        return True
+
+    candidates = ["hour"] if bucket == "hour" else ["day", "hour"]
+    return next((size for size in candidates if aligned(size)), None)
+
+
+def bucketed_query(spec, bucket: str, group_by: Optional[str],
+                   start: Optional[datetime], end: Optional[datetime], dialect: str):
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+    if group_by and group_by not in spec["groups"]:
+        raise ValueError(f"group_by must be one of: {', '.join(spec['groups'])}")
+
+    size = rollup_size(bucket, start, end)
+    if size and (not group_by or group_by in spec["rollup_groups"]):
+        rollup = spec["rollup"]
+        query = _bucketed(rollup.bucket, getattr(rollup, group_by) if group_by else None,
+                          spec["rollup_aggregates"], bucket, start, end, dialect)
+        return query.where(rollup.bucket_size == size)
+
+    model = spec["model"]
+    return _bucketed(model.timestamp, spec["groups"][group_by] if group_by else None,
+                     spec["aggregates"], bucket, start, end, dialect)
+
+
+def _bucketed(timestamp, group_column, aggregates, bucket, start, end, dialect):
+    keys = [rollups.utc_trunc(bucket, timestamp, dialect).label("bucket")]
+    if group_column is not None:
+        keys.append(group_column.label(group_column.key))
+
+    query = select(*keys, *[agg.label(name) for name, agg in aggregates.items()])
+    if start:
+        query = query.where(timestamp >= start)
+    if end:
+        query = query.where(timestamp < end)
+    return query.group_by(*keys).order_by(*keys)
+
+
+def serialize_bucket(row) -> dict:
+    item = {}
+    for name, value in row._mapping.items():
+        if isinstance(value, datetime):
+            if value.tzinfo is None:  # SQLite hands back naive UTC
+                value = value.replace(tzinfo=timezone.utc)
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = float(value)
+        item[name] = value
+    return item
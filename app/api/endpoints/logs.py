@@ -1,33 +0,0 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app import crud, models, schemas
-from app.database import SessionLocal, engine
-
-models.Base.metadata.create_all(bind=engine)
-
-router = APIRouter()
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@router.get("/", response_model=list[schemas.Log])
-def read_logs(db: Session = Depends(get_db)):
-    return crud.get_logs(db)
-
-@router.post("/", response_model=schemas.Log)
-def create_log(log: schemas.LogCreate, db: Session = Depends(get_db)):
-    return crud.create_log(db, log)
-
-@router.delete("/logs/{log_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_log(log_id: int, db: Session = Depends(get_db)):
-    log = db.query(Log).filter(Log.id == log_id).first()
-    if not log:
-        raise HTTPException(status_code=404, detail="Log not found")
-    
-    db.delete(log)
-    db.commit()
-    return
\ No newline at end of file
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app import compression, serializers
+from app.core.config import settings
+
+# Read-through cache for the list endpoints. A rendered page is stored under
+# (table, generation, media type, query params); every write to a table
+# bumps that table's generation, so the next poll misses and reloads while
+# other tables keep their entries. Each page carries an ETag, and a matching
+# If-None-Match gets a 304 (straight from the cache when the entry is warm).
+#
+# The default backend lives in process memory, so with several workers a
+# write only invalidates its own worker and the others catch up within the
+# TTL. Swap `backend` for anything with the same async methods to share it.
+
+# (etag, body, extra headers, compressed bodies by encoding, filled on first use)
+Entry = Tuple[str, bytes, Dict[str, str], Dict[str, bytes]]
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.generations = defaultdict(int)
+
+    async def generation(self, table: str) -> int:
+        return self.generations[table]
+
+    async def get(self, key) -> Optional[Entry]:
+        item = self.entries.get(key)
+        if item is None:
+            return None
+        expires, entry = item
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    async def set(self, key, entry: Entry):
+        if self.ttl <= 0:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, entry)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    async def invalidate(self, table: str):
+        self.generations[table] += 1
+        for key in [key for key in self.entries if key[0] == table]:
+            del self.entries[key]
+
+
+backend = MemoryBackend(
+    maxsize=int(os.getenv("LIST_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("LIST_CACHE_TTL", "30")),
+)
+
+
+def etag_for(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+# Serve a list page from the cache, or call `load()` (which returns the
+# response content and any extra headers) and cache the rendered result
+async def list_response(request: Request, model, load) -> Response:
+    table = model.__tablename__
+    media_type = serializers.negotiate(request)
+    # Read the generation before loading, so a page loaded while a write
+    # commits is stored under the old generation and never served
+    key = (table, await backend.generation(table), media_type, tuple(sorted(request.query_params.multi_items())))
+    entry = await backend.get(key)
+    if entry is None:
+        content, extra = await load()
+        body = serializers.render(content, media_type)
+        # Extra headers are part of the representation, so they go in the ETag
+        entry = (etag_for(body + repr(sorted(extra.items())).encode()), body, extra, {})
+        await backend.set(key, entry)
+
+    etag, body, extra, compressed = entry
+    headers = {**extra, "ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    encoding = compression.negotiate(request.headers.get("accept-encoding", ""))
+    if encoding and len(body) >= settings.COMPRESSION_MINIMUM_SIZE:
+        if encoding not in compressed:
+            compressed[encoding] = await compression.compress(
+                body, encoding, settings.COMPRESSION_GZIP_LEVEL, settings.COMPRESSION_BROTLI_QUALITY)
+        body = compressed[encoding]
+        # Same weak ETag and Vary as CompressionMiddleware, which passes this through
+        headers.update({"Content-Encoding": encoding, "ETag": "W/" + etag, "Vary": "Accept, Accept-Encoding"})
+    return Response(body, media_type=media_type, headers=headers)
+
+
+# Call after committing a write to the model's table
+async def invalidate(model):
+    await backend.invalidate(model.__tablename__)
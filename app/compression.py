@@ -0,0 +1,132 @@
+import zlib
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Response compression negotiated from Accept-Encoding: brotli when the
+# client takes it and the package is installed, else gzip. Bodies under
+# `minimum_size` go out as they are, since compressing a few hundred bytes
+# costs more than it saves. Streamed bodies (exports) are compressed chunk by
+# chunk and flushed after each one, so they keep streaming. Server-Sent
+# Events and responses that already have a Content-Encoding pass through.
+#
+# A compressed response's ETag is made weak: it still matches the same
+# representation for If-None-Match, but isn't claimed to be byte-identical.
+# Large bodies are compressed in a worker thread to keep the event loop free.
+# The list cache (app/cache.py) keeps compressed copies of its pages, so a
+# cache hit isn't compressed again.
+
+THREAD_THRESHOLD = 256 * 1024  # bytes
+EXCLUDED_MEDIA_TYPES = ("text/event-stream",)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self.brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self.brotli = None
+            self.gzip = zlib.compressobj(gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.brotli is not None:
+            out = self.brotli.process(data)
+            return out + (self.brotli.finish() if final else self.brotli.flush())
+        out = self.gzip.compress(data)
+        return out + self.gzip.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+# One-shot compression of a whole body
+async def compress(data: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    return await _run(_Compressor(encoding, gzip_level, brotli_quality), data, True)
+
+
+async def _run(compressor: _Compressor, data: bytes, final: bool) -> bytes:
+    if len(data) >= THREAD_THRESHOLD:
+        return await anyio.to_thread.run_sync(compressor.compress, data, final)
+    return compressor.compress(data, final)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=start["headers"])
+                passthrough = ("content-encoding" in headers
+                               or headers.get("content-type", "").startswith(EXCLUDED_MEDIA_TYPES))
+                if passthrough:
+                    await send(start)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers = MutableHeaders(raw=list(start["headers"]))
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = "W/" + etag
+                if more_body:
+                    del headers["Content-Length"]
+                body = await _run(compressor, body, not more_body)
+                if not more_body:
+                    headers["Content-Length"] = str(len(body))
+                await send({**start, "headers": headers.raw})
+                return await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+            body = await _run(compressor, body, not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
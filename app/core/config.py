@@ -4,18 +4,82 @@ import os
 class Settings(BaseSettings):
     # Render automatically provides DATABASE_URL
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
-    
+
     # Fix for SQLAlchemy (Render uses postgres:// but SQLAlchemy needs postgresql://)
     @property
     def SQLALCHEMY_DATABASE_URL(self):
         if self.DATABASE_URL.startswith("postgres://"):
             return self.DATABASE_URL.replace("postgres://", "postgresql://", 1)
         return self.DATABASE_URL
-    
+
+    # Same URL with the asyncpg driver, for the app's async engine
+    @property
+    def ASYNC_DATABASE_URL(self):
+        url = self.SQLALCHEMY_DATABASE_URL
+        if url.startswith("postgresql://"):
+            return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+        return url
+
+    # Connection pool (see app/database.py). Size the pool from
+    # GET /api/admin/pool: sustained overflow or wait time means it's too small.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30  # seconds to wait for a connection
+    DB_POOL_RECYCLE: int = 1800  # seconds; replace connections before the server drops them
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # Postgres statement_timeout; 0 disables
+
+    # Query profiling (see app/profiling.py); development only
+    DB_PROFILE: bool = False
+    DB_SLOW_QUERY_MS: float = 200
+    DB_QUERY_BUDGET: int = 10  # queries per request before it's flagged
+
+    # Write-behind sensor ingest (see app/ingest.py)
+    INGEST_QUEUE_SIZE: int = 10000  # readings held before POSTs get 503
+    INGEST_BATCH_SIZE: int = 500
+    INGEST_FLUSH_SECONDS: float = 2.0
+    INGEST_SPILL_DIR: str = "ingest-spill"  # each process journals to its own worker-N slot in here
+    INGEST_FSYNC: bool = False  # fsync each accepted batch (survives power loss, not just restarts)
+
+    # include=total on list endpoints: counts up to this are exact, larger
+    # ones may be estimates (see app/totals.py)
+    LIST_TOTAL_EXACT_LIMIT: int = 10000
+
+    # Monthly log table partitions on Postgres (see app/partitions.py)
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_RETENTION_MONTHS: int = 0  # months kept before the current one; 0 keeps everything
+    PARTITION_RETENTION_ACTION: str = "archive"  # "archive" (detach into the archive schema) or "drop"
+
+    # Live push of log writes over SSE (see app/live.py)
+    LIVE_QUEUE_SIZE: int = 100  # events a subscriber may fall behind before it's told to resync
+    LIVE_MAX_SUBSCRIBERS: int = 1000  # per worker
+    LIVE_HEARTBEAT_SECONDS: float = 15
+    LIVE_NOTIFY: bool = False  # fan out across workers with Postgres LISTEN/NOTIFY
+    LIVE_CHANNEL: str = "log_events"
+
+    # Response compression (see app/compression.py)
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes; smaller responses go out as they are
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; higher is smaller and much slower
+
+    # Idempotency-Key replay for POST/PUT (see app/idempotency.py)
+    IDEMPOTENCY_TTL_SECONDS: float = 86400
+    IDEMPOTENCY_LEASE_SECONDS: float = 60  # a running request's hold on its key; a retry after this runs again
+    IDEMPOTENCY_CACHE_SIZE: int = 10000  # responses kept in process per worker
+
+    # Admission control and load shedding (see app/admission.py)
+    LIST_MAX_LIMIT: int = 5000  # largest `limit` the list endpoints accept
+    SERIES_MAX_ROWS: int = 500000  # readings an LTTB series may read; more is a 413
+    RATE_LIMIT_PER_SECOND: float = 20  # per client address; 0 disables
+    RATE_LIMIT_BURST: int = 100
+    RATE_LIMIT_MAX_CLIENTS: int = 10000  # buckets kept per worker
+    EXPENSIVE_MAX_CONCURRENT: int = 4  # exports, analytics and series queries running at once, per worker
+    POOL_MAX_WAITING: int = 10  # connection checkouts queued before new requests get 503
+
     # API Settings
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "DataLog API"
-    
+
     # CORS - Update with your frontend URL
     BACKEND_CORS_ORIGINS: list[str] = ["https://datalog-frontend.onrender.com/"]  # Change to your frontend URL in production
 
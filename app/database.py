@@ -1,31 +1,107 @@
-import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from dotenv import load_dotenv
+import time
+from typing import Optional
 
-# Load environment variables from .env file
-load_dotenv(override=True)
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-print("All environment variables with dpg:")
-for k, v in os.environ.items():
-    if "dpg" in v:
-        print(f"{k}={v}")
+from app.core.config import Settings, settings
 
-# Get the DATABASE_URL from the .env file
-DATABASE_URL = os.getenv("DATABASE_URL")
+# The one place the app's engine is built. Pool behaviour comes from Settings
+# (DB_POOL_* and DB_STATEMENT_TIMEOUT_MS environment variables); alembic/env.py
+# keeps its own short-lived sync engine for migrations.
 
-print("Loaded DATABASE_URL:", DATABASE_URL)
 
-# Raise error early if missing
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set. Check your .env file or dotenv loading.")
+# Queue pool that also records how long checkouts wait for a free connection,
+# and how many are waiting now (app/admission.py sheds load on it)
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
 
-# Create engine with appropriate options
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+    def _do_get(self):
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
 
-# Setup session and base
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+
+def create_engine(config: Settings = settings) -> AsyncEngine:
+    url = make_url(config.ASYNC_DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite needs its single shared connection
+        return create_async_engine(url)
+
+    connect_args = {}
+    if url.get_backend_name() == "postgresql" and config.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {"statement_timeout": str(config.DB_STATEMENT_TIMEOUT_MS)}
+
+    return create_async_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+def pool_stats(engine: AsyncEngine) -> dict:
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(size=pool.size(), checked_in=pool.checkedin(),
+                     checked_out=pool.checkedout(), overflow=max(pool.overflow(), 0))
+    if isinstance(pool, TimedQueuePool):
+        stats.update(
+            waiting=pool.waiting,
+            checkouts=pool.checkouts,
+            timeouts=pool.timeouts,
+            wait_avg_ms=round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+            wait_max_ms=round(pool.wait_max * 1000, 3),
+        )
+    return stats
+
+
+# The app's engine and session factory, created by init_engine() (from the
+# app's lifespan hook, or by a command-line entry point) rather than at
+# import, so importing the app does no database work. Both stay None when
+# no DATABASE_URL is configured.
+engine: Optional[AsyncEngine] = None
+SessionLocal: Optional[async_sessionmaker] = None
+
+
+def init_engine(config: Settings = settings) -> Optional[AsyncEngine]:
+    global engine, SessionLocal
+    if engine is None:
+        if not config.DATABASE_URL:
+            print("WARNING: No DATABASE_URL found")
+            return None
+        engine = create_engine(config)
+        # Keep attributes loaded after commit; lazy loads aren't allowed on AsyncSession
+        SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    return engine
+
+
+async def dispose_engine():
+    global engine, SessionLocal
+    if engine is not None:
+        await engine.dispose()
+    engine = None
+    SessionLocal = None
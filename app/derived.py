@@ -0,0 +1,106 @@
+import numpy as np
+
+# Derived metrics for larvae and microwave logs. Every function takes scalars
+# or equal-length column arrays: scalars in give a Python scalar out, arrays in
+# give a NumPy array out. Missing inputs (None/NaN) produce None/NaN; for the
+# integer larvae_count that means None, in an object array when needed.
+
+MG_PER_LB = 453592
+
+
+# Float column; None becomes NaN
+def _column(values):
+    return np.asarray(values, dtype=float)
+
+
+def _result(values, scalar: bool):
+    if not scalar:
+        return values
+    value = values.item()
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+
+def _is_scalar(*args) -> bool:
+    return all(np.ndim(arg) == 0 for arg in args)
+
+
+def larvae_count(lb_larvae, larva_pct, larva_weight):
+    scalar = _is_scalar(lb_larvae, larva_pct, larva_weight)
+    lb_larvae, larva_pct, larva_weight = _column(lb_larvae), _column(larva_pct), _column(larva_weight)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        count = np.trunc((lb_larvae * (larva_pct / 100)) * MG_PER_LB / larva_weight)
+    count = np.where(larva_weight > 0, count, 0)
+    # NaN/inf (a missing input, or an overflow) has no integer value
+    finite = np.isfinite(count)
+    if scalar:
+        return int(count.item()) if finite.item() else None
+    if finite.all():
+        return count.astype(np.int64)
+    # Integers with None where the count is undefined, for to_list()
+    values = np.full(count.shape, None, dtype=object)
+    values[finite] = count[finite].astype(np.int64).tolist()
+    return values
+
+
+def feed_per_larvae(lb_feed, larvae_count):
+    scalar = _is_scalar(lb_feed, larvae_count)
+    lb_feed, larvae_count = _column(lb_feed), _column(larvae_count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_larvae = np.round((lb_feed * MG_PER_LB) / larvae_count, 1)
+    return _result(np.where(larvae_count > 0, per_larvae, 0.0), scalar)
+
+
+def water_feed_ratio(lb_water, lb_feed):
+    scalar = _is_scalar(lb_water, lb_feed)
+    lb_water, lb_feed = _column(lb_water), _column(lb_feed)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.round(lb_water / lb_feed, 1)
+    return _result(np.where(lb_feed > 0, ratio, 0.0), scalar)
+
+
+# All three larvae metrics at once, as a dict of column name -> value(s)
+def larvae_metrics(lb_larvae, larva_pct, larva_weight, lb_feed, lb_water):
+    count = larvae_count(lb_larvae, larva_pct, larva_weight)
+    return {
+        "larvae_count": count,
+        "feed_per_larvae": feed_per_larvae(lb_feed, count),
+        "water_feed_ratio": water_feed_ratio(lb_water, lb_feed),
+    }
+
+
+# Percentage of live larvae weight left after drying. None/NaN when any input
+# is missing or the live weight isn't positive.
+def yield_percentage(tubs_live_larvae, lb_larvae_per_tub, lb_dried_larvae):
+    scalar = _is_scalar(tubs_live_larvae, lb_larvae_per_tub, lb_dried_larvae)
+    tubs, per_tub, dried = _column(tubs_live_larvae), _column(lb_larvae_per_tub), _column(lb_dried_larvae)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = (dried / (tubs * per_tub)) * 100
+    valid = (tubs > 0) & (per_tub > 0) & (dried > 0)
+    return _result(np.where(valid, pct, np.nan), scalar)
+
+
+def microwave_metrics(tubs_live_larvae, lb_larvae_per_tub, lb_dried_larvae):
+    return {"yield_percentage": yield_percentage(tubs_live_larvae, lb_larvae_per_tub, lb_dried_larvae)}
+
+
+# Array -> list of Python values for writing back to the DB (NaN becomes None)
+def to_list(values):
+    return [None if isinstance(value, float) and np.isnan(value) else value
+            for value in np.asarray(values).tolist()]
+
+
+# Apply larvae_metrics to a batch of column-value dicts in one vectorized pass
+def apply_larvae_metrics(rows):
+    if not rows:
+        return rows
+    metrics = larvae_metrics(
+        [row["lb_larvae"] for row in rows],
+        [row["larva_pct"] for row in rows],
+        [row["larva_weight"] for row in rows],
+        [row["lb_feed"] for row in rows],
+        [row["lb_water"] for row in rows],
+    )
+    for name, values in metrics.items():
+        for row, value in zip(rows, to_list(values)):
+            row[name] = value
+    return rows
@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, Numeric
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+try:
+    import msgpack
+except ImportError:  # so is MessagePack
+    msgpack = None
+
+# Streaming encoders for table exports. Each encoder is fed partitions of row
+# tuples (as fetched with yield_per) and yields the bytes for that partition,
+# so memory use depends on the partition size, not on the export size.
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "msgpack": ("application/msgpack", "msgpack"),
+}
+
+
+def _plain(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+async def encode_csv(columns, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in partitions:
+        writer.writerows([[_plain(value) for value in row] for row in rows])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def encode_ndjson(columns, partitions):
+    async for rows in partitions:
+        lines = [json.dumps(dict(zip(columns, map(_plain, row)))) for row in rows]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+# A stream of MessagePack maps, one per row (the binary twin of NDJSON)
+async def encode_msgpack(columns, partitions):
+    packer = msgpack.Packer(use_bin_type=True)
+    async for rows in partitions:
+        yield b"".join(packer.pack(dict(zip(columns, map(_plain, row)))) for row in rows)
+
+
+def parquet_schema(table):
+    fields = []
+    for column in table.columns:
+        if isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC" if column.type.timezone else None)
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, Numeric):
+            arrow_type = pa.decimal128(column.type.precision, column.type.scale)
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+# Write-only sink that hands back what the Parquet writer produced since the
+# last drain. It reports the running byte count from tell(), which the writer
+# uses for the offsets in the file footer.
+class _ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+# One Parquet row group per partition
+async def encode_parquet(table, partitions):
+    schema = parquet_schema(table)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    async for rows in partitions:
+        columns = list(zip(*rows))
+        arrays = [
+            [str(value) if isinstance(value, uuid.UUID) else value for value in values]
+            for values in columns
+        ]
+        writer.write_table(pa.Table.from_pydict(dict(zip(schema.names, arrays)), schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
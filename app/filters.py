@@ -0,0 +1,119 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import Boolean, Float, Integer, Numeric
+
+from app.models import LarvaeLog, ContainerLogPrepupae, ContainerLogNeonates, MicrowaveLog
+
+# Query-string filters shared by the list endpoints, turned into SQL
+# predicates so only matching rows leave the database:
+#
+#   from=<iso>, to=<iso>          timestamp >= from, timestamp < to
+#   <column>=a                    equality
+#   <column>=a&<column>=b         IN
+#   <column>_min=x, <column>_max=y  inclusive numeric range
+#
+# Only the columns listed in FILTERABLE can be filtered on, and values are
+# parsed to the column's type first, so bad input is a 400 rather than a
+# database error, and so is any other parameter (a misspelt filter would
+# otherwise return the whole table), apart from the paging options and a
+# `_` cache-buster. Values are taken whole (a comma is part of the value)
+# and empty ones are ignored. Predicates compare the bare column, so the
+# (username, timestamp) and (timestamp) indexes and partition pruning
+# still apply.
+
+FILTERABLE = {
+    LarvaeLog: ["username", "days_of_age", "row_number", "screen_refeed", "post_feed_condition",
+                "larva_weight", "larva_pct", "lb_larvae", "lb_feed", "lb_water",
+                "larvae_count", "feed_per_larvae", "water_feed_ratio"],
+    ContainerLogPrepupae: ["username", "temperature", "humidity", "prepupae_tubs_added",
+                           "egg_nests_replaced"],
+    ContainerLogNeonates: ["username", "temperature", "humidity", "bait_tubs_replaced",
+                           "shelf_tubs_removed", "egg_nests_replaced"],
+    MicrowaveLog: ["username", "microwave_power_gen1", "microwave_power_gen2", "fan_speed_cavity1",
+                   "fan_speed_cavity2", "belt_speed", "lb_larvae_per_tub", "num_ramp_up_tubs",
+                   "num_ramp_down_tubs", "tubs_live_larvae", "lb_dried_larvae", "yield_percentage"],
+}
+
+# Paging and response options handled by the endpoints themselves, and a
+# cache-buster clients may add
+RESERVED = {"skip", "limit", "cursor", "include", "_"}
+
+MAX_VALUES = 100  # per IN list
+
+
+def _parse(column, value: str):
+    kind = column.type
+    try:
+        if isinstance(kind, Boolean):
+            if value.lower() in ("true", "1"):
+                return True
+            if value.lower() in ("false", "0"):
+                return False
+            raise ValueError
+        if isinstance(kind, Integer):
+            return int(value)
+        if isinstance(kind, (Numeric, Float)):  # separate types since SQLAlchemy 2.1
+            return float(value) if kind.asdecimal is False else Decimal(value)
+    except (ValueError, InvalidOperation):
+        raise ValueError(f"Invalid value for {column.name}: {value!r}")
+    return value
+
+
+def _is_numeric(column) -> bool:
+    return isinstance(column.type, (Integer, Numeric, Float))
+
+
+def parse_timestamp(name: str, value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name} timestamp: {value!r}")
+
+
+# The non-empty values given for a parameter, once or repeated
+def values_of(params, key: str) -> list:
+    return [value for value in params.getlist(key) if value]
+
+
+def _is_filter(model, key: str) -> bool:
+    allowed = FILTERABLE[model]
+    return key in ("from", "to") or key in allowed or (
+        key.endswith(("_min", "_max")) and key[:-4] in allowed and _is_numeric(model.__table__.c[key[:-4]]))
+
+
+# The filter parameters in `params` that have a value, sorted. Raises
+# ValueError for a parameter that is neither a filter nor reserved.
+def active(model, params) -> list:
+    keys = []
+    for key in sorted(set(params.keys()) - RESERVED):
+        if not _is_filter(model, key):
+            raise ValueError(f"Unknown query parameter: {key}")
+        if values_of(params, key):
+            keys.append(key)
+    return keys
+
+
+# Query parameters -> list of WHERE clauses for `model`. Raises ValueError
+# naming the offending parameter.
+def parse(model, params) -> list:
+    allowed = FILTERABLE[model]
+    table = model.__table__
+    clauses = []
+    for key in active(model, params):
+        values = values_of(params, key)
+        if key == "from":
+            clauses.append(model.timestamp >= parse_timestamp(key, values[-1]))
+        elif key == "to":
+            clauses.append(model.timestamp < parse_timestamp(key, values[-1]))
+        elif key in allowed:
+            if len(values) > MAX_VALUES:
+                raise ValueError(f"At most {MAX_VALUES} values for {key}")
+            column = table.c[key]
+            parsed = [_parse(column, value) for value in values]
+            clauses.append(column == parsed[0] if len(parsed) == 1 else column.in_(parsed))
+        else:  # <column>_min or <column>_max
+            column = table.c[key[:-4]]
+            bound = _parse(column, values[-1])
+            clauses.append(column >= bound if key.endswith("_min") else column <= bound)
+    return clauses
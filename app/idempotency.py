@@ -0,0 +1,269 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app import database
+from app.models import IdempotencyKey
+
+# Idempotency-Key support for POST and PUT, so a client retrying a write it
+# never got the answer to gets the original response instead of a second
+# row. The first request with a key claims it, runs, and if it succeeds
+# (2xx) its response is stored under the key for `ttl` seconds. A retry
+# with the same key and the same request is answered from the store
+# without running the handler, with an Idempotent-Replayed header. The
+# same key on a different request (method, path, query or body) is a 422,
+# and a retry while the first is still running is a 409. Failed requests
+# release their key, so they can be retried.
+#
+# A claim is a lease of `lease` seconds, extended to `ttl` once the
+# response is stored. If the worker dies mid-request and never releases
+# the key, a retry after the lease runs the request again instead of
+# getting 409s until the key expires. Keep the lease above the longest a
+# write can take, or a slow original and its retry can both run.
+#
+# Stored responses live in the idempotency_keys table (migration 0006),
+# shared by every worker, with a bounded in-process copy in front: a replay
+# or an in-flight check is a dict lookup, and the table is hit by primary
+# key only on a local miss. Expired rows are purged every PURGE_INTERVAL.
+# Requests without the header don't touch either.
+
+logger = logging.getLogger(__name__)
+
+METHODS = {"POST", "PUT"}
+MAX_KEY_LENGTH = 255
+PURGE_INTERVAL = 300.0  # seconds
+
+# (fingerprint, status, headers, body); a status of None means still running
+Record = Tuple[str, Optional[int], Optional[list], Optional[bytes]]
+
+
+class MemoryStore:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Every entry lives `ttl`, so insertion order is expiry order
+        self.entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[Record]:
+        item = self.entries.get(key)
+        if item is None:
+            return None
+        expires, record = item
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+        return record
+
+    def put(self, key: str, record: Record):
+        self.entries.pop(key, None)
+        self.entries[key] = (time.monotonic() + self.ttl, record)
+        now = time.monotonic()
+        while self.entries:
+            expires, _ = next(iter(self.entries.values()))
+            if expires >= now and len(self.entries) <= self.maxsize:
+                break
+            self.entries.popitem(last=False)
+
+    def discard(self, key: str):
+        self.entries.pop(key, None)
+
+
+def fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (method.encode(), path.encode(), query, body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# Claim `key` for this request for `lease` seconds. Returns None if
+# claimed (a new or expired key, or an abandoned claim), else the record
+# already stored under it. Commits.
+async def claim(db, key: str, request_fingerprint: str, lease: float) -> Optional[Record]:
+    now = datetime.now(timezone.utc)
+    upsert = sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+    stmt = upsert(IdempotencyKey).values(key=key, fingerprint=request_fingerprint,
+                                         expires_at=now + timedelta(seconds=lease))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_={"fingerprint": stmt.excluded.fingerprint, "status": None, "headers": None, "body": None,
+              "expires_at": stmt.excluded.expires_at},
+        where=IdempotencyKey.expires_at < now,
+    ).returning(IdempotencyKey.key)
+    record = None
+    if (await db.execute(stmt)).first() is None:
+        row = (await db.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.status, IdempotencyKey.headers, IdempotencyKey.body)
+            .where(IdempotencyKey.key == key)
+        )).first()
+        # Released or purged in between: report it as still running
+        record = (request_fingerprint, None, None, None) if row is None else (
+            row.fingerprint, row.status, json.loads(row.headers) if row.headers else None, row.body)
+    await db.commit()
+    return record
+
+
+# Store the response and keep it for `ttl` seconds
+async def complete(db, key: str, record: Record, ttl: float):
+    request_fingerprint, status, headers, body = record
+    await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key, IdempotencyKey.fingerprint == request_fingerprint)
+        .values(status=status, headers=json.dumps(headers), body=body,
+                expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl))
+    )
+    await db.commit()
+
+
+async def release(db, key: str, request_fingerprint: str):
+    await db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.key == key, IdempotencyKey.fingerprint == request_fingerprint,
+        IdempotencyKey.status.is_(None),
+    ))
+    await db.commit()
+
+
+async def purge(db) -> int:
+    result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.now(timezone.utc)))
+    await db.commit()
+    return result.rowcount
+
+
+def _error(status: int, detail: str) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status)
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app, ttl: float = 86400, lease: float = 60, cache_size: int = 10000):
+        self.app = app
+        self.ttl = ttl
+        self.lease = lease
+        self.memory = MemoryStore(cache_size, ttl)
+        self.last_purge = time.monotonic()
+        self.purging: Optional[asyncio.Task] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in METHODS:
+            return await self.app(scope, receive, send)
+        key = Headers(scope=scope).get("idempotency-key")
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await _error(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")(
+                scope, receive, send)
+
+        # The body is read here to fingerprint it, then handed on unchanged
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        request_fingerprint = fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+
+        record = self.memory.get(key)
+        claimed = record is None
+        if claimed and database.SessionLocal is not None:
+            try:
+                async with database.SessionLocal() as db:
+                    record = await claim(db, key, request_fingerprint, self.lease)
+                claimed = record is None
+            except Exception:
+                logger.exception("Could not claim idempotency key; running the request without it")
+                return await self.run(scope, body, receive, send)
+
+        if not claimed:
+            stored_fingerprint, status, headers, stored_body = record
+            if stored_fingerprint != request_fingerprint:
+                response = _error(422, "Idempotency-Key was already used for a different request")
+            elif status is None:
+                response = _error(409, "A request with this Idempotency-Key is still in progress")
+            else:
+                self.memory.put(key, record)
+                return await self.replay(record, send)
+            return await response(scope, receive, send)
+
+        self.memory.put(key, (request_fingerprint, None, None, None))
+        response = None
+        try:
+            response = await self.run(scope, body, receive, send, capture=True)
+        finally:
+            await self.finish(key, request_fingerprint, None if response is None else (request_fingerprint, *response))
+
+    # Run the app on the buffered body. With `capture`, returns the
+    # (status, headers, body) of a 2xx response.
+    async def run(self, scope, body: bytes, receive, send, capture: bool = False):
+        sent = False
+
+        async def replay_receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        start = None
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, replay_receive, send_wrapper if capture else send)
+        if start is None or not 200 <= start["status"] < 300:
+            return None
+        headers = [[name.decode("latin-1"), value.decode("latin-1")] for name, value in start["headers"]]
+        return start["status"], headers, b"".join(chunks)
+
+    # Store a successful response under the key, or (with None) release it
+    async def finish(self, key: str, request_fingerprint: str, record: Optional[Record]):
+        if record is None:
+            self.memory.discard(key)
+        else:
+            self.memory.put(key, record)
+        if database.SessionLocal is None:
+            return
+        try:
+            async with database.SessionLocal() as db:
+                if record is None:
+                    await release(db, key, request_fingerprint)
+                else:
+                    await complete(db, key, record, self.ttl)
+        except Exception:
+            logger.exception("Could not store idempotency key %s", key)
+
+        if time.monotonic() - self.last_purge > PURGE_INTERVAL and (self.purging is None or self.purging.done()):
+            self.last_purge = time.monotonic()
+            self.purging = asyncio.create_task(self.purge())
+
+    async def purge(self):
+        try:
+            async with database.SessionLocal() as db:
+                await purge(db)
+        except Exception:
+            logger.exception("Could not purge expired idempotency keys")
+
+    async def replay(self, record: Record, send):
+        _, status, headers, body = record
+        raw = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        raw.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": status, "headers": raw})
+        await send({"type": "http.response.body", "body": body})
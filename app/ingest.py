@@ -0,0 +1,351 @@
+import asyncio
+import itertools
+import json
+import logging
+import math
+import os
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process, one slot
+    fcntl = None
+
+from sqlalchemy import BigInteger, Float, Integer, Numeric, String, exc
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import cache, live, rollups, sync
+
+# Write-behind ingest for automated sensor readings. POST /api/ingest/{kind}
+# validates the readings, appends them to a spill file, queues them and
+# returns 202; a background task writes the queue out in batched INSERTs
+# whenever it reaches the batch size or the flush interval passes.
+#
+# Every reading gets its id when it's accepted, and the spill file holds
+# everything accepted but not yet committed. On startup leftover spill files
+# are replayed with ON CONFLICT (id) DO NOTHING, so a reading that was
+# committed just before a crash isn't written twice.
+#
+# Readings are checked against their columns when accepted (check_values),
+# so a value the database would refuse is reported to the sender instead of
+# failing a batch. If a batch fails on its data anyway, it's written again
+# one reading at a time and the readings that still fail are moved to
+# quarantine.ndjson in the spill slot, with the error, rather than being
+# retried (and replayed at every start) forever. Other failures, such as
+# the database being down, keep the batch for the next tick.
+#
+# Each process journals to its own slot under the spill directory,
+# worker-0, worker-1, ..., held with an exclusive flock while it runs. A
+# starting process takes the first free slot, so after a restart the slots
+# are taken up again and their journals replayed; slots nobody took are
+# adopted by the first process to start (their journals move into its own).
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _encode(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _decode(record: Dict[str, Any]):
+    values = record["values"]
+    values["id"] = uuid.UUID(values["id"])
+    values["timestamp"] = datetime.fromisoformat(values["timestamp"])
+    return record["table"], values
+
+
+INTEGER_LIMITS = {Integer: 2**31 - 1, BigInteger: 2**63 - 1}
+
+
+# Raises ValueError for a value its column can't hold: the wrong type, a
+# non-finite number, DECIMAL(p, s) overflow, an out-of-range integer or an
+# over-long string
+def check_values(model, values: Dict[str, Any]):
+    columns = model.__table__.columns
+    for name, value in values.items():
+        if value is None or name not in columns:
+            continue
+        column_type = columns[name].type
+        if isinstance(column_type, String):
+            if not isinstance(value, str):
+                raise ValueError(f"{name} must be text")
+            if column_type.length and len(value) > column_type.length:
+                raise ValueError(f"{name} is longer than {column_type.length} characters")
+        elif isinstance(column_type, (Integer, Numeric, Float)):  # Float isn't a Numeric since SQLAlchemy 2.1
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{name} must be a number")
+            if not math.isfinite(value):
+                raise ValueError(f"{name} must be finite")
+            if type(column_type) in INTEGER_LIMITS and abs(value) > INTEGER_LIMITS[type(column_type)]:
+                raise ValueError(f"{name} is out of range")
+            if isinstance(column_type, Numeric) and not isinstance(column_type, Float) and column_type.precision:
+                scale = column_type.scale or 0
+                limit = 10 ** (column_type.precision - scale)
+                if round(abs(value), scale) >= limit:
+                    raise ValueError(f"{name} must be less than {limit} in magnitude")
+
+
+# A failure caused by the rows being written (a Postgres data exception or
+# integrity violation, SQLSTATE classes 22 and 23) rather than by the
+# database, which asyncpg mostly reports as a plain DBAPIError
+def _bad_rows(error: Exception) -> bool:
+    if isinstance(error, (exc.DataError, exc.IntegrityError)):
+        return True
+    sqlstate = getattr(getattr(error, "orig", None), "sqlstate", None) or ""
+    return sqlstate[:2] in ("22", "23")
+
+
+# Lock `directory`'s slot; None if another process holds it
+def _lock_slot(directory: str):
+    os.makedirs(directory, exist_ok=True)
+    lock = open(os.path.join(directory, "lock"), "a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return None
+    return lock
+
+
+def _segments(directory: str) -> List[str]:
+    names = sorted((name for name in os.listdir(directory) if name.startswith("segment-")),
+                   key=lambda name: int(name.split("-")[1].split(".")[0]))
+    return [os.path.join(directory, name) for name in names]
+
+
+# Append-only NDJSON journal in this process's slot under `root`. The worker
+# rotates the current file into a numbered segment each time it takes the
+# queue, and deletes the segments once that batch is committed.
+class SpillFile:
+    def __init__(self, root: str, fsync: bool = False):
+        self.fsync = fsync
+        for number in itertools.count():
+            self.directory = os.path.join(root, f"worker-{number}")
+            self.lock = _lock_slot(self.directory)
+            if self.lock is not None:
+                break
+        self.current_path = os.path.join(self.directory, "current.ndjson")
+        self.quarantine_path = os.path.join(self.directory, "quarantine.ndjson")
+        self.adopt(root)
+        self.file = open(self.current_path, "a", encoding="utf-8")
+
+    # Move the journals of slots no process holds into this one
+    def adopt(self, root: str):
+        for name in sorted(os.listdir(root)):
+            directory = os.path.join(root, name)
+            if not name.startswith("worker-") or directory == self.directory:
+                continue
+            lock = _lock_slot(directory)
+            if lock is None:
+                continue
+            try:
+                for path in _segments(directory) + [os.path.join(directory, "current.ndjson")]:
+                    if os.path.exists(path):
+                        os.replace(path, self.next_segment())
+            finally:
+                lock.close()
+
+    def segments(self) -> List[str]:
+        return _segments(self.directory)
+
+    def next_segment(self) -> str:
+        segments = self.segments()
+        number = int(os.path.basename(segments[-1]).split("-")[1].split(".")[0]) + 1 if segments else 0
+        return os.path.join(self.directory, f"segment-{number}.ndjson")
+
+    def _write(self, file, records: List[Dict[str, Any]]):
+        file.write("".join(json.dumps(record, default=_encode) + "\n" for record in records))
+        file.flush()
+        if self.fsync:
+            os.fsync(file.fileno())
+
+    def append(self, records: List[Dict[str, Any]]):
+        self._write(self.file, records)
+
+    # Readings the database refused, kept for someone to look at
+    def quarantine(self, records: List[Dict[str, Any]]):
+        with open(self.quarantine_path, "a", encoding="utf-8") as f:
+            self._write(f, records)
+
+    def rotate(self):
+        self.file.close()
+        if os.path.getsize(self.current_path):
+            os.replace(self.current_path, self.next_segment())
+        self.file = open(self.current_path, "a", encoding="utf-8")
+
+    def discard_segments(self):
+        for path in self.segments():
+            os.remove(path)
+
+    # Everything not yet committed (segments and the current file), in order
+    def read(self):
+        records = []
+        for path in self.segments() + [self.current_path]:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(_decode(json.loads(line)))
+                    except ValueError:
+                        logger.warning("Skipping unreadable line in %s", path)  # torn last write
+        return records
+
+    def close(self):
+        self.file.close()
+        self.lock.close()
+
+
+class IngestQueue:
+    def __init__(self, session_factory, models, spill_dir: str, max_size: int = 10000,
+                 batch_size: int = 500, flush_seconds: float = 2.0, fsync: bool = False):
+        self.session_factory = session_factory
+        self.models = {model.__tablename__: model for model in models}
+        self.spill = SpillFile(spill_dir, fsync)
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue = deque()
+        self.pending = []  # taken off the queue, not yet committed
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    # Readings accepted but not yet committed
+    def size(self) -> int:
+        return len(self.queue) + len(self.pending)
+
+    # Accept rows (column values without ids) for one table. All or nothing:
+    # raises QueueFull when they don't fit, so the caller can shed load.
+    def put(self, model, rows: List[Dict[str, Any]]) -> List[uuid.UUID]:
+        if self.size() + len(rows) > self.max_size:
+            raise QueueFull()
+        records = []
+        for values in rows:
+            values["id"] = uuid.uuid4()
+            records.append({"table": model.__tablename__, "values": values})
+        # Spill before queueing; no await in between, so the worker's
+        # rotate() always sees the file and the queue in step
+        self.spill.append(records)
+        self.queue.extend((model.__tablename__, record["values"]) for record in records)
+        if len(self.queue) >= self.batch_size:
+            self.wakeup.set()
+        return [record["values"]["id"] for record in records]
+
+    async def start(self):
+        self.spill.rotate()
+        self.pending = self.spill.read()
+        if self.pending:
+            logger.warning("Replaying %d spilled readings", len(self.pending))
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        self.spill.close()
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        # A failed flush keeps its pending rows and is retried on the next
+        # tick, unless it failed on the rows themselves
+        if not self.pending:
+            self.pending = list(self.queue)
+            self.queue.clear()
+            self.spill.rotate()
+        if not self.pending:
+            return
+
+        by_table = {}
+        for table, values in self.pending:
+            by_table.setdefault(table, []).append(values)
+        quarantined = []
+        try:
+            inserted = await self.write_batches(by_table)
+        except Exception as e:
+            if not _bad_rows(e):
+                logger.exception("Ingest flush of %d readings failed; will retry", len(self.pending))
+                return
+            logger.warning("Ingest flush of %d readings failed on their data (%s); writing them one at a time",
+                           len(self.pending), getattr(e, "orig", e))
+            try:
+                inserted, quarantined = await self.write_each(by_table)
+            except Exception:
+                logger.exception("Ingest flush of %d readings failed; will retry", len(self.pending))
+                return
+
+        if quarantined:
+            self.spill.quarantine(quarantined)
+            logger.error("Quarantined %d readings the database refused in %s",
+                         len(quarantined), self.spill.quarantine_path)
+        self.pending = []
+        self.spill.discard_segments()
+        for table in by_table:
+            await cache.invalidate(self.models[table])
+            if inserted.get(table):
+                await live.hub.publish(live.insert_event(self.models[table], inserted[table]))
+
+    # Everything in one transaction
+    async def write_batches(self, by_table: Dict[str, List[Dict[str, Any]]]):
+        inserted = {}
+        async with self.session_factory() as db:
+            for table, rows in by_table.items():
+                for start in range(0, len(rows), self.batch_size):
+                    inserted.setdefault(table, []).extend(
+                        await self.write(db, self.models[table], rows[start:start + self.batch_size]))
+            await db.commit()
+        return inserted
+
+    # A transaction per reading; returns what was inserted and the readings
+    # refused for their data, as quarantine records. Any other failure
+    # propagates, and the retry skips readings already committed.
+    async def write_each(self, by_table: Dict[str, List[Dict[str, Any]]]):
+        inserted, quarantined = {}, []
+        for table, rows in by_table.items():
+            for row in rows:
+                async with self.session_factory() as db:
+                    try:
+                        written = await self.write(db, self.models[table], [row])
+                        await db.commit()
+                    except Exception as e:
+                        if not _bad_rows(e):
+                            raise
+                        quarantined.append({"table": table, "values": row, "error": str(getattr(e, "orig", e))})
+                        continue
+                inserted.setdefault(table, []).extend(written)
+        return inserted, quarantined
+
+    async def write(self, db, model, rows: List[Dict[str, Any]]):
+        if db.bind.dialect.name == "sqlite":
+            stmt = sqlite_insert(model.__table__).on_conflict_do_nothing(index_elements=["id"])
+        else:  # partitioned: the key includes the partition column
+            stmt = pg_insert(model.__table__).on_conflict_do_nothing(index_elements=["id", "timestamp"])
+        stmt = stmt.returning(*model.__table__.columns)
+        version = await sync.next_version(db)
+        # Only rows actually inserted come back, so replays don't double count
+        result = await db.execute(stmt, [{**row, "version": version} for row in rows])
+        inserted = result.all()
+        await rollups.apply(db, model, new=[row._mapping for row in inserted])
+        return inserted
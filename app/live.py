@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from typing import Iterable, List, Optional, Set
+
+import orjson
+
+from app import serializers
+from app.core.config import settings
+
+# Live push of log writes to open dashboards, over Server-Sent Events
+# (GET /api/live). After a write commits, its handler publishes one event:
+#
+#   {"table": "larvae_logs", "op": "insert"|"update", "rows": [...]}
+#   {"table": "larvae_logs", "op": "delete", "ids": [...]}
+#   {"table": "larvae_logs", "op": "reload"}   (bulk rewrites: refetch)
+#
+# The event is encoded once and the same bytes are queued for every
+# subscriber of that table. Each subscriber is a bounded asyncio queue
+# drained by its own response, so an idle connection costs a parked task
+# and nothing per tick beyond a heartbeat comment. A subscriber that falls
+# `queue_size` events behind is sent a "resync" event and disconnected;
+# clients catch up with /api/sync and reconnect.
+#
+# With one worker the hub delivers directly. With several, set LIVE_NOTIFY
+# on Postgres: events are sent with pg_notify on LIVE_CHANNEL over one
+# dedicated connection per worker, and every worker (the sender included)
+# fans out what it hears. Postgres caps a notification at 8000 bytes, so a
+# larger insert/update event goes out with ids only, or failing that as a
+# reload.
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_MAX_BYTES = 7900
+RECONNECT_SECONDS = 5.0
+
+
+class Subscription:
+    def __init__(self, tables: Set[str], queue_size: int):
+        self.tables = tables
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, frame: bytes):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+def _frame(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+RESYNC = _frame("resync", b"{}")
+HEARTBEAT = b": keepalive\n\n"
+
+
+class Hub:
+    def __init__(self, queue_size: int = 100, max_subscribers: int = 1000):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[Subscription] = set()
+        self.bridge: Optional["PostgresBridge"] = None
+
+    def subscribe(self, tables: Iterable[str]) -> Optional[Subscription]:
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        subscription = Subscription(set(tables), self.queue_size)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    async def publish(self, event: dict):
+        if not self.subscribers and self.bridge is None:
+            return
+        message = orjson.dumps(event, default=serializers._default)
+        if self.bridge is not None and await self.bridge.send(event, message):
+            return
+        self.deliver(event["table"], message)
+
+    def deliver(self, table: str, message: bytes):
+        frame = _frame("change", message)
+        for subscription in self.subscribers:
+            if table in subscription.tables:
+                subscription.offer(frame)
+
+    # SSE body for one subscriber: its events as they come, a heartbeat
+    # comment when idle, and "resync" before closing if it fell behind
+    async def stream(self, subscription: Subscription, heartbeat: float):
+        try:
+            yield b"retry: 5000\n\n"
+            while not subscription.overflowed or not subscription.queue.empty():
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+            yield RESYNC
+        finally:
+            self.unsubscribe(subscription)
+
+
+def insert_event(model, rows) -> dict:
+    return {"table": model.__tablename__, "op": "insert", "rows": serializers.serialize_rows(model, rows)}
+
+
+def update_event(model, rows) -> dict:
+    return {"table": model.__tablename__, "op": "update", "rows": serializers.serialize_rows(model, rows)}
+
+
+def delete_event(model, ids: List) -> dict:
+    return {"table": model.__tablename__, "op": "delete", "ids": ids}
+
+
+def reload_event_for(table: str) -> dict:
+    return {"table": table, "op": "reload"}
+
+
+def reload_event(model) -> dict:
+    return reload_event_for(model.__tablename__)
+
+
+hub = Hub(queue_size=settings.LIVE_QUEUE_SIZE, max_subscribers=settings.LIVE_MAX_SUBSCRIBERS)
+
+
+# Cross-worker delivery through Postgres LISTEN/NOTIFY on one dedicated
+# asyncpg connection (outside the pool), reconnecting if it drops. While
+# it's down, send() returns False and events are delivered locally only.
+class PostgresBridge:
+    def __init__(self, hub: Hub, dsn: str, channel: str):
+        self.hub = hub
+        self.dsn = dsn
+        self.channel = channel
+        self.connection = None
+        self.lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+    async def run(self):
+        import asyncpg
+
+        while True:
+            try:
+                self.connection = await asyncpg.connect(self.dsn)
+                lost = asyncio.get_running_loop().create_future()
+                self.connection.add_termination_listener(lambda connection: lost.done() or lost.set_result(None))
+                await self.connection.add_listener(self.channel, self.receive)
+                await lost
+                logger.warning("Live event connection lost; reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Live event connection failed; retrying in %ss", RECONNECT_SECONDS)
+            self.connection = None
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    def receive(self, connection, pid, channel, payload: str):
+        message = payload.encode()
+        self.hub.deliver(orjson.loads(message)["table"], message)
+
+    async def send(self, event: dict, message: bytes) -> bool:
+        if self.connection is None:
+            return False
+        if len(message) > NOTIFY_MAX_BYTES and "rows" in event:
+            message = orjson.dumps({"table": event["table"], "op": event["op"],
+                                    "ids": [row["id"] for row in event["rows"]]})
+        if len(message) > NOTIFY_MAX_BYTES:
+            message = orjson.dumps(reload_event_for(event["table"]))
+        try:
+            async with self.lock:
+                await self.connection.execute("SELECT pg_notify($1, $2)", self.channel, message.decode())
+            return True
+        except Exception:
+            logger.exception("Could not send live event")
+            return False
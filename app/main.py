@@ -1,17 +1,76 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, String, Integer, Float, Boolean, DateTime, Text, DECIMAL
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.sql import func
-from typing import Dict, Any, List, Optional
-from datetime import datetime
-import os
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, Union
+from datetime import datetime, timezone
+import base64
+import json
 import uuid
 
+from app import (admission, analytics, cache, compression, database, derived, export, filters, idempotency, ingest,
+                 live, metrics, profiling, rollups, schemas, serializers, series, sync, totals)
+from app.core.config import settings
+from app.database import pool_stats
+from app.models import LarvaeLog, ContainerLogPrepupae, ContainerLogNeonates, MicrowaveLog
+from app.serializers import ORJSONResponse
+
+# Importing this module touches no database: the schema is managed by
+# `python -m app.migrate` and the engine is created here. Partition upkeep
+# is a scheduled job (`python -m app.partitions`), so workers run no DDL.
+# The lifespan hook also starts the sensor ingest worker and the live event
+# bridge, and releases pooled connections on shutdown.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ingest = None
+    engine = database.init_engine()
+    if engine is not None and settings.LIVE_NOTIFY and engine.dialect.name == "postgresql":
+        live.hub.bridge = live.PostgresBridge(live.hub, settings.SQLALCHEMY_DATABASE_URL, settings.LIVE_CHANNEL)
+        await live.hub.bridge.start()
+    if engine is not None:
+        metrics.instrument_engine(engine)
+        if settings.DB_PROFILE:
+            profiling.instrument_engine(engine, settings.DB_SLOW_QUERY_MS)
+
+        app.state.ingest = ingest.IngestQueue(
+            database.SessionLocal, [ContainerLogPrepupae, ContainerLogNeonates, MicrowaveLog],
+            spill_dir=settings.INGEST_SPILL_DIR,
+            max_size=settings.INGEST_QUEUE_SIZE,
+            batch_size=settings.INGEST_BATCH_SIZE,
+            flush_seconds=settings.INGEST_FLUSH_SECONDS,
+            fsync=settings.INGEST_FSYNC,
+        )
+        await app.state.ingest.start()
+    yield
+    if app.state.ingest is not None:
+        await app.state.ingest.stop()
+    if live.hub.bridge is not None:
+        await live.hub.bridge.stop()
+        live.hub.bridge = None
+    await database.dispose_engine()
+
 # FastAPI app
-app = FastAPI(title="DataLog API", version="1.0.0")
+app = FastAPI(title="DataLog API", version="1.0.0", lifespan=lifespan)
+
+# Replay responses for retried POST/PUTs (see app/idempotency.py). Added
+# first, so it sits inside CORS and compression and stores plain responses.
+app.add_middleware(idempotency.IdempotencyMiddleware, ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+                   lease=settings.IDEMPOTENCY_LEASE_SECONDS, cache_size=settings.IDEMPOTENCY_CACHE_SIZE)
+
+# Per-client rate limits, a cap on concurrent exports/analytics, and 503s
+# when the connection pool is backed up (see app/admission.py). Inside CORS,
+# so browsers can read the rejections, and outside idempotency, so a
+# rejected request doesn't claim its key.
+app.add_middleware(
+    admission.AdmissionMiddleware,
+    rate=settings.RATE_LIMIT_PER_SECOND,
+    burst=settings.RATE_LIMIT_BURST,
+    max_clients=settings.RATE_LIMIT_MAX_CLIENTS,
+    expensive_limit=settings.EXPENSIVE_MAX_CONCURRENT,
+    max_pool_waiting=settings.POOL_MAX_WAITING,
+)
 
 # CORS middleware
 app.add_middleware(
@@ -27,103 +86,286 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Total-Approximate", "Idempotent-Replayed", "Retry-After"],
 )
 
-# Database setup
-DATABASE_URL = os.getenv("DATABASE_URL", "")
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-
-if DATABASE_URL:
-    engine = create_engine(DATABASE_URL)
-    SessionLocal = sessionmaker(bind=engine)
-else:
-    print("WARNING: No DATABASE_URL found")
-    engine = None
-    SessionLocal = None
+# gzip/brotli for responses over COMPRESSION_MINIMUM_SIZE (see app/compression.py)
+app.add_middleware(
+    compression.CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
 
-Base = declarative_base()
+# Request/query metrics, served at /metrics (the engine is instrumented in
+# the lifespan hook)
+app.add_middleware(metrics.MetricsMiddleware)
 
-# Models
-class LarvaeLog(Base):
-    __tablename__ = "larvae_logs"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
-    username = Column(String(100), nullable=False)
-    days_of_age = Column(Integer, nullable=False)
-    larva_weight = Column(Integer, nullable=False)
-    larva_pct = Column(Integer, nullable=False)
-    lb_larvae = Column(Integer, nullable=False)
-    lb_feed = Column(Float, nullable=False)
-    lb_water = Column(Float, nullable=False)
-    screen_refeed = Column(Boolean, default=False)
-    row_number = Column(String(50))
-    notes = Column(Text)
-    larvae_count = Column(Integer)
-    feed_per_larvae = Column(Float)
-    water_feed_ratio = Column(Float)
-    post_feed_condition = Column(String(50), nullable=True)
-
-
-class ContainerLogPrepupae(Base):
-    __tablename__ = "container_logs_prepupae"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
-    username = Column(String(100), nullable=False)
-    temperature = Column(DECIMAL(5, 2))
-    humidity = Column(DECIMAL(5, 2))
-    prepupae_tubs_added = Column(Integer)
-    egg_nests_replaced = Column(Integer)
-    notes = Column(Text)
-
-class ContainerLogNeonates(Base):
-    __tablename__ = "container_logs_neonates"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
-    username = Column(String(100), nullable=False)
-    temperature = Column(DECIMAL(5, 2))
-    humidity = Column(DECIMAL(5, 2))
-    bait_tubs_replaced = Column(Integer)
-    shelf_tubs_removed = Column(Integer)
-    egg_nests_replaced = Column(Integer)
-    notes = Column(Text)
-
-class MicrowaveLog(Base):
-    __tablename__ = "microwave_logs"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
-    username = Column(String(100), nullable=False)
-    microwave_power_gen1 = Column(DECIMAL(5, 2))
-    microwave_power_gen2 = Column(DECIMAL(5, 2))
-    fan_speed_cavity1 = Column(DECIMAL(5, 2))
-    fan_speed_cavity2 = Column(DECIMAL(5, 2))
-    belt_speed = Column(DECIMAL(5, 2))
-    lb_larvae_per_tub = Column(DECIMAL(6, 2))
-    num_ramp_up_tubs = Column(Integer)
-    num_ramp_down_tubs = Column(Integer)
-    # Post-production fields (nullable)
-    tubs_live_larvae = Column(Integer, nullable=True)
-    lb_dried_larvae = Column(DECIMAL(6, 2), nullable=True)
-    yield_percentage = Column(DECIMAL(5, 2), nullable=True)
-    notes = Column(Text)
-
-# Create tables if engine exists
-if engine:
-    Base.metadata.create_all(bind=engine)
+# Slow-query log, per-request query budget and X-Query-Count (DB_PROFILE=1)
+if settings.DB_PROFILE:
+    app.add_middleware(profiling.ProfilingMiddleware, budget=settings.DB_QUERY_BUDGET)
 
 # Dependency
-def get_db():
-    if not SessionLocal:
+async def get_db():
+    if database.SessionLocal is None:
         raise HTTPException(status_code=500, detail="Database not configured")
-    db = SessionLocal()
-    try:
+    async with database.SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# ============ PAGINATION ============
+
+# Opaque keyset cursor: the (timestamp, id) of the last row on the previous page
+def encode_cursor(timestamp: datetime, log_id: uuid.UUID) -> str:
+    raw = f"{timestamp.isoformat()}|{log_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    timestamp, log_id = raw.split("|")
+    return datetime.fromisoformat(timestamp), uuid.UUID(log_id)
+
+# Run a list query with skip/limit, or in keyset mode when a cursor is passed
+# (an empty cursor starts from the newest row). The query selects plain
+# columns, so rows come back as tuples without building ORM objects.
+# Returns (rows, next_cursor).
+async def fetch_page(db: AsyncSession, model, query, skip: int, limit: int, cursor: Optional[str]):
+    if cursor is None:
+        result = await db.execute(query.order_by(model.timestamp.desc()).offset(skip).limit(limit))
+        return result.all(), None
+
+    if cursor:
+        try:
+            timestamp, log_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # The plain timestamp bound is implied by the row comparison, but it's
+        # the form Postgres can prune partitions with
+        query = query.where(model.timestamp <= timestamp,
+                            tuple_(model.timestamp, model.id) < (timestamp, log_id))
+
+    # Fetch one extra row to know whether another page exists
+    result = await db.execute(query.order_by(model.timestamp.desc(), model.id.desc()).limit(limit + 1))
+    rows = result.all()
+    if limit > 0 and len(rows) > limit:
+        last = rows[limit - 1]
+        return rows[:limit], encode_cursor(last.timestamp, last.id)
+    return rows[:limit], None
+
+# Shared body of the list endpoints: newest-first page of a log table,
+# narrowed by the query-string filters in app/filters.py and served through
+# the response cache. include=total adds X-Total-Count, and
+# X-Total-Approximate says whether it's an estimate (see app/totals.py).
+async def list_logs(request: Request, db: AsyncSession, model, skip: int, limit: int,
+                    cursor: Optional[str]):
+    if not 0 <= limit <= settings.LIST_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 0 and {settings.LIST_MAX_LIMIT}")
+    if skip < 0:
+        raise HTTPException(status_code=400, detail="skip must not be negative")
+    include = set(filters.values_of(request.query_params, "include"))
+    if not include <= {"total"}:
+        raise HTTPException(status_code=400, detail="include must be: total")
+    try:
+        clauses = filters.parse(model, request.query_params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def load():
+        query = select(*model.__table__.columns).where(*clauses)
+        rows, next_cursor = await fetch_page(db, model, query, skip, limit, cursor)
+        items = serializers.serialize_rows(model, rows)
+
+        headers = {}
+        if "total" in include:
+            total, approximate = await totals.total(db, model, clauses, request.query_params,
+                                                    settings.LIST_TOTAL_EXACT_LIMIT,
+                                                    settings.PARTITION_RETENTION_MONTHS)
+            headers = {"X-Total-Count": str(total), "X-Total-Approximate": "true" if approximate else "false"}
+
+        if cursor is None:
+            return items, headers
+        return {"items": items, "next_cursor": next_cursor}, headers
+
+    return await cache.list_response(request, model, load)
+
+# ============ BULK INGEST ============
+
+BULK_MAX_ROWS = 5000
+
+def require_fields(data: Dict[str, Any], fields: List[str]):
+    for field in fields:
+        if field not in data:
+            raise ValueError(f"Missing required field: {field}")
+
+# Field parsers for payload values. asyncpg binds parameters by column type
+# and doesn't coerce, so a "7" for an INTEGER or a 5 for a VARCHAR must be
+# converted here rather than left to the database.
+def text_value(value) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ValueError(f"expected text, got {type(value).__name__}")
+
+def required_text(value) -> str:
+    if value is None:
+        raise ValueError("must not be null")
+    return text_value(value)
+
+def flag_value(value) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "1", "false", "0"):
+        return value.lower() in ("true", "1")
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    raise ValueError(f"expected a boolean, got {value!r}")
+
+def whole_number(value) -> int:
+    return int(float(value))
+
+# An optional numeric field, stored as NULL when empty
+def optional_number(convert):
+    def parse(value):
+        if isinstance(value, bool):
+            raise ValueError(f"expected a number, got {value!r}")
+        return convert(value) if value else None
+    return parse
+
+# Apply `parsers` to the fields of `data` that are present; a ValueError
+# names the offending field
+def parse_fields(data: Dict[str, Any], parsers: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    values = {}
+    for field in fields:
+        if field in data:
+            try:
+                values[field] = parsers[field](data[field])
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Invalid value for {field}: {data[field]!r} ({e})")
+    return values
+
+# Read a bulk body: a JSON array, or NDJSON (one object per line) when sent as
+# application/x-ndjson. Unparseable NDJSON lines are kept as errors so they are
+# reported against their row instead of failing the whole batch.
+async def read_bulk_rows(request: Request) -> List[Any]:
+    body = await request.body()
+    if "ndjson" in request.headers.get("content-type", ""):
+        rows = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                rows.append(ValueError(f"Invalid JSON: {e}"))
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of rows")
+
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Too many rows (max {BULK_MAX_ROWS})")
+    return rows
+
+# Validate every row, fill derived columns for the whole batch with `derive`,
+# then write the valid rows with a single multi-row INSERT ... RETURNING.
+# Invalid rows are reported by index and skipped.
+async def bulk_insert(db: AsyncSession, model, rows: List[Any], build_values, derive=None):
+    values, indexes, errors = [], [], []
+    for index, row in enumerate(rows):
+        try:
+            if isinstance(row, Exception):
+                raise row
+            if not isinstance(row, dict):
+                raise ValueError("Row must be a JSON object")
+            values.append(build_values(row))
+            indexes.append(index)
+        except (ValueError, TypeError) as e:
+            errors.append({"index": index, "detail": str(e)})
+
+    if derive:
+        derive(values)
+
+    created = []
+    if values:
+        try:
+            version = await sync.next_version(db)
+            for value in values:
+                value["version"] = version
+            # Core insert on the table keeps every row in one VALUES list
+            # (the ORM bulk path splits batches by which columns are NULL)
+            result = await db.execute(
+                insert(model.__table__).returning(*model.__table__.columns, sort_by_parameter_order=True), values
+            )
+            inserted = result.all()
+            await rollups.apply(db, model, new=[row._mapping for row in inserted])
+            await db.commit()
+            await cache.invalidate(model)
+            await live.hub.publish(live.insert_event(model, inserted))
+            created = [{"index": index, "id": str(row.id)} for index, row in zip(indexes, inserted)]
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Error creating logs: {str(e)}")
+
+    return {"inserted": len(created), "created": created, "errors": errors}
+
+# ============ SINGLE-ROW WRITES ============
+
+# Each single-row write is one statement with RETURNING, so handlers never
+# SELECT before writing or refresh after. Rows come back as column tuples
+# in table order, like the list queries. Writes take a sync version first
+# (app/sync.py) and stamp it on the row, or on its tombstone.
+
+async def insert_returning(db: AsyncSession, model, values: Dict[str, Any]):
+    values = {**values, "version": await sync.next_version(db)}
+    result = await db.execute(insert(model.__table__).values(values).returning(*model.__table__.columns))
+    return result.one()
+
+async def fetch_row(db: AsyncSession, model, log_id: uuid.UUID):
+    result = await db.execute(select(*model.__table__.columns).where(model.id == log_id))
+    return result.first()
+
+# UPDATE one row. Returns (old, new) -- the old row as a mapping (for
+# rollups), the new one as a row -- or None when there's no such row. On
+# Postgres the old values come back from the same statement via a locked
+# FROM subquery; SQLite can't return FROM columns, so there it's read first.
+async def update_returning(db: AsyncSession, model, log_id: uuid.UUID, values: Dict[str, Any]):
+    table = model.__table__
+    if values:
+        values = {**values, "version": await sync.next_version(db)}
+    if not values or db.bind.dialect.name == "sqlite":
+        old = await fetch_row(db, model, log_id)
+        if old is None or not values:
+            return None if old is None else (old._mapping, old)
+        result = await db.execute(update(table).where(table.c.id == log_id).values(values).returning(*table.columns))
+        return old._mapping, result.one()
+
+    previous = select(table).where(table.c.id == log_id).with_for_update().subquery("previous")
+    result = await db.execute(
+        update(table).where(table.c.id == previous.c.id).values(values)
+        .returning(*table.columns, *[column.label(f"previous_{column.name}") for column in previous.c])
+    )
+    new = result.first()
+    if new is None:
+        return None
+    return {column.name: new._mapping[f"previous_{column.name}"] for column in table.columns}, new
+
+# Set columns computed from the row (derived metrics) after an update, in
+# the same transaction (so under the same sync version)
+async def set_returning(db: AsyncSession, model, log_id: uuid.UUID, values: Dict[str, Any]):
+    table = model.__table__
+    result = await db.execute(update(table).where(table.c.id == log_id).values(values).returning(*table.columns))
+    return result.one()
+
+async def delete_returning(db: AsyncSession, model, log_id: uuid.UUID):
+    version = await sync.next_version(db)
+    result = await db.execute(delete(model.__table__).where(model.id == log_id).returning(*model.__table__.columns))
+    row = result.first()
+    if row is not None:
+        await sync.tombstone(db, model, row.id, version)
+    return row
 
 # Root endpoint
 @app.get("/")
@@ -134,9 +376,18 @@ async def root():
         "endpoints": {
             "health": "/health",
             "larvae_logs": "GET/POST/PUT /api/logs",
+            "bulk": "POST /api/logs/bulk, /api/container-logs/{kind}/bulk, /api/microwave-logs/bulk",
             "container_prepupae": "GET/POST /api/container-logs/prepupae",
             "container_neonates": "GET/POST /api/container-logs/neonates",
             "microwave_logs": "GET/POST/PUT /api/microwave-logs",
+            "analytics": "GET /api/analytics/larvae, /api/analytics/microwave",
+            "series": "GET /api/container-logs/{prepupae|neonates}/series",
+            "sync": "GET /api/sync?since=<token>",
+            "live": "GET /api/live?tables=<table,...> (Server-Sent Events)",
+            "export": "GET /api/export/{table}?format=csv|ndjson|msgpack|parquet",
+            "recompute": "POST /api/admin/recompute/{table}",
+            "ingest": "POST /api/ingest/{prepupae|neonates|microwave}",
+            "metrics": "/metrics",
             "api_docs": "/docs"
         }
     }
@@ -146,6 +397,12 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+# Prometheus scrape endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    pool = pool_stats(database.engine) if database.engine else None
+    return PlainTextResponse(metrics.render(pool), media_type="text/plain; version=0.0.4")
+
 # API Health check
 @app.get("/api/health")
 async def api_health():
@@ -153,247 +410,191 @@ async def api_health():
 
 # ============ LARVAE LOGS (existing) ============
 
-# Create larvae log
-@app.post("/api/logs")
-async def create_log(data: Dict[str, Any], db: Session = Depends(get_db)):
-    required_fields = ["username", "days_of_age", "larva_weight", "larva_pct", 
-                       "lb_larvae", "lb_feed", "lb_water"]
+LARVAE_REQUIRED_FIELDS = ["username", "days_of_age", "larva_weight", "larva_pct",
+                          "lb_larvae", "lb_feed", "lb_water"]
 
-    for field in required_fields:
+LARVAE_METRIC_INPUTS = ["larva_weight", "larva_pct", "lb_larvae", "lb_feed", "lb_water"]
+
+LARVAE_UPDATE_FIELDS = ["username", "days_of_age", "larva_weight", "larva_pct",
+                        "lb_larvae", "lb_feed", "lb_water", "screen_refeed",
+                        "row_number", "notes", "post_feed_condition"]
+
+# How each larvae payload field becomes a column value, for creates and updates
+LARVAE_PARSERS = {
+    "username": required_text,
+    "days_of_age": int,
+    "larva_weight": whole_number,
+    "larva_pct": whole_number,
+    "lb_larvae": whole_number,
+    "lb_feed": float,
+    "lb_water": float,
+    "screen_refeed": flag_value,
+    "row_number": text_value,
+    "notes": text_value,
+    "post_feed_condition": text_value,
+}
+
+# Convert a larvae payload to column values. The derived metrics are filled in
+# afterwards by derived.apply_larvae_metrics, one vectorized pass per batch.
+def larvae_log_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    require_fields(data, LARVAE_REQUIRED_FIELDS)
+    values = dict(screen_refeed=False, row_number=None, notes=None, post_feed_condition=None)
+    values.update(parse_fields(data, LARVAE_PARSERS, LARVAE_UPDATE_FIELDS))
+    ingest.check_values(LarvaeLog, values)
+    return values
+
+# Create larvae log
+@app.post("/api/logs", response_model=schemas.LarvaeLogOut)
+async def create_log(data: Dict[str, Any], db: AsyncSession = Depends(get_db)):
+    for field in LARVAE_REQUIRED_FIELDS:
         if field not in data:
             raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
 
     try:
-        larva_weight = float(data["larva_weight"])
-        larva_pct = float(data["larva_pct"])
-        lb_larvae = float(data["lb_larvae"])
-        lb_feed = float(data["lb_feed"])
-        lb_water = float(data["lb_water"])
-
-        larvae_count = int(((lb_larvae * (larva_pct / 100)) * 453592) / larva_weight) if larva_weight > 0 else 0
-        feed_per_larvae = round((lb_feed * 453592) / larvae_count, 1) if larvae_count > 0 else 0
-        water_feed_ratio = round(lb_water / lb_feed, 1) if lb_feed > 0 else 0
-
-        log = LarvaeLog(
-            username=data["username"],
-            days_of_age=int(data["days_of_age"]),
-            larva_weight=int(larva_weight),
-            larva_pct=int(larva_pct),
-            lb_larvae=int(lb_larvae),
-            lb_feed=lb_feed,
-            lb_water=lb_water,
-            screen_refeed=data.get("screen_refeed", False),
-            row_number=data.get("row_number"),
-            notes=data.get("notes"),
-            post_feed_condition=data.get("post_feed_condition"),  # <-- NEW
-            larvae_count=larvae_count,
-            feed_per_larvae=feed_per_larvae,
-            water_feed_ratio=water_feed_ratio
-        )
+        row = await insert_returning(db, LarvaeLog, derived.apply_larvae_metrics([larvae_log_values(data)])[0])
+        await rollups.apply(db, LarvaeLog, new=[row._mapping])
+        await db.commit()
+        await cache.invalidate(LarvaeLog)
+        await live.hub.publish(live.insert_event(LarvaeLog, [row]))
 
-        db.add(log)
-        db.commit()
-        db.refresh(log)
-
-        return {
-            "id": str(log.id),
-            "timestamp": log.timestamp.isoformat(),
-            "username": log.username,
-            "days_of_age": log.days_of_age,
-            "larva_weight": log.larva_weight,
-            "larva_pct": log.larva_pct,
-            "lb_larvae": log.lb_larvae,
-            "lb_feed": log.lb_feed,
-            "lb_water": log.lb_water,
-            "screen_refeed": log.screen_refeed,
-            "row_number": log.row_number,
-            "notes": log.notes,
-            "post_feed_condition": log.post_feed_condition,  # <-- NEW
-            "larvae_count": log.larvae_count,
-            "feed_per_larvae": log.feed_per_larvae,
-            "water_feed_ratio": log.water_feed_ratio
-        }
-    except ValueError as e:
+        return ORJSONResponse(serializers.serialize_row(LarvaeLog, row))
+    except (TypeError, ValueError) as e:
         raise HTTPException(status_code=400, detail=f"Invalid data format: {str(e)}")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating log: {str(e)}")
 
+# Create many larvae logs in one INSERT (JSON array or NDJSON body)
+@app.post("/api/logs/bulk")
+async def create_logs_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    rows = await read_bulk_rows(request)
+    return await bulk_insert(db, LarvaeLog, rows, larvae_log_values, derived.apply_larvae_metrics)
+
 
 # Get larvae logs
-@app.get("/api/logs")
+@app.get("/api/logs",
+         response_model=Union[List[schemas.LarvaeLogOut], schemas.Page[schemas.LarvaeLogOut]])
 async def get_logs(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    username: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(LarvaeLog)
-
-    if username:
-        query = query.filter(LarvaeLog.username == username)
-
-    logs = query.order_by(LarvaeLog.timestamp.desc()).offset(skip).limit(limit).all()
-
-    return [{
-        "id": str(log.id),
-        "timestamp": log.timestamp.isoformat(),
-        "username": log.username,
-        "days_of_age": log.days_of_age,
-        "larva_weight": log.larva_weight,
-        "larva_pct": log.larva_pct,
-        "lb_larvae": log.lb_larvae,
-        "lb_feed": log.lb_feed,
-        "lb_water": log.lb_water,
-        "screen_refeed": log.screen_refeed,
-        "row_number": log.row_number,
-        "notes": log.notes,
-        "post_feed_condition": log.post_feed_condition,  # <-- NEW
-        "larvae_count": log.larvae_count,
-        "feed_per_larvae": log.feed_per_larvae,
-        "water_feed_ratio": log.water_feed_ratio
-    } for log in logs]
+    return await list_logs(request, db, LarvaeLog, skip, limit, cursor)
 
 
 # Get single larvae log by ID
-@app.get("/api/logs/{log_id}")
-async def get_log(log_id: str, db: Session = Depends(get_db)):
+@app.get("/api/logs/{log_id}", response_model=schemas.LarvaeLogOut)
+async def get_log(log_id: str, db: AsyncSession = Depends(get_db)):
     try:
-        log = db.query(LarvaeLog).filter(LarvaeLog.id == uuid.UUID(log_id)).first()
-        if not log:
-            raise HTTPException(status_code=404, detail="Log not found")
+        row = await fetch_row(db, LarvaeLog, uuid.UUID(log_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid UUID format")
+    if row is None:
+        raise HTTPException(status_code=404, detail="Log not found")
+    return ORJSONResponse(serializers.serialize_row(LarvaeLog, row))
 
-        return {
-            "id": str(log.id),
-            "timestamp": log.timestamp.isoformat(),
-            "username": log.username,
-            "days_of_age": log.days_of_age,
-            "larva_weight": log.larva_weight,
-            "larva_pct": log.larva_pct,
-            "lb_larvae": log.lb_larvae,
-            "lb_feed": log.lb_feed,
-            "lb_water": log.lb_water,
-            "screen_refeed": log.screen_refeed,
-            "row_number": log.row_number,
-            "notes": log.notes,
-            "post_feed_condition": log.post_feed_condition,  # <-- NEW
-            "larvae_count": log.larvae_count,
-            "feed_per_larvae": log.feed_per_larvae,
-            "water_feed_ratio": log.water_feed_ratio
-        }
+@app.put("/api/logs/{log_id}", response_model=schemas.LarvaeLogOut)
+async def update_log(log_id: str, data: Dict[str, Any], db: AsyncSession = Depends(get_db)):
+    try:
+        log_id = uuid.UUID(log_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID format")
 
-@app.put("/api/logs/{log_id}")
-async def update_log(log_id: str, data: Dict[str, Any], db: Session = Depends(get_db)):
+    # Update fields if provided
+    try:
+        values = parse_fields(data, LARVAE_PARSERS, LARVAE_UPDATE_FIELDS)
+        ingest.check_values(LarvaeLog, values)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid data format: {str(e)}")
+
     try:
-        log = db.query(LarvaeLog).filter(LarvaeLog.id == uuid.UUID(log_id)).first()
-        if not log:
+        rows = await update_returning(db, LarvaeLog, log_id, values)
+        if rows is None:
             raise HTTPException(status_code=404, detail="Log not found")
+        old, row = rows
 
-        # Update fields if provided
-        for field in [
-            "username", "days_of_age", "larva_weight", "larva_pct",
-            "lb_larvae", "lb_feed", "lb_water", "screen_refeed",
-            "row_number", "notes", "post_feed_condition"
-        ]:
-            if field in data:
-                setattr(log, field, data[field])
-
-        # Recalculate derived values if needed
-        if "larva_weight" in data and "larva_pct" in data and "lb_larvae" in data:
+        # Recalculate derived values from the updated row
+        if any(field in data for field in LARVAE_METRIC_INPUTS):
             try:
-                larva_weight = float(data["larva_weight"])
-                larva_pct = float(data["larva_pct"])
-                lb_larvae = float(data["lb_larvae"])
+                metrics = derived.larvae_metrics(
+                    float(row.lb_larvae), float(row.larva_pct), float(row.larva_weight),
+                    float(row.lb_feed), float(row.lb_water)
+                )
+            except (TypeError, ValueError):
+                metrics = None  # Ignore if something's invalid
+            if metrics:
+                row = await set_returning(db, LarvaeLog, log_id, metrics)
 
-                larvae_count = int(((lb_larvae * (larva_pct / 100)) * 453592) / larva_weight) if larva_weight > 0 else 0
-                log.larvae_count = larvae_count
+        await rollups.apply(db, LarvaeLog, old=[old], new=[row._mapping])
+        await db.commit()
+        await cache.invalidate(LarvaeLog)
+        await live.hub.publish(live.update_event(LarvaeLog, [row]))
 
-                log.feed_per_larvae = round((float(log.lb_feed) * 453592) / larvae_count, 1) if larvae_count > 0 else 0
-            except:
-                pass  # Ignore if something's invalid
-
-        if "lb_feed" in data and "lb_water" in data:
-            try:
-                log.water_feed_ratio = round(float(log.lb_water) / float(log.lb_feed), 1) if float(log.lb_feed) > 0 else 0
-            except:
-                pass
-
-        db.commit()
-        db.refresh(log)
-
-        return {
-            "id": str(log.id),
-            "timestamp": log.timestamp.isoformat(),
-            "username": log.username,
-            "days_of_age": log.days_of_age,
-            "larva_weight": log.larva_weight,
-            "larva_pct": log.larva_pct,
-            "lb_larvae": log.lb_larvae,
-            "lb_feed": log.lb_feed,
-            "lb_water": log.lb_water,
-            "screen_refeed": log.screen_refeed,
-            "row_number": log.row_number,
-            "notes": log.notes,
-            "post_feed_condition": log.post_feed_condition,
-            "larvae_count": log.larvae_count,
-            "feed_per_larvae": log.feed_per_larvae,
-            "water_feed_ratio": log.water_feed_ratio
-        }
-
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid UUID format")
+        return ORJSONResponse(serializers.serialize_row(LarvaeLog, row))
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating log: {str(e)}")
-    
+
 # Delete larvae log by ID
 @app.delete("/api/logs/{log_id}", status_code=204)
-async def delete_log(log_id: str, db: Session = Depends(get_db)):
+async def delete_log(log_id: str, db: AsyncSession = Depends(get_db)):
     try:
-        log = db.query(LarvaeLog).filter(LarvaeLog.id == uuid.UUID(log_id)).first()
-        if not log:
-            raise HTTPException(status_code=404, detail="Log not found")
-
-        db.delete(log)
-        db.commit()
-        return
+        log_id = uuid.UUID(log_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID format")
+
+    try:
+        row = await delete_returning(db, LarvaeLog, log_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Log not found")
+        await rollups.apply(db, LarvaeLog, old=[row._mapping])
+        await db.commit()
+        await cache.invalidate(LarvaeLog)
+        await live.hub.publish(live.delete_event(LarvaeLog, [row.id]))
+        return
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting log: {str(e)}")
 
 # ============ CONTAINER LOGS - PREPUPAE ============
 
-@app.get("/api/container-logs/prepupae")
+@app.get("/api/container-logs/prepupae",
+         response_model=Union[List[schemas.PrepupaeLogOut], schemas.Page[schemas.PrepupaeLogOut]])
 async def get_container_logs_prepupae(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    username: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(ContainerLogPrepupae)
-    
-    if username:
-        query = query.filter(ContainerLogPrepupae.username == username)
-    
-    logs = query.order_by(ContainerLogPrepupae.timestamp.desc()).offset(skip).limit(limit).all()
-    
-    return [{
-        "id": str(log.id),
-        "timestamp": log.timestamp.isoformat(),
-        "username": log.username,
-        "temperature": float(log.temperature) if log.temperature else None,
-        "humidity": float(log.humidity) if log.humidity else None,
-        "prepupae_tubs_added": log.prepupae_tubs_added,
-        "egg_nests_replaced": log.egg_nests_replaced,
-        "notes": log.notes
-    } for log in logs]
-
-@app.post("/api/container-logs/prepupae")
-async def create_container_log_prepupae(data: Dict[str, Any], db: Session = Depends(get_db)):
+    return await list_logs(request, db, ContainerLogPrepupae, skip, limit, cursor)
+
+PREPUPAE_PARSERS = {
+    "username": required_text,
+    "temperature": optional_number(float),
+    "humidity": optional_number(float),
+    "prepupae_tubs_added": optional_number(int),
+    "egg_nests_replaced": optional_number(int),
+    "notes": text_value,
+}
+
+# Convert a payload to column values, checked against the columns (length,
+# DECIMAL precision, integer range) so the database never refuses them
+def prepupae_log_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    require_fields(data, ["username"])
+    values = dict.fromkeys(PREPUPAE_PARSERS)
+    values.update(parse_fields(data, PREPUPAE_PARSERS, list(PREPUPAE_PARSERS)))
+    ingest.check_values(ContainerLogPrepupae, values)
+    return values
+
+@app.post("/api/container-logs/prepupae", response_model=schemas.PrepupaeLogOut)
+async def create_container_log_prepupae(data: Dict[str, Any], db: AsyncSession = Depends(get_db)):
     required_fields = ["username"]
     
     for field in required_fields:
@@ -401,81 +602,76 @@ async def create_container_log_prepupae(data: Dict[str, Any], db: Session = Depe
             raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
     
     try:
-        log = ContainerLogPrepupae(
-            username=data["username"],
-            temperature=float(data["temperature"]) if data.get("temperature") else None,
-            humidity=float(data["humidity"]) if data.get("humidity") else None,
-            prepupae_tubs_added=int(data["prepupae_tubs_added"]) if data.get("prepupae_tubs_added") else None,
-            egg_nests_replaced=int(data["egg_nests_replaced"]) if data.get("egg_nests_replaced") else None,
-            notes=data.get("notes")
-        )
-        
-        db.add(log)
-        db.commit()
-        db.refresh(log)
-        
-        return {
-            "id": str(log.id),
-            "timestamp": log.timestamp.isoformat(),
-            "username": log.username,
-            "temperature": float(log.temperature) if log.temperature else None,
-            "humidity": float(log.humidity) if log.humidity else None,
-            "prepupae_tubs_added": log.prepupae_tubs_added,
-            "egg_nests_replaced": log.egg_nests_replaced,
-            "notes": log.notes
-        }
-    except ValueError as e:
+        row = await insert_returning(db, ContainerLogPrepupae, prepupae_log_values(data))
+        await db.commit()
+        await cache.invalidate(ContainerLogPrepupae)
+        await live.hub.publish(live.insert_event(ContainerLogPrepupae, [row]))
+
+        return ORJSONResponse(serializers.serialize_row(ContainerLogPrepupae, row))
+    except (TypeError, ValueError) as e:
         raise HTTPException(status_code=400, detail=f"Invalid data format: {str(e)}")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating log: {str(e)}")
 
+@app.post("/api/container-logs/prepupae/bulk")
+async def create_container_logs_prepupae_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    rows = await read_bulk_rows(request)
+    return await bulk_insert(db, ContainerLogPrepupae, rows, prepupae_log_values)
+
 @app.delete("/api/container-logs/prepupae/{log_id}", status_code=204)
-async def delete_container_log_prepupae(log_id: str, db: Session = Depends(get_db)):
+async def delete_container_log_prepupae(log_id: str, db: AsyncSession = Depends(get_db)):
     try:
-        log = db.query(ContainerLogPrepupae).filter(ContainerLogPrepupae.id == uuid.UUID(log_id)).first()
-        if not log:
-            raise HTTPException(status_code=404, detail="Log not found")
-
-        db.delete(log)
-        db.commit()
-        return
+        log_id = uuid.UUID(log_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID format")
+
+    try:
+        row = await delete_returning(db, ContainerLogPrepupae, log_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Log not found")
+        await db.commit()
+        await cache.invalidate(ContainerLogPrepupae)
+        await live.hub.publish(live.delete_event(ContainerLogPrepupae, [row.id]))
+        return
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting log: {str(e)}")
 
 # ============ CONTAINER LOGS - NEONATES ============
 
-@app.get("/api/container-logs/neonates")
+@app.get("/api/container-logs/neonates",
+         response_model=Union[List[schemas.NeonatesLogOut], schemas.Page[schemas.NeonatesLogOut]])
 async def get_container_logs_neonates(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    username: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(ContainerLogNeonates)
-    
-    if username:
-        query = query.filter(ContainerLogNeonates.username == username)
-    
-    logs = query.order_by(ContainerLogNeonates.timestamp.desc()).offset(skip).limit(limit).all()
-    
-    return [{
-        "id": str(log.id),
-        "timestamp": log.timestamp.isoformat(),
-        "username": log.username,
-        "temperature": float(log.temperature) if log.temperature else None,
-        "humidity": float(log.humidity) if log.humidity else None,
-        "bait_tubs_replaced": log.bait_tubs_replaced,
-        "shelf_tubs_removed": log.shelf_tubs_removed,
-        "egg_nests_replaced": log.egg_nests_replaced,
-        "notes": log.notes
-    } for log in logs]
-
-@app.post("/api/container-logs/neonates")
-async def create_container_log_neonates(data: Dict[str, Any], db: Session = Depends(get_db)):
+    return await list_logs(request, db, ContainerLogNeonates, skip, limit, cursor)
+
+NEONATES_PARSERS = {
+    "username": required_text,
+    "temperature": optional_number(float),
+    "humidity": optional_number(float),
+    "bait_tubs_replaced": optional_number(int),
+    "shelf_tubs_removed": optional_number(int),
+    "egg_nests_replaced": optional_number(int),
+    "notes": text_value,
+}
+
+def neonates_log_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    require_fields(data, ["username"])
+    values = dict.fromkeys(NEONATES_PARSERS)
+    values.update(parse_fields(data, NEONATES_PARSERS, list(NEONATES_PARSERS)))
+    ingest.check_values(ContainerLogNeonates, values)
+    return values
+
+@app.post("/api/container-logs/neonates", response_model=schemas.NeonatesLogOut)
+async def create_container_log_neonates(data: Dict[str, Any], db: AsyncSession = Depends(get_db)):
     required_fields = ["username"]
     
     for field in required_fields:
@@ -483,89 +679,79 @@ async def create_container_log_neonates(data: Dict[str, Any], db: Session = Depe
             raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
     
     try:
-        log = ContainerLogNeonates(
-            username=data["username"],
-            temperature=float(data["temperature"]) if data.get("temperature") else None,
-            humidity=float(data["humidity"]) if data.get("humidity") else None,
-            bait_tubs_replaced=int(data["bait_tubs_replaced"]) if data.get("bait_tubs_replaced") else None,
-            shelf_tubs_removed=int(data["shelf_tubs_removed"]) if data.get("shelf_tubs_removed") else None,
-            egg_nests_replaced=int(data["egg_nests_replaced"]) if data.get("egg_nests_replaced") else None,
-            notes=data.get("notes")
-        )
-        
-        db.add(log)
-        db.commit()
-        db.refresh(log)
-        
-        return {
-            "id": str(log.id),
-            "timestamp": log.timestamp.isoformat(),
-            "username": log.username,
-            "temperature": float(log.temperature) if log.temperature else None,
-            "humidity": float(log.humidity) if log.humidity else None,
-            "bait_tubs_replaced": log.bait_tubs_replaced,
-            "shelf_tubs_removed": log.shelf_tubs_removed,
-            "egg_nests_replaced": log.egg_nests_replaced,
-            "notes": log.notes
-        }
-    except ValueError as e:
+        row = await insert_returning(db, ContainerLogNeonates, neonates_log_values(data))
+        await db.commit()
+        await cache.invalidate(ContainerLogNeonates)
+        await live.hub.publish(live.insert_event(ContainerLogNeonates, [row]))
+
+        return ORJSONResponse(serializers.serialize_row(ContainerLogNeonates, row))
+    except (TypeError, ValueError) as e:
         raise HTTPException(status_code=400, detail=f"Invalid data format: {str(e)}")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating log: {str(e)}")
 
+@app.post("/api/container-logs/neonates/bulk")
+async def create_container_logs_neonates_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    rows = await read_bulk_rows(request)
+    return await bulk_insert(db, ContainerLogNeonates, rows, neonates_log_values)
+
 @app.delete("/api/container-logs/neonates/{log_id}", status_code=204)
-async def delete_container_log_neonates(log_id: str, db: Session = Depends(get_db)):
+async def delete_container_log_neonates(log_id: str, db: AsyncSession = Depends(get_db)):
     try:
-        log = db.query(ContainerLogNeonates).filter(ContainerLogNeonates.id == uuid.UUID(log_id)).first()
-        if not log:
-            raise HTTPException(status_code=404, detail="Log not found")
-
-        db.delete(log)
-        db.commit()
-        return
+        log_id = uuid.UUID(log_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID format")
+
+    try:
+        row = await delete_returning(db, ContainerLogNeonates, log_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Log not found")
+        await db.commit()
+        await cache.invalidate(ContainerLogNeonates)
+        await live.hub.publish(live.delete_event(ContainerLogNeonates, [row.id]))
+        return
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting log: {str(e)}")
 
 # ============ MICROWAVE LOGS ============
 
-@app.get("/api/microwave-logs")
+@app.get("/api/microwave-logs",
+         response_model=Union[List[schemas.MicrowaveLogOut], schemas.Page[schemas.MicrowaveLogOut]])
 async def get_microwave_logs(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    username: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(MicrowaveLog)
-    
-    if username:
-        query = query.filter(MicrowaveLog.username == username)
-    
-    logs = query.order_by(MicrowaveLog.timestamp.desc()).offset(skip).limit(limit).all()
-    
-    return [{
-        "id": str(log.id),
-        "timestamp": log.timestamp.isoformat(),
-        "username": log.username,
-        "microwave_power_gen1": float(log.microwave_power_gen1) if log.microwave_power_gen1 else None,
-        "microwave_power_gen2": float(log.microwave_power_gen2) if log.microwave_power_gen2 else None,
-        "fan_speed_cavity1": float(log.fan_speed_cavity1) if log.fan_speed_cavity1 else None,
-        "fan_speed_cavity2": float(log.fan_speed_cavity2) if log.fan_speed_cavity2 else None,
-        "belt_speed": float(log.belt_speed) if log.belt_speed else None,
-        "lb_larvae_per_tub": float(log.lb_larvae_per_tub) if log.lb_larvae_per_tub else None,
-        "num_ramp_up_tubs": log.num_ramp_up_tubs,
-        "num_ramp_down_tubs": log.num_ramp_down_tubs,
-        "tubs_live_larvae": log.tubs_live_larvae,
-        "lb_dried_larvae": float(log.lb_dried_larvae) if log.lb_dried_larvae else None,
-        "yield_percentage": float(log.yield_percentage) if log.yield_percentage else None,
-        "notes": log.notes
-    } for log in logs]
-
-@app.post("/api/microwave-logs")
-async def create_microwave_log(data: Dict[str, Any], db: Session = Depends(get_db)):
+    return await list_logs(request, db, MicrowaveLog, skip, limit, cursor)
+
+MICROWAVE_PARSERS = {
+    "username": required_text,
+    "microwave_power_gen1": optional_number(float),
+    "microwave_power_gen2": optional_number(float),
+    "fan_speed_cavity1": optional_number(float),
+    "fan_speed_cavity2": optional_number(float),
+    "belt_speed": optional_number(float),
+    "lb_larvae_per_tub": optional_number(float),
+    "num_ramp_up_tubs": optional_number(int),
+    "num_ramp_down_tubs": optional_number(int),
+    "notes": text_value,
+}
+
+def microwave_log_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    require_fields(data, ["username"])
+    values = dict.fromkeys(MICROWAVE_PARSERS)
+    values.update(parse_fields(data, MICROWAVE_PARSERS, list(MICROWAVE_PARSERS)))
+    ingest.check_values(MicrowaveLog, values)
+    return values
+
+@app.post("/api/microwave-logs", response_model=schemas.MicrowaveLogOut)
+async def create_microwave_log(data: Dict[str, Any], db: AsyncSession = Depends(get_db)):
     required_fields = ["username"]
     
     for field in required_fields:
@@ -573,105 +759,405 @@ async def create_microwave_log(data: Dict[str, Any], db: Session = Depends(get_d
             raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
     
     try:
-        log = MicrowaveLog(
-            username=data["username"],
-            microwave_power_gen1=float(data["microwave_power_gen1"]) if data.get("microwave_power_gen1") else None,
-            microwave_power_gen2=float(data["microwave_power_gen2"]) if data.get("microwave_power_gen2") else None,
-            fan_speed_cavity1=float(data["fan_speed_cavity1"]) if data.get("fan_speed_cavity1") else None,
-            fan_speed_cavity2=float(data["fan_speed_cavity2"]) if data.get("fan_speed_cavity2") else None,
-            belt_speed=float(data["belt_speed"]) if data.get("belt_speed") else None,
-            lb_larvae_per_tub=float(data["lb_larvae_per_tub"]) if data.get("lb_larvae_per_tub") else None,
-            num_ramp_up_tubs=int(data["num_ramp_up_tubs"]) if data.get("num_ramp_up_tubs") else None,
-            num_ramp_down_tubs=int(data["num_ramp_down_tubs"]) if data.get("num_ramp_down_tubs") else None,
-            notes=data.get("notes")
-        )
-        
-        db.add(log)
-        db.commit()
-        db.refresh(log)
-        
-        return {
-            "id": str(log.id),
-            "timestamp": log.timestamp.isoformat(),
-            "username": log.username,
-            "microwave_power_gen1": float(log.microwave_power_gen1) if log.microwave_power_gen1 else None,
-            "microwave_power_gen2": float(log.microwave_power_gen2) if log.microwave_power_gen2 else None,
-            "fan_speed_cavity1": float(log.fan_speed_cavity1) if log.fan_speed_cavity1 else None,
-            "fan_speed_cavity2": float(log.fan_speed_cavity2) if log.fan_speed_cavity2 else None,
-            "belt_speed": float(log.belt_speed) if log.belt_speed else None,
-            "lb_larvae_per_tub": float(log.lb_larvae_per_tub) if log.lb_larvae_per_tub else None,
-            "num_ramp_up_tubs": log.num_ramp_up_tubs,
-            "num_ramp_down_tubs": log.num_ramp_down_tubs,
-            "tubs_live_larvae": log.tubs_live_larvae,
-            "lb_dried_larvae": float(log.lb_dried_larvae) if log.lb_dried_larvae else None,
-            "yield_percentage": float(log.yield_percentage) if log.yield_percentage else None,
-            "notes": log.notes
-        }
-    except ValueError as e:
+        row = await insert_returning(db, MicrowaveLog, microwave_log_values(data))
+        await rollups.apply(db, MicrowaveLog, new=[row._mapping])
+        await db.commit()
+        await cache.invalidate(MicrowaveLog)
+        await live.hub.publish(live.insert_event(MicrowaveLog, [row]))
+
+        return ORJSONResponse(serializers.serialize_row(MicrowaveLog, row))
+    except (TypeError, ValueError) as e:
         raise HTTPException(status_code=400, detail=f"Invalid data format: {str(e)}")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating log: {str(e)}")
 
-@app.put("/api/microwave-logs/{log_id}")
-async def update_microwave_log(log_id: str, data: Dict[str, Any], db: Session = Depends(get_db)):
+@app.post("/api/microwave-logs/bulk")
+async def create_microwave_logs_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    rows = await read_bulk_rows(request)
+    return await bulk_insert(db, MicrowaveLog, rows, microwave_log_values)
+
+# Post-production fields set after a run; empty values clear them
+MICROWAVE_UPDATE_PARSERS = {
+    "tubs_live_larvae": optional_number(int),
+    "lb_dried_larvae": optional_number(float),
+    "notes": text_value,
+}
+
+@app.put("/api/microwave-logs/{log_id}", response_model=schemas.MicrowaveLogOut)
+async def update_microwave_log(log_id: str, data: Dict[str, Any], db: AsyncSession = Depends(get_db)):
     try:
-        log = db.query(MicrowaveLog).filter(MicrowaveLog.id == uuid.UUID(log_id)).first()
-        if not log:
-            raise HTTPException(status_code=404, detail="Log not found")
-        
-        # Update post-production fields
-        if "tubs_live_larvae" in data:
-            log.tubs_live_larvae = int(data["tubs_live_larvae"]) if data["tubs_live_larvae"] else None
-        if "lb_dried_larvae" in data:
-            log.lb_dried_larvae = float(data["lb_dried_larvae"]) if data["lb_dried_larvae"] else None
-        if "notes" in data:
-            log.notes = data["notes"]
-        
-        # Calculate yield if we have the necessary data
-        if (log.tubs_live_larvae and log.lb_dried_larvae and 
-            log.lb_larvae_per_tub and log.tubs_live_larvae > 0 and log.lb_larvae_per_tub > 0):
-            total_larvae_lbs = float(log.tubs_live_larvae) * float(log.lb_larvae_per_tub)
-            log.yield_percentage = (float(log.lb_dried_larvae) / total_larvae_lbs) * 100
-        
-        db.commit()
-        db.refresh(log)
-        
-        return {
-            "id": str(log.id),
-            "timestamp": log.timestamp.isoformat(),
-            "username": log.username,
-            "microwave_power_gen1": float(log.microwave_power_gen1) if log.microwave_power_gen1 else None,
-            "microwave_power_gen2": float(log.microwave_power_gen2) if log.microwave_power_gen2 else None,
-            "fan_speed_cavity1": float(log.fan_speed_cavity1) if log.fan_speed_cavity1 else None,
-            "fan_speed_cavity2": float(log.fan_speed_cavity2) if log.fan_speed_cavity2 else None,
-            "belt_speed": float(log.belt_speed) if log.belt_speed else None,
-            "lb_larvae_per_tub": float(log.lb_larvae_per_tub) if log.lb_larvae_per_tub else None,
-            "num_ramp_up_tubs": log.num_ramp_up_tubs,
-            "num_ramp_down_tubs": log.num_ramp_down_tubs,
-            "tubs_live_larvae": log.tubs_live_larvae,
-            "lb_dried_larvae": float(log.lb_dried_larvae) if log.lb_dried_larvae else None,
-            "yield_percentage": float(log.yield_percentage) if log.yield_percentage else None,
-            "notes": log.notes
-        }
+        log_id = uuid.UUID(log_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid UUID format")
+
+    # Update post-production fields
+    try:
+        values = parse_fields(data, MICROWAVE_UPDATE_PARSERS, list(MICROWAVE_UPDATE_PARSERS))
+        ingest.check_values(MicrowaveLog, values)
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid data format: {str(e)}")
+        raise HTTPException(status_code=422, detail=f"Invalid data format: {str(e)}")
+
+    try:
+        rows = await update_returning(db, MicrowaveLog, log_id, values)
+        if rows is None:
+            raise HTTPException(status_code=404, detail="Log not found")
+        old, row = rows
+
+        # Recalculate yield from the updated row. Clearing an input clears
+        # it too, as a recompute of the row would.
+        if "tubs_live_larvae" in values or "lb_dried_larvae" in values:
+            metrics = derived.microwave_metrics(row.tubs_live_larvae, row.lb_larvae_per_tub, row.lb_dried_larvae)
+            row = await set_returning(db, MicrowaveLog, log_id, metrics)
+
+        await rollups.apply(db, MicrowaveLog, old=[old], new=[row._mapping])
+        await db.commit()
+        await cache.invalidate(MicrowaveLog)
+        await live.hub.publish(live.update_event(MicrowaveLog, [row]))
+
+        return ORJSONResponse(serializers.serialize_row(MicrowaveLog, row))
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating log: {str(e)}")
 
 @app.delete("/api/microwave-logs/{log_id}", status_code=204)
-async def delete_microwave_log(log_id: str, db: Session = Depends(get_db)):
+async def delete_microwave_log(log_id: str, db: AsyncSession = Depends(get_db)):
     try:
-        log = db.query(MicrowaveLog).filter(MicrowaveLog.id == uuid.UUID(log_id)).first()
-        if not log:
-            raise HTTPException(status_code=404, detail="Log not found")
+        log_id = uuid.UUID(log_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid UUID format")
 
-        db.delete(log)
-        db.commit()
+    try:
+        row = await delete_returning(db, MicrowaveLog, log_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Log not found")
+        await rollups.apply(db, MicrowaveLog, old=[row._mapping])
+        await db.commit()
+        await cache.invalidate(MicrowaveLog)
+        await live.hub.publish(live.delete_event(MicrowaveLog, [row.id]))
         return
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error deleting log: {str(e)}")
+
+# ============ SENSOR INGEST ============
+
+INGEST_TABLES = {
+    "prepupae": (ContainerLogPrepupae, prepupae_log_values),
+    "neonates": (ContainerLogNeonates, neonates_log_values),
+    "microwave": (MicrowaveLog, microwave_log_values),
+}
+
+# Automated readings (JSON array or NDJSON). Rows are validated like /bulk,
+# against their columns' types and ranges, then queued for the
+# background writer; the response comes back before they
+# reach the database. A reading may carry its own ISO "timestamp", otherwise
+# it's stamped on arrival.
+@app.post("/api/ingest/{kind}", status_code=202)
+async def ingest_readings(kind: str, request: Request):
+    if kind not in INGEST_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest kind: {kind}")
+    if request.app.state.ingest is None:
+        raise HTTPException(status_code=500, detail="Database not configured")
+    model, build_values = INGEST_TABLES[kind]
+
+    received = datetime.now(timezone.utc)
+    values, errors = [], []
+    for index, row in enumerate(await read_bulk_rows(request)):
+        try:
+            if isinstance(row, Exception):
+                raise row
+            if not isinstance(row, dict):
+                raise ValueError("Row must be a JSON object")
+            row_values = build_values(row)
+            row_values["timestamp"] = datetime.fromisoformat(row["timestamp"]) if row.get("timestamp") else received
+            values.append(row_values)
+        except (ValueError, TypeError) as e:
+            errors.append({"index": index, "detail": str(e)})
+
+    try:
+        if values:
+            request.app.state.ingest.put(model, values)
+    except ingest.QueueFull:
+        raise HTTPException(status_code=503, detail="Ingest queue is full", headers={"Retry-After": "1"})
+    return {"accepted": len(values), "errors": errors}
+
+# ============ ANALYTICS ============
+
+async def get_analytics(request: Request, db: AsyncSession, spec, bucket, group_by, start, end):
+    try:
+        query = analytics.bucketed_query(spec, bucket, group_by, start, end, db.bind.dialect.name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result = await db.execute(query)
+    return serializers.negotiated_response(request, {
+        "bucket": bucket,
+        "group_by": group_by,
+        "series": [analytics.serialize_bucket(row) for row in result]
+    })
+
+# Feeding trends: avg feed_per_larvae, total lb_feed and larvae_count per bucket
+@app.get("/api/analytics/larvae")
+async def get_larvae_analytics(
+    request: Request,
+    bucket: str = "day",
+    group_by: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_db)
+):
+    return await get_analytics(request, db, analytics.LARVAE, bucket, group_by, start, end)
+
+# Microwave trends: avg yield_percentage and belt_speed per bucket
+@app.get("/api/analytics/microwave")
+async def get_microwave_analytics(
+    request: Request,
+    bucket: str = "day",
+    group_by: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_db)
+):
+    return await get_analytics(request, db, analytics.MICROWAVE, bucket, group_by, start, end)
+
+SERIES_TABLES = {"prepupae": ContainerLogPrepupae, "neonates": ContainerLogNeonates}
+
+# Container temperature/humidity downsampled to about `points` points per
+# series (see app/series.py), for charting dense sensor data
+@app.get("/api/container-logs/{kind}/series")
+async def get_container_series(
+    request: Request,
+    kind: str,
+    method: str = "lttb",
+    points: int = 1000,
+    username: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_db)
+):
+    if kind not in SERIES_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown container kind: {kind}")
+    if method not in series.METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of: {', '.join(series.METHODS)}")
+    if not 3 <= points <= 10000:
+        raise HTTPException(status_code=400, detail="points must be between 3 and 10000")
+
+    model = SERIES_TABLES[kind]
+
+    async def load():
+        try:
+            return await series.load(db, model, method, points, username, start, end,
+                                     settings.SERIES_MAX_ROWS), {}
+        except series.TooManyRows as e:
+            raise HTTPException(status_code=413, detail=f"{e}; use method=minmax or a narrower from/to")
+
+    return await cache.list_response(request, model, load)
+
+# ============ SYNC ============
+
+# Rows changed and deleted since a token from a previous call (see
+# app/sync.py); since=0 starts from scratch
+@app.get("/api/sync")
+async def get_sync(
+    since: str = "0",
+    limit: int = 1000,
+    db: AsyncSession = Depends(get_db)
+):
+    if not 1 <= limit <= sync.MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {sync.MAX_LIMIT}")
+    try:
+        position = sync.decode_token(since)
     except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid UUID format")
+        raise HTTPException(status_code=400, detail="Invalid since token")
+    return ORJSONResponse(await sync.changes(db, position, limit))
+
+# ============ LIVE ============
+
+LIVE_TABLES = [model.__tablename__ for model in [LarvaeLog, ContainerLogPrepupae, ContainerLogNeonates, MicrowaveLog]]
+
+# Server-Sent Events stream of writes to the given tables (all four by
+# default) as they commit; see app/live.py
+@app.get("/api/live")
+async def get_live(tables: Optional[str] = None):
+    names = tables.split(",") if tables else LIVE_TABLES
+    unknown = [name for name in names if name not in LIVE_TABLES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown table: {', '.join(unknown)}")
+
+    subscription = live.hub.subscribe(names)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many live subscribers", headers={"Retry-After": "30"})
+    return StreamingResponse(
+        live.hub.stream(subscription, settings.LIVE_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ============ EXPORT ============
+
+EXPORT_TABLES = {model.__tablename__: model for model in
+                 [LarvaeLog, ContainerLogPrepupae, ContainerLogNeonates, MicrowaveLog]}
+EXPORT_BATCH_SIZE = 1000
+
+# Stream a whole table (optionally filtered) as CSV, NDJSON, MessagePack or
+# Parquet (CSV unless the format is given or Accept asks for MessagePack). Rows
+# come off a server-side cursor EXPORT_BATCH_SIZE at a time and are encoded as
+# they arrive, so memory stays flat regardless of export size.
+@app.get("/api/export/{table}")
+async def export_table(
+    request: Request,
+    table: str,
+    fmt: Optional[str] = Query(None, alias="format"),
+    username: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to")
+):
+    if database.SessionLocal is None:
+        raise HTTPException(status_code=500, detail="Database not configured")
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+    if fmt is None:
+        fmt = "msgpack" if serializers.negotiate(request) == serializers.MSGPACK else "csv"
+    if fmt not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(export.FORMATS)}")
+    if fmt == "parquet" and export.pa is None:
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+    if fmt == "msgpack" and export.msgpack is None:
+        raise HTTPException(status_code=400, detail="MessagePack export requires msgpack")
+
+    model = EXPORT_TABLES[table]
+    query = select(*model.__table__.columns)
+    if username:
+        query = query.where(model.username == username)
+    if start:
+        query = query.where(model.timestamp >= start)
+    if end:
+        query = query.where(model.timestamp < end)
+    query = query.order_by(model.timestamp, model.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    # The session lives inside the generator so it stays open while streaming
+    async def partitions():
+        async with database.SessionLocal() as db:
+            result = await db.stream(query)
+            async for rows in result.partitions():
+                yield rows
+
+    columns = [column.name for column in model.__table__.columns]
+    if fmt == "csv":
+        body = export.encode_csv(columns, partitions())
+    elif fmt == "ndjson":
+        body = export.encode_ndjson(columns, partitions())
+    elif fmt == "msgpack":
+        body = export.encode_msgpack(columns, partitions())
+    else:
+        body = export.encode_parquet(model.__table__, partitions())
+
+    media_type, extension = export.FORMATS[fmt]
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{table}.{extension}"'
+    })
+
+# ============ ADMIN ============
+
+# Regenerate the dashboard rollup tables from the log tables
+@app.post("/api/admin/rollups/rebuild")
+async def rebuild_rollups(db: AsyncSession = Depends(get_db)):
+    try:
+        rebuilt = await rollups.rebuild(db)
+        await db.commit()
     except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error deleting log: {str(e)}")
\ No newline at end of file
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error rebuilding rollups: {str(e)}")
+    return {"rebuilt": rebuilt}
+
+# Connection pool usage, for sizing DB_POOL_SIZE / DB_MAX_OVERFLOW
+@app.get("/api/admin/pool")
+async def get_pool_stats():
+    if database.engine is None:
+        raise HTTPException(status_code=500, detail="Database not configured")
+    return pool_stats(database.engine)
+
+RECOMPUTE_BATCH_SIZE = 5000
+
+# Derived columns per table: (model, input columns, metric function)
+RECOMPUTE_TABLES = {
+    "larvae_logs": (LarvaeLog, ["lb_larvae", "larva_pct", "larva_weight", "lb_feed", "lb_water"],
+                    derived.larvae_metrics),
+    "microwave_logs": (MicrowaveLog, ["tubs_live_larvae", "lb_larvae_per_tub", "lb_dried_larvae"],
+                       derived.microwave_metrics),
+}
+
+# Recompute all derived columns for a date range. Rows are walked in
+# (timestamp, id) batches; each batch is computed as arrays in one pass and
+# written back with a single executemany UPDATE. Derived columns feed the
+# rollups, so each batch also moves its rows' contributions to the new
+# values in the same transaction (rollups.apply, from the rows as read
+# before and after). A failure there rolls the batch back and is reported
+# as a rollup error; earlier batches stay committed either way. On Postgres
+# each batch is read FOR UPDATE, so a PUT can't change a row between the
+# read and the write-back and have its inputs paired with stale metrics.
+@app.post("/api/admin/recompute/{table}")
+async def recompute_derived(
+    table: str,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_db)
+):
+    if table not in RECOMPUTE_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+    model, inputs, compute = RECOMPUTE_TABLES[table]
+
+    # Inputs first, then whatever else the rollups need from the row
+    spec = rollups.SPECS.get(model)
+    rolled_up = ["username"] + (spec["sums"] + spec["counts"] if spec else [])
+    selected = [model.id, model.timestamp] + [getattr(model, column) for column in
+                                              inputs + [name for name in dict.fromkeys(rolled_up) if name not in inputs]]
+    query = select(*selected)
+    if db.bind.dialect.name == "postgresql":
+        query = query.with_for_update()
+    if start:
+        query = query.where(model.timestamp >= start)
+    if end:
+        query = query.where(model.timestamp < end)
+
+    updated = 0
+    last = None
+    while True:
+        try:
+            batch = query if last is None else query.where(tuple_(model.timestamp, model.id) > last)
+            result = await db.execute(batch.order_by(model.timestamp, model.id).limit(RECOMPUTE_BATCH_SIZE))
+            rows = result.all()
+            if not rows:
+                break
+
+            columns = list(zip(*rows))
+            metrics = {name: derived.to_list(values) for name, values in compute(*columns[2:2 + len(inputs)]).items()}
+            version = await sync.next_version(db)
+            await db.execute(update(model), [
+                {"id": log_id, "version": version, **{name: values[i] for name, values in metrics.items()}}
+                for i, log_id in enumerate(columns[0])
+            ])
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Error recomputing {table} after {updated} rows: {str(e)}")
+
+        try:
+            new = (await db.execute(select(*selected).where(model.id.in_(columns[0])))).all()
+            await rollups.apply(db, model, old=[row._mapping for row in rows], new=[row._mapping for row in new])
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Error updating {table} rollups after {updated} rows; "
+                                                        f"the batch was rolled back: {str(e)}")
+        await cache.invalidate(model)
+
+        updated += len(rows)
+        last = (rows[-1].timestamp, rows[-1].id)
+
+    await live.hub.publish(live.reload_event(model))
+    return {"table": table, "updated": updated}
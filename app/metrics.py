@@ -0,0 +1,157 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+# Request and query metrics in Prometheus text format, served at /metrics.
+# MetricsMiddleware times each request and labels it with the route template
+# (/api/logs/{log_id}, not the concrete path, so label sets stay bounded).
+# Engine events count the queries and query time of the request in progress,
+# found through a context variable. Everything is plain counters in process
+# memory, so each worker reports its own numbers.
+
+POOL_GAUGES = ["size", "checked_in", "checked_out", "overflow", "waiting"]
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+# Queries issued by the current request
+class QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+current_queries: ContextVar[Optional[QueryStats]] = ContextVar("current_queries", default=None)
+
+requests_total = defaultdict(int)  # (method, route, status) -> count
+errors_total = defaultdict(int)  # (method, route) -> count
+durations = defaultdict(Histogram)  # (method, route) -> request seconds
+queries_total = defaultdict(int)  # (method, route) -> queries
+query_seconds_total = defaultdict(float)  # (method, route) -> seconds
+shed_total = defaultdict(int)  # reason -> requests turned away by app/admission.py
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        queries = QueryStats()
+        token = current_queries.set(queries)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_queries.reset(token)
+            key = (scope["method"], route_template(scope))
+            requests_total[key + (status,)] += 1
+            if status >= 500:
+                errors_total[key] += 1
+            durations[key].observe(elapsed)
+            if queries.count:
+                queries_total[key] += queries.count
+                query_seconds_total[key] += queries.seconds
+
+
+def instrument_engine(engine):
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries = current_queries.get()
+        if queries is not None:
+            queries.count += 1
+            queries.seconds += time.perf_counter() - context._metrics_started
+
+
+def _labels(**labels) -> str:
+    pairs = ",".join(f'{name}="{value}"' for name, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def render(pool: Optional[dict] = None) -> str:
+    lines = [
+        "# HELP http_requests_total Requests by route template and status code.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route, status), count in sorted(requests_total.items()):
+        lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    lines += ["# HELP http_request_errors_total Requests that failed with a 5xx or an exception.",
+              "# TYPE http_request_errors_total counter"]
+    for (method, route), count in sorted(errors_total.items()):
+        lines.append(f"http_request_errors_total{_labels(method=method, route=route)} {count}")
+
+    lines += ["# HELP http_request_duration_seconds Request latency.",
+              "# TYPE http_request_duration_seconds histogram"]
+    for (method, route), histogram in sorted(durations.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f"http_request_duration_seconds_bucket"
+                         f"{_labels(method=method, route=route, le=bound)} {cumulative}")
+        lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route)} {histogram.total}")
+        lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route)} {histogram.count}")
+
+    lines += ["# HELP db_queries_total Database queries issued while handling requests.",
+              "# TYPE db_queries_total counter"]
+    for (method, route), count in sorted(queries_total.items()):
+        lines.append(f"db_queries_total{_labels(method=method, route=route)} {count}")
+
+    lines += ["# HELP db_query_seconds_total Time spent in database queries while handling requests.",
+              "# TYPE db_query_seconds_total counter"]
+    for (method, route), seconds in sorted(query_seconds_total.items()):
+        lines.append(f"db_query_seconds_total{_labels(method=method, route=route)} {seconds}")
+
+    lines += ["# HELP http_requests_shed_total Requests rejected by admission control, by reason.",
+              "# TYPE http_requests_shed_total counter"]
+    for reason, count in sorted(shed_total.items()):
+        lines.append(f"http_requests_shed_total{_labels(reason=reason)} {count}")
+
+    # Connection pool gauges (from app.database.pool_stats)
+    for name in POOL_GAUGES:
+        if pool and name in pool:
+            lines += [f"# TYPE db_pool_{name} gauge", f"db_pool_{name} {pool[name]}"]
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,31 @@
+import asyncio
+import os
+
+from alembic import command
+from alembic.config import Config
+
+from app import database, partitions
+from app.core.config import settings
+
+# Schema setup for a deploy: `python -m app.migrate` applies the Alembic
+# migrations and creates the upcoming log partitions. It runs once per
+# deploy (render.yaml's preDeployCommand), not on every worker boot; the app
+# itself never changes the schema at import or startup.
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+async def create_partitions():
+    database.init_engine()
+    async with database.SessionLocal() as db:
+        created = await partitions.ensure_partitions(db, settings.PARTITION_MONTHS_AHEAD)
+        await db.commit()
+    await database.dispose_engine()
+    return created
+
+
+if __name__ == "__main__":
+    if not settings.DATABASE_URL:
+        raise SystemExit("DATABASE_URL is not set")
+    command.upgrade(Config(ALEMBIC_INI), "head")
+    print({"partitions_created": asyncio.run(create_partitions())})
@@ -1,45 +1,94 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, DECIMAL
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Boolean, DateTime, Text, DECIMAL, Index, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
-from app.database import Base
+from datetime import datetime, timezone
+import uuid
 
-# Your existing model
-class Log(Base):
-    __tablename__ = "logs"
+Base = declarative_base()
+
+# Every list endpoint filters on username and pages newest-first on
+# (timestamp, id), so each table gets one index per access path.
+# Schema changes ship as Alembic migrations (see alembic/versions). On
+# Postgres the log tables are partitioned by month on timestamp (migration
+# 0004, app/partitions.py), so there the primary key is (id, timestamp).
+# The sync feed (app/sync.py) reads changed rows in (version, id) order.
+def log_indexes(table: str, username, timestamp, id, version):
+    return (
+        Index(f"ix_{table}_username_timestamp", username, timestamp.desc(), id.desc()),
+        Index(f"ix_{table}_timestamp", timestamp.desc(), id.desc()),
+        Index(f"ix_{table}_version", version, id),
+    )
+
+# Log timestamps come from Python, to the microsecond. The server default
+# stays for rows written outside the app, but on SQLite CURRENT_TIMESTAMP is
+# text to the second, which sorts before the same instant bound from Python
+# ("...:05" < "...:05.000000") and breaks the keyset cursor's comparison.
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+# Models
+class LarvaeLog(Base):
+    __tablename__ = "larvae_logs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    timestamp = Column(DateTime(timezone=True), default=utc_now, server_default=func.now())
+    username = Column(String(100), nullable=False)
+    days_of_age = Column(Integer, nullable=False)
+    larva_weight = Column(Integer, nullable=False)
+    larva_pct = Column(Integer, nullable=False)
+    lb_larvae = Column(Integer, nullable=False)
+    lb_feed = Column(Float, nullable=False)
+    lb_water = Column(Float, nullable=False)
+    screen_refeed = Column(Boolean, default=False)
+    row_number = Column(String(50))
+    notes = Column(Text)
+    larvae_count = Column(Integer)
+    feed_per_larvae = Column(Float)
+    water_feed_ratio = Column(Float)
+    post_feed_condition = Column(String(50), nullable=True)
+    version = Column(BigInteger, nullable=False)  # set by app.sync on every write
+
+    __table_args__ = log_indexes(__tablename__, username, timestamp, id, version)
 
-    id = Column(Integer, primary_key=True, index=True)
-    message = Column(String, index=True)
 
 class ContainerLogPrepupae(Base):
     __tablename__ = "container_logs_prepupae"
-    
-    id = Column(Integer, primary_key=True, index=True)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    timestamp = Column(DateTime(timezone=True), default=utc_now, server_default=func.now())
     username = Column(String(100), nullable=False)
-    datetime = Column(DateTime, default=func.now())
     temperature = Column(DECIMAL(5, 2))
     humidity = Column(DECIMAL(5, 2))
     prepupae_tubs_added = Column(Integer)
     egg_nests_replaced = Column(Integer)
     notes = Column(Text)
+    version = Column(BigInteger, nullable=False)  # set by app.sync on every write
+
+    __table_args__ = log_indexes(__tablename__, username, timestamp, id, version)
 
 class ContainerLogNeonates(Base):
     __tablename__ = "container_logs_neonates"
-    
-    id = Column(Integer, primary_key=True, index=True)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    timestamp = Column(DateTime(timezone=True), default=utc_now, server_default=func.now())
     username = Column(String(100), nullable=False)
-    datetime = Column(DateTime, default=func.now())
     temperature = Column(DECIMAL(5, 2))
     humidity = Column(DECIMAL(5, 2))
     bait_tubs_replaced = Column(Integer)
     shelf_tubs_removed = Column(Integer)
     egg_nests_replaced = Column(Integer)
     notes = Column(Text)
+    version = Column(BigInteger, nullable=False)  # set by app.sync on every write
+
+    __table_args__ = log_indexes(__tablename__, username, timestamp, id, version)
 
 class MicrowaveLog(Base):
     __tablename__ = "microwave_logs"
-    
-    id = Column(Integer, primary_key=True, index=True)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    timestamp = Column(DateTime(timezone=True), default=utc_now, server_default=func.now())
     username = Column(String(100), nullable=False)
-    datetime = Column(DateTime, default=func.now())
     microwave_power_gen1 = Column(DECIMAL(5, 2))
     microwave_power_gen2 = Column(DECIMAL(5, 2))
     fan_speed_cavity1 = Column(DECIMAL(5, 2))
@@ -53,19 +102,65 @@ class MicrowaveLog(Base):
     lb_dried_larvae = Column(DECIMAL(6, 2), nullable=True)
     yield_percentage = Column(DECIMAL(5, 2), nullable=True)
     notes = Column(Text)
+    version = Column(BigInteger, nullable=False)  # set by app.sync on every write
 
-class LarvaeLog(Base):
-    __tablename__ = "larvae_logs"
+    __table_args__ = log_indexes(__tablename__, username, timestamp, id, version)
 
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String(100), nullable=False)
-    datetime = Column(DateTime, default=func.now())
-    days_of_age = Column(Integer, nullable=True)
-    larva_weight = Column(DECIMAL(6, 2), nullable=True)
-    larva_pct = Column(DECIMAL(5, 2), nullable=True)
-    lb_larvae = Column(DECIMAL(6, 2), nullable=True)
-    lb_feed = Column(DECIMAL(6, 2), nullable=True)
-    lb_water = Column(DECIMAL(6, 2), nullable=True)
-    row_number = Column(String(50), nullable=True)
-    notes = Column(Text, nullable=True)
-    result_notes = Column(String(100), nullable=True)
\ No newline at end of file
+
+# Rollups: additive per-bucket totals kept in step with the log tables by
+# app/rollups.py. Averages are sum_<x> / count_<x>.
+class LarvaeRollup(Base):
+    __tablename__ = "larvae_rollups"
+
+    bucket_size = Column(String(8), primary_key=True)  # "hour" or "day"
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    username = Column(String(100), primary_key=True)
+    row_count = Column(Integer, nullable=False, default=0)
+    sum_lb_feed = Column(Float, nullable=False, default=0)
+    sum_larvae_count = Column(BigInteger, nullable=False, default=0)
+    sum_feed_per_larvae = Column(Float, nullable=False, default=0)
+    count_feed_per_larvae = Column(Integer, nullable=False, default=0)
+
+class MicrowaveRollup(Base):
+    __tablename__ = "microwave_rollups"
+
+    bucket_size = Column(String(8), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    username = Column(String(100), primary_key=True)
+    row_count = Column(Integer, nullable=False, default=0)
+    sum_yield_percentage = Column(DECIMAL(14, 2), nullable=False, default=0)
+    count_yield_percentage = Column(Integer, nullable=False, default=0)
+    sum_belt_speed = Column(DECIMAL(14, 2), nullable=False, default=0)
+    count_belt_speed = Column(Integer, nullable=False, default=0)
+
+
+# Delta sync: the server-wide version counter (a single row, id 1) and a
+# record of deleted log rows, both written by app/sync.py.
+class SyncState(Base):
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(BigInteger, nullable=False)
+
+class SyncTombstone(Base):
+    __tablename__ = "sync_tombstones"
+
+    table_name = Column(String(64), primary_key=True)
+    row_id = Column(UUID(as_uuid=True), primary_key=True)
+    version = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("ix_sync_tombstones_version", version, row_id),)
+
+
+# Responses kept for replaying requests sent with an Idempotency-Key
+# (app/idempotency.py). A row with no status is a request still running.
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # method, path and body hash
+    status = Column(Integer)
+    headers = Column(Text)  # JSON list of [name, value] pairs
+    body = Column(LargeBinary)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
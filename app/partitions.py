@@ -0,0 +1,158 @@
+import logging
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.models import LarvaeLog, ContainerLogPrepupae, ContainerLogNeonates, MicrowaveLog
+
+# Monthly partition upkeep for the log tables, which are range-partitioned on
+# "timestamp" on Postgres (migration 0004). Each table has a partition per
+# UTC calendar month named <table>_YYYY_MM, plus <table>_default for rows
+# outside them.
+#
+# ensure_partitions() creates the partitions for the current month and the
+# next `months_ahead`; it runs on every deploy (`python -m app.migrate`) and
+# daily from `python -m app.partitions` (a cron job in render.yaml), so the
+# default partition normally stays empty. The app's workers never run it. apply_retention() removes
+# whole months older than the retention window: "drop" drops them, "archive"
+# detaches them into the `archive` schema, where they can be dumped and
+# dropped at leisure. Either way it's a catalog change, not a mass DELETE.
+# Rollups are left alone, so the dashboards keep their history. Cached list
+# pages that still show removed rows expire with LIST_CACHE_TTL.
+#
+# Date-filtered queries (timestamp >= :from AND timestamp < :to) are pruned
+# to the matching partitions by Postgres itself.
+
+logger = logging.getLogger(__name__)
+
+MODELS = [LarvaeLog, ContainerLogPrepupae, ContainerLogNeonates, MicrowaveLog]
+ACTIONS = ["archive", "drop"]
+ARCHIVE_SCHEMA = "archive"
+LOCK_KEY = 7217  # advisory lock, so overlapping runs (deploy and cron) don't race on DDL
+
+
+def month_start(value: datetime) -> datetime:
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+# Months that have a partition, as {month start: partition name}
+async def partitions(db, table: str) -> dict:
+    result = await db.execute(text("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        WHERE parent.relname = :table
+    """), {"table": table})
+    pattern = re.compile(rf"{re.escape(table)}_(\d{{4}})_(\d{{2}})$")
+    months = {}
+    for (name,) in result:
+        match = pattern.match(name)
+        if match:
+            months[datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)] = name
+    return months
+
+
+async def create_partition(db, table: str, month: datetime) -> str:
+    name = partition_name(table, month)
+    default = f"{table}_default"
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    range_filter = {"start": month, "end": add_months(month, 1)}
+    stray = await db.execute(text(f'SELECT EXISTS (SELECT 1 FROM {default} '
+                                  f'WHERE "timestamp" >= :start AND "timestamp" < :end)'), range_filter)
+    if not stray.scalar():
+        await db.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}"))
+        return name
+
+    # Rows for this month already went to the default partition (upkeep fell
+    # behind); Postgres won't add the partition over them, so move them across
+    logger.warning("Moving %s rows for %s out of %s", table, f"{month:%Y-%m}", default)
+    await db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    await db.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}"))
+    await db.execute(text(f'INSERT INTO {name} SELECT * FROM {default} '
+                          f'WHERE "timestamp" >= :start AND "timestamp" < :end'), range_filter)
+    await db.execute(text(f'DELETE FROM {default} WHERE "timestamp" >= :start AND "timestamp" < :end'),
+                     range_filter)
+    await db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+    return name
+
+
+# Create any missing partitions from the current month to `months_ahead`
+# months out. Returns the names created; a no-op off Postgres, or while
+# another process holds the lock. The caller commits.
+async def ensure_partitions(db, months_ahead: int, now: Optional[datetime] = None) -> List[str]:
+    if db.bind.dialect.name != "postgresql":
+        return []
+    locked = await db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+    if not locked.scalar():
+        return []
+
+    current = month_start(now or datetime.now(timezone.utc))
+    created = []
+    for model in MODELS:
+        table = model.__tablename__
+        existing = await partitions(db, table)
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                created.append(await create_partition(db, table, month))
+    return created
+
+
+# Remove partitions for months before the current month and the
+# `keep_months` before it. Returns (partition, action) pairs. The caller
+# commits.
+async def apply_retention(db, keep_months: int, action: str = "archive",
+                          now: Optional[datetime] = None) -> List[Tuple[str, str]]:
+    if action not in ACTIONS:
+        raise ValueError(f"action must be one of: {', '.join(ACTIONS)}")
+    if db.bind.dialect.name != "postgresql":
+        return []
+
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -keep_months)
+    removed = []
+    for model in MODELS:
+        table = model.__tablename__
+        expired = [name for month, name in sorted((await partitions(db, table)).items()) if month < cutoff]
+        for name in expired:
+            await db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if action == "drop":
+                await db.execute(text(f"DROP TABLE {name}"))
+            else:
+                await db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+                await db.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+            removed.append((name, action))
+    return removed
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    async def main():
+        from app.core.config import settings
+        from app import database
+
+        database.init_engine()
+        async with database.SessionLocal() as db:
+            created = await ensure_partitions(db, settings.PARTITION_MONTHS_AHEAD)
+            removed = []
+            if settings.PARTITION_RETENTION_MONTHS:
+                removed = await apply_retention(db, settings.PARTITION_RETENTION_MONTHS,
+                                                settings.PARTITION_RETENTION_ACTION)
+            await db.commit()
+        await database.dispose_engine()
+        print({"created": created, "removed": removed})
+
+    asyncio.run(main())
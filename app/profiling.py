@@ -0,0 +1,120 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Query profiling for development (DB_PROFILE=1). Statements slower than
+# DB_SLOW_QUERY_MS are logged with their EXPLAIN plan, and requests that issue
+# more than DB_QUERY_BUDGET queries are logged with their most repeated
+# statement, which is usually the N+1 culprit. Every response also carries
+# X-Query-Count. query_budget() asserts a budget around a block of code, for
+# tests.
+
+logger = logging.getLogger(__name__)
+
+
+# Statements run by the current request, with their durations
+class QueryRecorder:
+    def __init__(self):
+        self.statements: List[Tuple[str, float]] = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def most_repeated(self) -> Tuple[str, int]:
+        return Counter(statement for statement, _ in self.statements).most_common(1)[0]
+
+
+current_recorder: ContextVar[Optional[QueryRecorder]] = ContextVar("current_recorder", default=None)
+
+
+def _explain(conn, statement, parameters) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+    except Exception as e:
+        return f"(EXPLAIN failed: {e})"
+    return "\n".join(" ".join(str(value) for value in row) for row in rows)
+
+
+def instrument_engine(engine, slow_ms: float):
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._profile_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("EXPLAIN"):
+            return
+        elapsed = time.perf_counter() - context._profile_started
+        recorder = current_recorder.get()
+        if recorder is not None:
+            recorder.statements.append((statement, elapsed))
+
+        if elapsed * 1000 >= slow_ms:
+            # Only plain reads are explained; EXPLAIN never runs the statement,
+            # but skipping writes keeps the extra round trip off the write path
+            plan = ""
+            if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+                plan = "\n" + _explain(conn, statement, parameters)
+            logger.warning("Slow query (%.1f ms): %s%s", elapsed * 1000, statement, plan)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, budget: int):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(len(recorder)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_recorder.reset(token)
+            if len(recorder) > self.budget:
+                statement, repeats = recorder.most_repeated()
+                logger.warning("%s %s issued %d queries (budget %d); most repeated (%dx): %s",
+                               scope["method"], scope["path"], len(recorder), self.budget,
+                               repeats, statement)
+
+
+# Count every statement run on `engine` inside the block and fail if there are
+# more than max_queries:
+#
+#     with query_budget(engine, 2):
+#         client.get("/api/logs")
+@contextmanager
+def query_budget(engine, max_queries: int):
+    recorder = QueryRecorder()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith("EXPLAIN"):
+            recorder.statements.append((statement, 0.0))
+
+    event.listen(engine.sync_engine, "after_cursor_execute", record)
+    try:
+        yield recorder
+    finally:
+        event.remove(engine.sync_engine, "after_cursor_execute", record)
+
+    if len(recorder) > max_queries:
+        statements = "\n".join(statement for statement, _ in recorder.statements)
+        raise AssertionError(f"{len(recorder)} queries, budget {max_queries}:\n{statements}")
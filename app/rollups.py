@@ -0,0 +1,172 @@
+from collections import defaultdict
+from datetime import timezone
+from typing import Any, Dict, Iterable, Mapping
+
+from sqlalchemy import DateTime, delete, func, insert, literal, literal_column, select, tuple_, type_coerce
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import LarvaeLog, MicrowaveLog, LarvaeRollup, MicrowaveRollup
+
+# Hourly and daily rollups of larvae_logs and microwave_logs, keyed by
+# (bucket_size, bucket, username). Write handlers pass the old and/or new
+# version of each changed row to apply(), which adds the signed difference
+# to the affected buckets in the same transaction. rebuild() regenerates
+# everything from the log tables. Buckets are UTC, in Python and in SQL
+# (utc_trunc) alike, whatever the database session's TimeZone.
+
+BUCKET_SIZES = ["hour", "day"]
+
+# Per log table: rollup model, summed columns and columns that also keep a
+# non-null count (so averages can be derived)
+SPECS = {
+    LarvaeLog: {
+        "rollup": LarvaeRollup,
+        "sums": ["lb_feed", "larvae_count", "feed_per_larvae"],
+        "counts": ["feed_per_larvae"],
+    },
+    MicrowaveLog: {
+        "rollup": MicrowaveRollup,
+        "sums": ["yield_percentage", "belt_speed"],
+        "counts": ["yield_percentage", "belt_speed"],
+    },
+}
+
+KEY_COLUMNS = ["bucket_size", "bucket", "username"]
+
+
+# SQLite keeps timestamps as UTC text, so strftime truncates them in
+# SQLAlchemy's storage format ("weekday 0" then "-6 days" is the Monday
+# date_trunc('week') gives)
+SQLITE_TRUNC = {
+    "hour": ("%Y-%m-%d %H:00:00.000000",),
+    "day": ("%Y-%m-%d 00:00:00.000000",),
+    "week": ("%Y-%m-%d 00:00:00.000000", "weekday 0", "-6 days"),
+}
+
+
+# `timestamp` truncated to the start of its UTC hour, day or week. On
+# Postgres that's date_trunc on the UTC wall-clock time, returned as a
+# timestamptz again: date_trunc(unit, ts AT TIME ZONE 'UTC') AT TIME ZONE
+# 'UTC'. Plain date_trunc on a timestamptz truncates in the session's time
+# zone. The (whitelisted) unit is inlined: a bound parameter would render as
+# separate placeholders in SELECT and GROUP BY, which don't match up.
+def utc_trunc(unit: str, timestamp, dialect: str):
+    if dialect == "sqlite":
+        pattern, *modifiers = [literal_column(f"'{arg}'") for arg in SQLITE_TRUNC[unit]]
+        return type_coerce(func.strftime(pattern, timestamp, *modifiers), DateTime(timezone=True))
+    utc = literal_column("'UTC'")
+    return func.timezone(utc, func.date_trunc(literal_column(f"'{unit}'"), func.timezone(utc, timestamp)))
+
+
+def truncate(timestamp, size: str):
+    if timestamp.tzinfo:
+        timestamp = timestamp.astimezone(timezone.utc)
+    timestamp = timestamp.replace(minute=0, second=0, microsecond=0)
+    if size == "day":
+        timestamp = timestamp.replace(hour=0)
+    return timestamp
+
+
+def value_columns(spec) -> list:
+    return (["row_count"] + [f"sum_{name}" for name in spec["sums"]]
+            + [f"count_{name}" for name in spec["counts"]])
+
+
+# The fields of a log row that rollups depend on (call before changing a row
+# to capture its old contribution)
+def snapshot(model, log) -> Dict[str, Any]:
+    spec = SPECS[model]
+    fields = ["timestamp", "username"] + spec["sums"] + spec["counts"]
+    if isinstance(log, Mapping):
+        return {field: log[field] for field in fields}
+    return {field: getattr(log, field) for field in fields}
+
+
+def _deltas(spec, old: Iterable[Mapping], new: Iterable[Mapping]):
+    deltas = defaultdict(lambda: dict.fromkeys(value_columns(spec), 0))
+    for rows, sign in ((old, -1), (new, 1)):
+        for row in rows:
+            for size in BUCKET_SIZES:
+                delta = deltas[(size, truncate(row["timestamp"], size), row["username"])]
+                delta["row_count"] += sign
+                for name in spec["sums"]:
+                    if row[name] is not None:
+                        delta[f"sum_{name}"] += sign * row[name]
+                for name in spec["counts"]:
+                    if row[name] is not None:
+                        delta[f"count_{name}"] += sign
+    # An update that stays in the same bucket can cancel out entirely
+    return {key: delta for key, delta in deltas.items() if any(delta.values())}
+
+
+# Add the difference between the old and new versions of some rows to their
+# buckets with one multi-row upsert. Does not commit.
+async def apply(db: AsyncSession, model, old: Iterable[Mapping] = (), new: Iterable[Mapping] = ()):
+    spec = SPECS.get(model)
+    if not spec:
+        return
+    deltas = _deltas(spec, old, new)
+    if not deltas:
+        return
+
+    rollup = spec["rollup"]
+    upsert = sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+    stmt = upsert(rollup).values([
+        {**dict(zip(KEY_COLUMNS, key)), **delta} for key, delta in deltas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={column: getattr(rollup, column) + stmt.excluded[column] for column in value_columns(spec)},
+    )
+    await db.execute(stmt)
+
+    # Drop buckets whose last row moved out or was deleted
+    if any(delta["row_count"] < 0 for delta in deltas.values()):
+        await db.execute(delete(rollup).where(
+            tuple_(*[getattr(rollup, column) for column in KEY_COLUMNS]).in_(list(deltas)),
+            rollup.row_count <= 0,
+        ))
+
+
+# Regenerate rollups from scratch with INSERT ... SELECT ... GROUP BY.
+# Does not commit.
+async def rebuild(db: AsyncSession, models=None) -> Dict[str, int]:
+    dialect = db.bind.dialect.name
+    rebuilt = {}
+    for model in models or SPECS:
+        spec = SPECS[model]
+        rollup = spec["rollup"]
+        await db.execute(delete(rollup))
+
+        for size in BUCKET_SIZES:
+            bucket = utc_trunc(size, model.timestamp, dialect)
+            columns = [literal(size), bucket, model.username, func.count()]
+            columns += [func.coalesce(func.sum(getattr(model, name)), 0) for name in spec["sums"]]
+            columns += [func.count(getattr(model, name)) for name in spec["counts"]]
+            await db.execute(insert(rollup).from_select(
+                KEY_COLUMNS + value_columns(spec),
+                select(*columns).group_by(bucket, model.username),
+            ))
+
+        result = await db.execute(select(func.count()).select_from(rollup))
+        rebuilt[rollup.__tablename__] = result.scalar()
+    return rebuilt
+
+
+# python -m app.rollups: rebuild all rollups
+if __name__ == "__main__":
+    import asyncio
+
+    async def main():
+        from app import database
+
+        database.init_engine()
+        async with database.SessionLocal() as db:
+            rebuilt = await rebuild(db)
+            await db.commit()
+        await database.dispose_engine()
+        print(rebuilt)
+
+    asyncio.run(main())
@@ -1,13 +1,77 @@
+from datetime import datetime
+from typing import Generic, List, Optional, TypeVar
+from uuid import UUID
+
 from pydantic import BaseModel
 
-class LogBase(BaseModel):
-    message: str
+T = TypeVar("T")
+
+
+# Response models for the log endpoints. These document the API; the routes
+# render rows with app.serializers and return the response directly, so
+# they are not re-validated on the way out.
+
+class LarvaeLogOut(BaseModel):
+    id: UUID
+    timestamp: datetime
+    username: str
+    days_of_age: int
+    larva_weight: int
+    larva_pct: int
+    lb_larvae: int
+    lb_feed: float
+    lb_water: float
+    screen_refeed: Optional[bool] = None
+    row_number: Optional[str] = None
+    notes: Optional[str] = None
+    larvae_count: Optional[int] = None
+    feed_per_larvae: Optional[float] = None
+    water_feed_ratio: Optional[float] = None
+    post_feed_condition: Optional[str] = None
+    version: int
+
+class PrepupaeLogOut(BaseModel):
+    id: UUID
+    timestamp: datetime
+    username: str
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    prepupae_tubs_added: Optional[int] = None
+    egg_nests_replaced: Optional[int] = None
+    notes: Optional[str] = None
+    version: int
 
-class LogCreate(LogBase):
-    pass
+class NeonatesLogOut(BaseModel):
+    id: UUID
+    timestamp: datetime
+    username: str
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    bait_tubs_replaced: Optional[int] = None
+    shelf_tubs_removed: Optional[int] = None
+    egg_nests_replaced: Optional[int] = None
+    notes: Optional[str] = None
+    version: int
 
-class Log(LogBase):
-    id: int
+class MicrowaveLogOut(BaseModel):
+    id: UUID
+    timestamp: datetime
+    username: str
+    microwave_power_gen1: Optional[float] = None
+    microwave_power_gen2: Optional[float] = None
+    fan_speed_cavity1: Optional[float] = None
+    fan_speed_cavity2: Optional[float] = None
+    belt_speed: Optional[float] = None
+    lb_larvae_per_tub: Optional[float] = None
+    num_ramp_up_tubs: Optional[int] = None
+    num_ramp_down_tubs: Optional[int] = None
+    tubs_live_larvae: Optional[int] = None
+    lb_dried_larvae: Optional[float] = None
+    yield_percentage: Optional[float] = None
+    notes: Optional[str] = None
+    version: int
 
-    class Config:
-        orm_mode = True
+# Keyset page: returned instead of a bare list when a cursor is passed
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,128 @@
+import uuid
+from decimal import Decimal
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import Float, Numeric, Uuid
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are optional
+    msgpack = None
+
+from app.models import LarvaeLog, ContainerLogPrepupae, ContainerLogNeonates, MicrowaveLog
+
+# Response serialization for the log tables. Each table gets one serializer,
+# generated once from its columns, that turns a row tuple into a plain dict in
+# a single call with no per-value type checks. Datetimes are passed through
+# for orjson to encode natively. UUIDs become strings, since asyncpg returns
+# its own uuid.UUID subclass, which orjson rejects. DECIMAL and FLOAT columns
+# always come out as floats (SQLite can hand back whole-number REALs as ints).
+
+
+def compile_serializer(table):
+    fields = []
+    for index, column in enumerate(table.columns):
+        value = f"row[{index}]"
+        if isinstance(column.type, (Numeric, Float)):
+            value = f"None if {value} is None else float({value})"
+        elif isinstance(column.type, Uuid):
+            value = f"None if {value} is None else str({value})"
+        fields.append(f"{column.name!r}: {value}")
+
+    source = f"def serialize_{table.name}(row):\n    return {{{', '.join(fields)}}}\n"
+    namespace = {}
+    exec(source, namespace)
+    return namespace[f"serialize_{table.name}"]
+
+
+SERIALIZERS = {model: compile_serializer(model.__table__) for model in
+               [LarvaeLog, ContainerLogPrepupae, ContainerLogNeonates, MicrowaveLog]}
+
+
+# Rows from select(*model.__table__.columns)
+def serialize_rows(model, rows) -> list:
+    serialize = SERIALIZERS[model]
+    return [serialize(row) for row in rows]
+
+
+def serialize_row(model, row) -> dict:
+    return SERIALIZERS[model](row)
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):  # asyncpg's subclass; orjson only takes uuid.UUID itself
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+# JSON response rendered with orjson. Returning one of these from a route skips
+# FastAPI's jsonable_encoder pass over the content.
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+
+# MessagePack, for clients that ask for it with Accept: application/msgpack.
+# Same shape as the JSON: ids and timestamps are strings, decimals floats.
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+
+
+# Going through orjson's plain types is faster than a msgpack `default`
+# hook called per UUID/datetime, and renders them exactly as the JSON does
+def render_msgpack(content) -> bytes:
+    return msgpack.packb(orjson.loads(orjson.dumps(content, default=_default)), use_bin_type=True)
+
+
+# Media type to answer `request` with: MessagePack when the Accept header
+# names it (and msgpack is installed) with a q at least as high as JSON's,
+# JSON otherwise. Each type takes its q from the most specific range that
+# matches it (the type itself, then application/*, then */*), so
+# "application/msgpack, */*" is MessagePack, and the order of the list
+# doesn't matter.
+def negotiate(request: Request) -> str:
+    if msgpack is None:
+        return "application/json"
+    # media type -> (specificity, q) of the best range matching it so far:
+    # 2 for the type itself, 1 for application/*, 0 for */*
+    ranks = {MSGPACK: (-1, 0.0), "application/json": (-1, 0.0)}
+    for part in request.headers.get("accept", "").split(","):
+        media_type, _, params = part.strip().partition(";")
+        media_type = media_type.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type in ("*/*", "application/*"):
+            rank, matched = (0 if media_type == "*/*" else 1, quality), list(ranks)
+        else:
+            rank, matched = (2, quality), [MSGPACK if media_type in MSGPACK_TYPES else media_type]
+        for name in matched:
+            if name in ranks:
+                ranks[name] = max(ranks[name], rank)
+
+    (specificity, msgpack_quality), (_, json_quality) = ranks[MSGPACK], ranks["application/json"]
+    if specificity == 2 and msgpack_quality > 0 and msgpack_quality >= json_quality:
+        return MSGPACK
+    return "application/json"
+
+
+def render(content, media_type: str) -> bytes:
+    return render_msgpack(content) if media_type == MSGPACK else orjson.dumps(content, default=_default)
+
+
+# Response for `content` in the representation the client asked for
+def negotiated_response(request: Request, content, headers=None) -> Response:
+    media_type = negotiate(request)
+    return Response(render(content, media_type), media_type=media_type,
+                    headers={**(headers or {}), "Vary": "Accept"})
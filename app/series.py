@@ -0,0 +1,192 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import Float, Integer, cast, func, literal, select
+
+# Downsampled climate series for charts. The container tables can hold a
+# reading a second, far more than a chart can draw, so the endpoint reduces
+# each series to a point budget:
+#
+#   lttb:   Largest-Triangle-Three-Buckets; keeps `points` real readings
+#           chosen to preserve the visual shape (peaks and dips survive)
+#   minmax: `points` equal-width time buckets with min/max/avg per bucket
+#
+# minmax is a GROUP BY in the database, so only the buckets come back.
+# LTTB needs every reading: they're streamed in batches into NumPy arrays,
+# and a range with more than `max_rows` of them is refused (TooManyRows)
+# rather than held in memory. The queries cast the DECIMAL columns to float
+# and turn timestamps into epoch seconds, so rows arrive as plain floats,
+# with no Decimal or datetime objects.
+
+METHODS = ["lttb", "minmax"]
+COLUMNS = ["temperature", "humidity"]
+BATCH_SIZE = 10000  # rows per fetch while streaming
+
+
+class TooManyRows(Exception):
+    pass
+
+
+# Seconds since the epoch as a float, computed by the database
+def epoch(timestamp, dialect: str):
+    if dialect == "sqlite":  # timestamps are stored as naive UTC text
+        return (func.julianday(timestamp) - 2440587.5) * 86400.0
+    return cast(func.extract("epoch", timestamp), Float)
+
+
+def _filtered(query, model, username: Optional[str], start: Optional[datetime], end: Optional[datetime]):
+    query = query.where(model.timestamp.is_not(None))
+    if username:
+        query = query.where(model.username == username)
+    if start:
+        query = query.where(model.timestamp >= start)
+    if end:
+        query = query.where(model.timestamp < end)
+    return query
+
+
+def series_query(model, dialect: str, username: Optional[str],
+                 start: Optional[datetime], end: Optional[datetime]):
+    query = select(epoch(model.timestamp, dialect).label("t"),
+                   *[cast(getattr(model, name), Float).label(name) for name in COLUMNS])
+    return _filtered(query, model, username, start, end).order_by(model.timestamp)
+
+
+# Epoch seconds of the first and last readings, and how many there are
+def bounds_query(model, dialect: str, username: Optional[str],
+                 start: Optional[datetime], end: Optional[datetime]):
+    query = select(epoch(func.min(model.timestamp), dialect), epoch(func.max(model.timestamp), dialect),
+                   func.count())
+    return _filtered(query, model, username, start, end)
+
+
+# min/max/avg of each column per equal-width bucket (`width` seconds from
+# `first`), as (bucket index, min, max, avg, min, max, avg, ...) rows. The
+# last reading falls in bucket `buckets` - 1, not a bucket of its own.
+def minmax_query(model, dialect: str, username: Optional[str], start: Optional[datetime],
+                 end: Optional[datetime], first: float, width: float, buckets: int):
+    offset = (epoch(model.timestamp, dialect) - literal(first, Float)) / literal(width, Float)
+    if dialect == "sqlite":  # CAST truncates, which is floor for offsets >= 0
+        index = func.min(cast(offset, Integer), buckets - 1)
+    else:
+        index = func.least(cast(func.floor(offset), Integer), buckets - 1)
+    readings = _filtered(select(index.label("bucket"),
+                                *[cast(getattr(model, name), Float).label(name) for name in COLUMNS]),
+                         model, username, start, end).subquery()
+    aggregates = [aggregate(readings.c[name]) for name in COLUMNS for aggregate in (func.min, func.max, func.avg)]
+    return select(readings.c.bucket, *aggregates).group_by(readings.c.bucket).order_by(readings.c.bucket)
+
+
+# Rows from series_query -> (epoch seconds, {column: float array}); None is NaN
+def to_arrays(rows):
+    def column(index):
+        return np.fromiter((row[index] for row in rows), dtype=float, count=len(rows))
+    return column(0), {name: column(index) for index, name in enumerate(COLUMNS, start=1)}
+
+
+# Stream series_query into arrays, a batch at a time
+async def read_arrays(db, query, max_rows: int):
+    times, values, count = [], {name: [] for name in COLUMNS}, 0
+    result = await db.stream(query.execution_options(yield_per=BATCH_SIZE))
+    async for rows in result.partitions():
+        count += len(rows)
+        if count > max_rows:
+            await result.close()
+            raise TooManyRows(f"More than {max_rows} readings in range")
+        batch_times, batch_values = to_arrays(rows)
+        times.append(batch_times)
+        for name in COLUMNS:
+            values[name].append(batch_values[name])
+    if not times:
+        return np.empty(0), {name: np.empty(0) for name in COLUMNS}
+    return np.concatenate(times), {name: np.concatenate(chunks) for name, chunks in values.items()}
+
+
+# Indexes of the `threshold` points LTTB keeps. The first and last points are
+# always kept; every other bucket keeps the point forming the largest triangle
+# with the point kept before it and the average of the next bucket. That
+# dependency on the previous pick makes the walk over buckets sequential, but
+# each step is array arithmetic over one bucket and the bucket averages come
+# from cumulative sums computed once.
+def lttb(x, y, threshold: int):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = x - x[0]  # keeps the cumulative sums precise
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    sum_x = np.concatenate(([0.0], np.cumsum(x)))
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = np.diff(edges)
+    avg_x = (sum_x[edges[1:]] - sum_x[edges[:-1]]) / sizes
+    avg_y = (sum_y[edges[1:]] - sum_y[edges[:-1]]) / sizes
+    # The bucket after the last one is the final point
+    avg_x = np.append(avg_x[1:], x[-1])
+    avg_y = np.append(avg_y[1:], y[-1])
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        areas = np.abs((ax - avg_x[bucket]) * (y[start:end] - ay)
+                       - (ax - x[start:end]) * (avg_y[bucket] - ay))
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
+
+
+# Epoch seconds -> ISO strings, to the millisecond (SQLite's julianday
+# arithmetic isn't exact below that)
+def _times(epochs) -> list:
+    return [datetime.fromtimestamp(value, tz=timezone.utc).isoformat(timespec="milliseconds")
+            for value in np.round(epochs, 3).tolist()]
+
+
+def _values(values) -> list:
+    return [None if value is None or value != value else value for value in values]  # NaN -> None
+
+
+def _check(method: str, points: int):
+    if method not in METHODS:
+        raise ValueError(f"method must be one of: {', '.join(METHODS)}")
+    if points < 3:
+        raise ValueError("points must be at least 3")
+
+
+# LTTB over every column of the readings (from read_arrays)
+def downsample(times, values, points: int) -> dict:
+    _check("lttb", points)
+    series = {}
+    for name, column in values.items():
+        present = ~np.isnan(column)
+        x, y = times[present], column[present]
+        kept = lttb(x, y, points)
+        series[name] = {"t": _times(x[kept]), "value": y[kept].tolist()}
+    return {"method": "lttb", "points": points, "raw_points": len(times), "series": series}
+
+
+# One table's series, reduced by `method` to about `points` per column.
+# Raises TooManyRows when LTTB would have to read more than `max_rows`.
+async def load(db, model, method: str, points: int, username: Optional[str],
+               start: Optional[datetime], end: Optional[datetime], max_rows: int) -> dict:
+    _check(method, points)
+    dialect = db.bind.dialect.name
+    if method == "lttb":
+        times, values = await read_arrays(db, series_query(model, dialect, username, start, end), max_rows)
+        return downsample(times, values, points)
+
+    # Equal-width buckets from the first reading to the last. Empty buckets
+    # are left out; a bucket whose readings are all missing gives None.
+    first, last, count = (await db.execute(bounds_query(model, dialect, username, start, end))).one()
+    series = {name: {"t": [], "min": [], "max": [], "avg": []} for name in COLUMNS}
+    if count:
+        width = max((last - first) / points, 1e-9)
+        rows = (await db.execute(minmax_query(model, dialect, username, start, end, first, width, points))).all()
+        bucket_times = _times(first + np.array([row[0] for row in rows], dtype=float) * width)
+        for position, name in enumerate(COLUMNS):
+            low, high, avg = (_values([row[1 + 3 * position + offset] for row in rows]) for offset in range(3))
+            series[name] = {"t": bucket_times, "min": low, "max": high, "avg": avg}
+    return {"method": method, "points": points, "raw_points": count, "series": series}
@@ -0,0 +1,132 @@
+import uuid
+from typing import Optional, Tuple
+
+from sqlalchemy import insert, select, tuple_, update
+
+from app import serializers
+from app.models import LarvaeLog, ContainerLogPrepupae, ContainerLogNeonates, MicrowaveLog, SyncState, SyncTombstone
+
+# Delta sync for clients that keep a local copy of the log tables (the floor
+# tablets). Every write to a log table takes the next value of one
+# server-wide counter and stamps it on the rows it inserts or updates in a
+# "version" column; deletes record a tombstone at their version instead
+# (migration 0005). A client then asks for everything after the last token
+# it saw:
+#
+#   GET /api/sync?since=<token>  ->  {"token": ..., "more": bool,
+#                                     "changes": {table: [rows]},
+#                                     "deleted": {table: [ids]}}
+#
+# Changes come in (version, table, id) order, `limit` at a time; the
+# returned token resumes right after the last one sent, so a single large
+# write (or the initial sync, where every existing row is version 1) can
+# span several responses. A plain integer token means "every version up to
+# this one". since=0 is a full download.
+#
+# The counter is a single row bumped with UPDATE ... RETURNING, so its row
+# lock is held until the writing transaction commits (or rolls back), and
+# the next writer can't take a version until then: versions commit in
+# order. So once a reader sees the counter at N, every version up to N has
+# committed, and any version still in flight is above N. That serializes
+# log writes on the counter for the tail of each transaction.
+#
+# A read takes one query per table, each with its own snapshot (READ
+# COMMITTED), so a later query can see writes that an earlier one missed.
+# Every query is therefore bounded by the counter value read first, and
+# the token never goes past it: a version committed mid-read shows up on
+# the next call instead of being skipped.
+#
+# Rows removed by partition retention (app/partitions.py) leave no
+# tombstones; clients should drop local rows older than the retention
+# window themselves.
+
+MODELS = [LarvaeLog, ContainerLogPrepupae, ContainerLogNeonates, MicrowaveLog]
+TOMBSTONES = len(MODELS)  # tombstones sort after the tables within a version
+MAX_LIMIT = 5000
+
+Position = Tuple[int, Optional[int], Optional[uuid.UUID]]  # (version, source, id)
+
+
+# Take the next version for the current transaction's writes
+async def next_version(db) -> int:
+    result = await db.execute(
+        update(SyncState).where(SyncState.id == 1)
+        .values(version=SyncState.version + 1).returning(SyncState.version)
+    )
+    return result.scalar_one()
+
+
+async def current_version(db) -> int:
+    return (await db.execute(select(SyncState.version).where(SyncState.id == 1))).scalar_one()
+
+
+async def tombstone(db, model, row_id: uuid.UUID, version: int):
+    await db.execute(insert(SyncTombstone).values(table_name=model.__tablename__, row_id=row_id, version=version))
+
+
+def encode_token(version: int, source: Optional[int] = None, row_id: Optional[uuid.UUID] = None) -> str:
+    return str(version) if source is None else f"{version}.{source}.{row_id.hex}"
+
+
+# Raises ValueError for a malformed token
+def decode_token(token: str) -> Position:
+    parts = token.split(".")
+    if len(parts) == 1:
+        position = int(parts[0]), None, None
+    else:
+        version, source, row_id = parts
+        position = int(version), int(source), uuid.UUID(row_id)
+        if not 0 <= position[1] <= TOMBSTONES:
+            raise ValueError(f"Invalid source: {position[1]}")
+    if position[0] < 0:
+        raise ValueError(f"Invalid version: {position[0]}")
+    return position
+
+
+# WHERE clauses for rows of `source` that sort after `position`, up to and
+# including version `until`
+def _between(source: int, version_column, id_column, position: Position, until: int) -> list:
+    version, after_source, after_id = position
+    if after_source is None or source < after_source:
+        clauses = [version_column > version]
+    elif source > after_source:
+        clauses = [version_column >= version]
+    else:
+        clauses = [version_column >= version, tuple_(version_column, id_column) > (version, after_id)]
+    return clauses + [version_column <= until]
+
+
+async def changes(db, position: Position, limit: int) -> dict:
+    # Read first: every version up to this one has committed, so the reads
+    # below can't miss any of them; later ones wait for the next call
+    current = await current_version(db)
+
+    entries = []
+    for source, model in enumerate(MODELS):
+        query = (select(*model.__table__.columns)
+                 .where(*_between(source, model.version, model.id, position, current))
+                 .order_by(model.version, model.id).limit(limit + 1))
+        entries += [(row.version, source, row.id, row) for row in (await db.execute(query)).all()]
+
+    query = (select(SyncTombstone.table_name, SyncTombstone.row_id, SyncTombstone.version)
+             .where(*_between(TOMBSTONES, SyncTombstone.version, SyncTombstone.row_id, position, current))
+             .order_by(SyncTombstone.version, SyncTombstone.row_id).limit(limit + 1))
+    entries += [(row.version, TOMBSTONES, row.row_id, row) for row in (await db.execute(query)).all()]
+
+    entries.sort(key=lambda entry: entry[:3])
+    more = len(entries) > limit
+    entries = entries[:limit]
+
+    changed, deleted = {}, {}
+    for version, source, row_id, row in entries:
+        if source == TOMBSTONES:
+            deleted.setdefault(row.table_name, []).append(row_id)
+        else:
+            model = MODELS[source]
+            changed.setdefault(model.__tablename__, []).append(serializers.serialize_row(model, row))
+
+    if more:
+        token = encode_token(*entries[-1][:3])
+    else:
+        token = encode_token(max(current, position[0]))
+    return {"token": token, "more": more, "changes": changed, "deleted": deleted}
@@ -0,0 +1,104 @@
+import json
+from datetime import datetime, timezone
+from typing import Tuple
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app import analytics, filters, partitions, rollups
+
+# Row totals for `include=total` on the list endpoints, without a second full
+# scan of big tables:
+#
+#   1. Count at most `exact_limit` + 1 matching rows. If that's all there
+#      are, the total is exact and cost no more than reading them.
+#   2. Larvae/microwave filtered only by username and hour-aligned from/to:
+#      sum the hourly rollup row counts (exact, and a few hundred rows a month).
+#      Partition retention removes old rows but keeps their rollups, so with
+#      retention on this only covers ranges starting after its cutoff.
+#   3. Postgres: the planner's row estimate for the filtered query, from
+#      table statistics (approximate).
+#   4. Elsewhere (SQLite in development): a full COUNT(*).
+#
+# Returns (total, approximate).
+
+
+def _bounded_count(model, clauses, limit: int):
+    matching = select(literal(1)).select_from(model).where(*clauses).limit(limit + 1).subquery()
+    return select(func.count()).select_from(matching)
+
+
+# Rollup query summing row counts, or None if the filters can't be answered
+# from the hourly rollups exactly
+def _rollup_count(model, params, retention_months: int = 0):
+    spec = rollups.SPECS.get(model)
+    keys = filters.active(model, params)
+    if spec is None or not set(keys) <= {"username", "from", "to"}:
+        return None
+
+    def bound(key):
+        return filters.parse_timestamp(key, filters.values_of(params, key)[-1]) if key in keys else None
+
+    start, end = bound("from"), bound("to")
+    if analytics.rollup_size("hour", start, end) != "hour":
+        return None
+    if retention_months:
+        # Months before this may have lost their rows (app/partitions.py)
+        cutoff = partitions.add_months(partitions.month_start(datetime.now(timezone.utc)), -retention_months)
+        if start is None or (start if start.tzinfo else start.replace(tzinfo=timezone.utc)) < cutoff:
+            return None
+
+    rollup = spec["rollup"]
+    query = select(func.coalesce(func.sum(rollup.row_count), 0)).where(rollup.bucket_size == "hour")
+    if "username" in keys:
+        query = query.where(rollup.username.in_(filters.values_of(params, "username")))
+    if start:
+        query = query.where(rollup.bucket >= start)
+    if end:
+        query = query.where(rollup.bucket < end)
+    return query
+
+
+# EXPLAIN of a statement, run through the normal compile/execute path so its
+# parameters (including expanding IN lists) are bound as usual
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN " + compiler.process(element.statement, **kw)
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain_postgresql(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def _planner_estimate(db, query) -> int:
+    plan = (await db.execute(Explain(query))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def total(db, model, clauses, params, exact_limit: int, retention_months: int = 0) -> Tuple[int, bool]:
+    count = (await db.execute(_bounded_count(model, clauses, exact_limit))).scalar()
+    if count <= exact_limit:
+        return count, False
+
+    rollup_query = _rollup_count(model, params, retention_months)
+    if rollup_query is not None:
+        return int((await db.execute(rollup_query)).scalar()), False
+
+    if db.bind.dialect.name == "postgresql":
+        query = select(literal(1)).select_from(model).where(*clauses)
+        # At least as many rows as the bounded count just saw
+        return max(await _planner_estimate(db, query), count), True
+
+    query = select(func.count()).select_from(model).where(*clauses)
+    return (await db.execute(query)).scalar(), False
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from app import cache
+
+# Benchmarks for the performance work, skipped unless BENCH is set:
+#
+#     BENCH=1 pytest tests/bench -s
+#     BENCH=1 TEST_DATABASE_URL=postgresql://postgres@localhost/datalog_test pytest tests/bench -s
+#
+# They use the fixtures in tests/conftest.py, print what they measure and
+# assert only the property asked for, with a wide margin, so they catch a
+# regression rather than noise. BENCH_ROWS sizes the large-table runs.
+
+
+@pytest.fixture(autouse=True)
+def bench_only():
+    if not os.getenv("BENCH"):
+        pytest.skip("benchmarks run with BENCH=1")
+
+
+# Print a result table past pytest's output capture
+@pytest.fixture
+def report(request, capsys):
+    def report(title: str, lines):
+        with capsys.disabled():
+            print(f"\n{request.node.name}: {title}")
+            for line in lines:
+                print(f"  {line}")
+    return report
+
+
+# Every request goes to the database; nothing is served from the list cache
+@pytest.fixture
+def uncached(client, monkeypatch):
+    monkeypatch.setattr(cache, "backend", cache.MemoryBackend(ttl=0))
+    return client
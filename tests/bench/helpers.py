@@ -0,0 +1,39 @@
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import make_url
+
+from app.models import LarvaeLog
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+# Write `count` larvae rows a second apart straight through a sync engine,
+# 10k to a statement; far faster than going through the API
+def seed_larvae(url: str, count: int):
+    url = make_url(url)
+    url = url.set(drivername="sqlite" if url.get_backend_name() == "sqlite" else "postgresql+psycopg2")
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        for offset in range(0, count, 10_000):
+            conn.execute(insert(LarvaeLog), [
+                dict(id=uuid.uuid4(), timestamp=START + timedelta(seconds=i), username=f"user{i % 7}",
+                     days_of_age=i % 30, larva_weight=5, larva_pct=50, lb_larvae=10, lb_feed=2.5,
+                     lb_water=3.25, screen_refeed=False, row_number=str(i % 40),
+                     notes="checked the trays before feeding", larvae_count=453592,
+                     feed_per_larvae=2.5, water_feed_ratio=1.3, post_feed_condition="ok", version=1)
+                for i in range(offset, min(offset + 10_000, count))
+            ])
+    engine.dispose()
+
+
+# Median wall time of `repeat` calls to fn, in milliseconds
+def median_ms(fn, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return sorted(times)[len(times) // 2]
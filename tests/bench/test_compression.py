@@ -0,0 +1,44 @@
+import time
+
+from app.core.config import settings
+from bench.helpers import seed_larvae
+
+# A 10k-row larvae page in each representation: bytes on the wire, time
+# to serve it (uncached, so rendering and compression are included) and
+# that time plus the transfer at LINK_MBPS, a slow plant Wi-Fi link.
+ROWS = 10_000
+LINK_MBPS = 2
+
+VARIANTS = [
+    ("json", "application/json", "identity"),
+    ("json+gzip", "application/json", "gzip"),
+    ("json+br", "application/json", "br"),
+    ("msgpack", "application/msgpack", "identity"),
+    ("msgpack+br", "application/msgpack", "br"),
+]
+
+
+def test_bytes_on_the_wire(uncached, database_url, report, monkeypatch):
+    client = uncached
+    monkeypatch.setattr(settings, "LIST_MAX_LIMIT", ROWS)
+    seed_larvae(database_url, ROWS)
+
+    sizes, lines = {}, []
+    for name, accept, encoding in VARIANTS:
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            response = client.get(f"/api/logs?limit={ROWS}", headers={"Accept": accept, "Accept-Encoding": encoding})
+            timings.append(time.perf_counter() - started)
+        assert response.status_code == 200
+        assert response.headers.get("content-encoding", "identity") == encoding
+        served = sorted(timings)[1]
+        sizes[name] = response.num_bytes_downloaded
+        over_link = served + sizes[name] * 8 / (LINK_MBPS * 1e6)
+        lines.append(f"{name:<11} {sizes[name]:>9} bytes, served in {served * 1000:6.1f} ms, "
+                     f"{over_link * 1000:7.1f} ms at {LINK_MBPS} Mbit/s")
+    report(f"{ROWS}-row page", lines)
+
+    assert sizes["json+gzip"] < sizes["json"] / 4
+    assert sizes["json+br"] <= sizes["json+gzip"]
+    assert sizes["msgpack"] < sizes["json"]
@@ -0,0 +1,80 @@
+import time
+
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database, metrics
+from bench.helpers import median_ms, seed_larvae
+
+# What the /metrics instrumentation adds per request: MetricsMiddleware
+# around a route that does nothing, and the engine events on a trivial
+# query, each timed with and without. Together they must stay under 5% of
+# an ordinary request (an uncached 100-row list page).
+CALLS = 5000
+
+
+def bare_app():
+    app = FastAPI()
+
+    @app.get("/api/logs/{log_id}")
+    async def get_log(log_id: str):
+        return {"id": log_id}
+    return app
+
+
+async def request_us(app) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/logs/1", "raw_path": b"/api/logs/1",
+             "root_path": "", "scheme": "http", "http_version": "1.1", "query_string": b"",
+             "headers": [], "client": ("127.0.0.1", 1), "server": ("bench", 80)}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) * 1e6 / CALLS
+
+
+async def query_us(url: str, instrument: bool) -> float:
+    engine = create_async_engine(url)
+    if instrument:
+        metrics.instrument_engine(engine)
+    token = metrics.current_queries.set(metrics.QueryStats())
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            started = time.perf_counter()
+            for _ in range(CALLS):
+                await conn.execute(text("SELECT 1"))
+            return (time.perf_counter() - started) * 1e6 / CALLS
+    finally:
+        metrics.current_queries.reset(token)
+        await engine.dispose()
+
+
+def test_instrumentation_overhead(uncached, database_url, report):
+    client = uncached
+    seed_larvae(database_url, 1000)
+    list_us = median_ms(lambda: client.get("/api/logs?limit=100&skip=1")) * 1000
+
+    app = bare_app()
+    plain = min(client.portal.call(request_us, app) for _ in range(3))
+    measured = min(client.portal.call(request_us, metrics.MetricsMiddleware(app)) for _ in range(3))
+    middleware = max(measured - plain, 0)
+
+    url = database.engine.url
+    plain = min(client.portal.call(query_us, url, False) for _ in range(3))
+    measured = min(client.portal.call(query_us, url, True) for _ in range(3))
+    per_query = max(measured - plain, 0)
+
+    report("instrumentation cost", [
+        f"middleware: {middleware:6.1f} us/request",
+        f"engine events: {per_query:6.1f} us/query",
+        f"100-row list request: {list_us:8.1f} us",
+    ])
+    assert middleware + per_query < 0.05 * list_us
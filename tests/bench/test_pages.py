@@ -0,0 +1,37 @@
+import os
+import uuid
+from datetime import timedelta
+
+from app.main import encode_cursor
+from bench.helpers import START, median_ms, seed_larvae
+
+# Latency of a 100-row page at increasing depth in a large table. A cursor
+# page seeks straight to its position on the (timestamp, id) index, so it
+# costs the same anywhere; an offset page reads past every row before it.
+ROWS = int(os.getenv("BENCH_ROWS", "1000000"))
+DEPTHS = [0, ROWS // 10, ROWS // 2, ROWS - 1000]
+
+
+# Cursor for the page starting at the row `depth` rows below the newest.
+# Seeded rows are a second apart, so the row's timestamp is enough when
+# paired with the largest possible id.
+def cursor_at(depth: int) -> str:
+    return encode_cursor(START + timedelta(seconds=ROWS - 1 - depth), uuid.UUID(int=2**128 - 1))
+
+
+def test_cursor_page_latency_is_flat(uncached, database_url, report):
+    client = uncached
+    seed_larvae(database_url, ROWS)
+
+    def page(url):
+        response = client.get(url)
+        assert response.status_code == 200 and response.json(), url
+
+    lines, cursor_ms = [], []
+    for depth in DEPTHS:
+        cursor_ms.append(median_ms(lambda: page(f"/api/logs?limit=100&cursor={cursor_at(depth)}")))
+        offset_ms = median_ms(lambda: page(f"/api/logs?limit=100&skip={depth}"), repeat=3)
+        lines.append(f"row {depth:>9}: cursor {cursor_ms[-1]:7.1f} ms, skip {offset_ms:7.1f} ms")
+    report(f"100-row pages of a {ROWS}-row table", lines)
+
+    assert max(cursor_ms) < 3 * cursor_ms[0] + 5
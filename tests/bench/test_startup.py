@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+# Cold start in a fresh interpreter: importing app.main, running the
+# lifespan startup, then the first /api/health (no database) and the first
+# /api/logs (opens the first connection). Prints the cumulative seconds at
+# each step.
+STARTUP = """
+import time
+started = time.perf_counter()
+import asyncio
+from app.main import app
+imported = time.perf_counter()
+
+async def get(path):
+    sent = []
+    async def receive():
+        return {"type": "http.request", "body": b""}
+    async def send(message):
+        sent.append(message)
+    await app({"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "root_path": "",
+               "scheme": "http", "http_version": "1.1", "query_string": b"", "headers": [],
+               "client": ("127.0.0.1", 1), "server": ("bench", 80)}, receive, send)
+    assert sent[0]["status"] == 200, sent
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        await get("/api/health")
+        health = time.perf_counter()
+        await get("/api/logs")
+        logs = time.perf_counter()
+    print(*(round(t - started, 4) for t in (imported, ready, health, logs)))
+
+asyncio.run(main())
+"""
+
+# Generous: almost all of a cold start is importing the libraries, and the
+# point is to catch database work creeping back into import or startup
+MAX_SECONDS = 3.0
+
+
+def test_import_to_first_response(database_url, tmp_path, report):
+    env = {**os.environ, "DATABASE_URL": database_url, "INGEST_SPILL_DIR": str(tmp_path / "spill")}
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    runs = []
+    for _ in range(3):
+        result = subprocess.run([sys.executable, "-c", STARTUP], env=env, cwd=root,
+                                capture_output=True, text=True, check=True)
+        runs.append([float(t) for t in result.stdout.split()[-4:]])
+    imported, ready, health, logs = min(runs, key=lambda run: run[-1])
+
+    report("seconds from interpreter start (best of 3)", [
+        f"import app.main: {imported:.3f}",
+        f"lifespan startup done: {ready:.3f}",
+        f"first /api/health: {health:.3f}",
+        f"first /api/logs: {logs:.3f}",
+    ])
+    assert logs < MAX_SECONDS
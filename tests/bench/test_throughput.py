@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from sqlalchemy import event
+from sqlalchemy.util import await_only
+
+from app import database
+from app.core.config import settings
+from bench.helpers import seed_larvae
+
+# Requests served per second one at a time and with a pool's worth in
+# flight. SQLite stands in for a remote Postgres: every statement is held
+# up LATENCY seconds in the driver's thread, like a network round trip. A
+# blocking data path would serve the concurrent run no faster than the
+# serial one; the async one overlaps the waits.
+pytestmark = pytest.mark.parametrize("database_url", ["sqlite"], indirect=True)
+
+LATENCY = 0.01
+REQUESTS = 100
+
+
+async def slow_down_queries():
+    @event.listens_for(database.engine.sync_engine, "connect")
+    def add_latency(dbapi_connection, record):
+        await_only(dbapi_connection.driver_connection.set_trace_callback(lambda sql: time.sleep(LATENCY)))
+    await database.engine.dispose()  # reconnect with the latency in place
+
+
+async def throughput(app, concurrency: int, first_page: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+        async def get(i):
+            async with semaphore:
+                # A distinct page each time, so the list cache can't answer
+                response = await http.get(f"/api/logs?skip={first_page + i}&limit=20")
+                assert response.status_code == 200
+        started = time.perf_counter()
+        await asyncio.gather(*(get(i) for i in range(REQUESTS)))
+        return REQUESTS / (time.perf_counter() - started)
+
+
+def test_concurrent_requests_overlap(client, database_url, report):
+    seed_larvae(database_url, 1000)
+    client.portal.call(slow_down_queries)
+
+    serial = client.portal.call(throughput, client.app, 1, 0)
+    concurrent = client.portal.call(throughput, client.app, settings.DB_POOL_SIZE, REQUESTS)
+    report(f"{REQUESTS} list requests, {LATENCY * 1000:.0f} ms per statement", [
+        f"1 at a time: {serial:.0f} req/s",
+        f"{settings.DB_POOL_SIZE} at a time: {concurrent:.0f} req/s ({concurrent / serial:.1f}x)",
+    ])
+    assert concurrent > 2 * serial
@@ -0,0 +1,65 @@
+import os
+
+# Settings are read when the app is imported. The app's own rate limiter is
+# off in tests; tests/test_admission.py builds its own.
+os.environ["RATE_LIMIT_PER_SECOND"] = "0"
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from app import cache, migrate
+from app.core.config import settings
+from app.main import app
+
+# Every test gets a freshly migrated database: a SQLite file, and Postgres
+# as well when TEST_DATABASE_URL points at one. That database is wiped at
+# the start of each test, so don't point it at anything you want to keep.
+#
+#     TEST_DATABASE_URL=postgresql://postgres@localhost/datalog_test pytest
+#
+# Tests that only make sense on one backend parametrize `database_url`
+# themselves, e.g. @pytest.mark.parametrize("database_url", ["postgresql"],
+# indirect=True).
+
+BACKENDS = ["sqlite", "postgresql"]
+
+LARVAE = dict(username="a", days_of_age=3, larva_weight=5, larva_pct=50,
+              lb_larvae=10, lb_feed=2, lb_water=3)
+
+
+def reset_postgres(url: str):
+    engine = create_engine(make_url(url).set(drivername="postgresql+psycopg2"))
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA IF EXISTS archive CASCADE"))
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    engine.dispose()
+
+
+@pytest.fixture(params=BACKENDS)
+def database_url(request, tmp_path, monkeypatch):
+    if request.param == "sqlite":
+        url = f"sqlite+aiosqlite:///{tmp_path / 'test.db'}"
+    else:
+        url = os.getenv("TEST_DATABASE_URL")
+        if not url:
+            pytest.skip("TEST_DATABASE_URL is not set")
+        reset_postgres(url)
+    monkeypatch.setenv("DATABASE_URL", url)
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    command.upgrade(Config(migrate.ALEMBIC_INI), "head")
+    return url
+
+
+# The app, started (lifespan and all) on the test database. Run coroutines
+# on the app's event loop with client.portal.call(...).
+@pytest.fixture
+def client(database_url, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_SPILL_DIR", str(tmp_path / "spill"))
+    monkeypatch.setattr(cache, "backend", cache.MemoryBackend())
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.admission import AdmissionMiddleware
+
+
+async def ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+# Status codes for requests sent as (client address, headers)
+def statuses(app, requests):
+    async def call(client, headers):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/api/logs", "query_string": b"",
+                 "client": (client, 1234), "headers": [(name.encode(), value.encode()) for name, value in headers]}
+        await app(scope, receive, send)
+        return sent[0]["status"]
+
+    async def run():
+        return [await call(client, headers) for client, headers in requests]
+    return asyncio.run(run())
+
+
+def test_rate_limit_keys_on_the_address_not_on_headers():
+    app = AdmissionMiddleware(ok, rate=0.001, burst=2)
+
+    assert statuses(app, [("1.1.1.1", [("x-username", name)]) for name in "abc"]) == [200, 200, 429]
+    assert statuses(app, [("2.2.2.2", [])]) == [200]
+
+
+# As render.yaml runs it: uvicorn takes the client from X-Forwarded-For, but
+# only the hops added by the trusted proxy, so a client can't pick its own
+def test_forwarded_addresses_behind_a_trusted_proxy():
+    proxy_headers = pytest.importorskip("uvicorn.middleware.proxy_headers")
+    app = proxy_headers.ProxyHeadersMiddleware(AdmissionMiddleware(ok, rate=0.001, burst=2), trusted_hosts="10.0.0.0/8")
+
+    spoofed = [("10.0.0.5", [("x-forwarded-for", f"9.9.9.{n}, 203.0.113.7")]) for n in range(3)]
+    assert statuses(app, spoofed) == [200, 200, 429]
+    assert statuses(app, [("10.0.0.5", [("x-forwarded-for", "203.0.113.8")])]) == [200]
@@ -0,0 +1,86 @@
+import pytest
+
+from app import cache, compression
+from app.models import ContainerLogPrepupae, LarvaeLog
+from conftest import LARVAE
+
+
+def page(client, path="/api/logs", **headers):
+    response = client.get(path, headers=headers)
+    assert response.status_code in (200, 304), response.text
+    return response
+
+
+def test_not_modified_until_a_write(client):
+    client.post("/api/logs", json=LARVAE)
+    first = page(client)
+    etag = first.headers["ETag"]
+
+    again = page(client, **{"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["ETag"] == etag and again.content == b""
+    assert page(client, **{"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+    generation = client.portal.call(cache.backend.generation, LarvaeLog.__tablename__)
+    client.post("/api/logs", json=LARVAE)
+    assert client.portal.call(cache.backend.generation, LarvaeLog.__tablename__) == generation + 1
+
+    fresh = page(client, **{"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["ETag"] != etag
+    assert len(fresh.json()) == 2
+
+
+# Each kind of write leaves the next GET of its table fresh
+@pytest.mark.parametrize("write", ["post", "put", "delete", "bulk", "ingest"])
+def test_writes_invalidate_the_list(client, write):
+    created = client.post("/api/logs", json=LARVAE).json()
+    client.post("/api/container-logs/prepupae", json={"username": "s", "temperature": 20})
+    before = {path: page(client, path).json() for path in ("/api/logs", "/api/container-logs/prepupae")}
+
+    if write == "post":
+        client.post("/api/logs", json=LARVAE)
+    elif write == "put":
+        client.put(f"/api/logs/{created['id']}", json={"days_of_age": 9})
+    elif write == "delete":
+        client.delete(f"/api/logs/{created['id']}")
+    elif write == "bulk":
+        client.post("/api/logs/bulk", json=[LARVAE, LARVAE])
+    else:
+        assert client.post("/api/ingest/prepupae", json=[{"username": "s", "temperature": 21}]).status_code == 202
+        client.portal.call(client.app.state.ingest.flush)
+
+    changed = "/api/container-logs/prepupae" if write == "ingest" else "/api/logs"
+    for path, old in before.items():
+        assert (page(client, path).json() != old) == (path == changed), path
+    if write == "put":
+        assert page(client).json()[0]["days_of_age"] == 9
+
+
+# A write to one table leaves the other tables' entries cached
+def test_invalidation_is_per_table(client):
+    def cached_tables():
+        return {key[0] for key in cache.backend.entries}
+
+    page(client)
+    page(client, "/api/container-logs/prepupae")
+    assert cached_tables() == {LarvaeLog.__tablename__, ContainerLogPrepupae.__tablename__}
+
+    client.post("/api/logs", json=LARVAE)
+    assert cached_tables() == {ContainerLogPrepupae.__tablename__}
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+def test_compressed_pages_get_their_own_etags(client):
+    client.post("/api/logs/bulk", json=[{**LARVAE, "days_of_age": i} for i in range(50)])
+    plain = page(client, **{"Accept-Encoding": "identity"})
+    gzip = page(client, **{"Accept-Encoding": "gzip"})
+    br = page(client, **{"Accept-Encoding": "br"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert gzip.headers["Content-Encoding"] == "gzip" and br.headers["Content-Encoding"] == "br"
+    assert plain.headers["ETag"] != gzip.headers["ETag"] == br.headers["ETag"] == "W/" + plain.headers["ETag"]
+    assert "Accept-Encoding" in gzip.headers["Vary"]
+    assert plain.json() == gzip.json() == br.json()
+
+    # The weak tag still revalidates, compressed or not
+    assert page(client, **{"Accept-Encoding": "gzip", "If-None-Match": gzip.headers["ETag"]}).status_code == 304
+    assert page(client, **{"Accept-Encoding": "identity", "If-None-Match": gzip.headers["ETag"]}).status_code == 304
@@ -0,0 +1,136 @@
+import asyncio
+import gzip
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from app import compression, live, serializers
+from app.main import app as datalog
+
+BIG = b"x" * 4096
+SMALL = b"x" * 100
+
+needs_brotli = pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+
+
+async def chunks():
+    for _ in range(3):
+        yield BIG
+
+
+def build_app():
+    routes = [
+        Route("/big", lambda request: Response(BIG, media_type="text/plain", headers={"ETag": '"abc"'})),
+        Route("/small", lambda request: Response(SMALL, media_type="text/plain", headers={"ETag": '"abc"'})),
+        Route("/stream", lambda request: StreamingResponse(chunks(), media_type="text/plain")),
+        Route("/events", lambda request: StreamingResponse(chunks(), media_type="text/event-stream")),
+        Route("/encoded", lambda request: Response(gzip.compress(BIG), headers={"Content-Encoding": "gzip"})),
+    ]
+    return compression.CompressionMiddleware(Starlette(routes=routes), minimum_size=1024)
+
+
+@pytest.fixture
+def client():
+    return TestClient(build_app())
+
+
+def get(client, path, accept_encoding):
+    return client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"), ("gzip", "gzip"), ("br;q=0, gzip", "gzip"), ("gzip;q=0", None),
+    ("identity", None), ("", None), ("GZIP;q=0.5", "gzip"), ("br;q=bad, gzip", "gzip"),
+])
+def test_negotiate(header, expected):
+    if expected == "br" and compression.brotli is None:
+        expected = "gzip"
+    assert compression.negotiate(header) == expected
+
+
+@pytest.mark.skipif(serializers.msgpack is None, reason="msgpack is not installed")
+@pytest.mark.parametrize("accept, expected", [
+    ("application/msgpack, */*", serializers.MSGPACK),
+    ("*/*, application/msgpack", serializers.MSGPACK),
+    ("application/json, application/msgpack", serializers.MSGPACK),
+    ("application/msgpack, application/json", serializers.MSGPACK),
+    ("application/x-msgpack, application/*", serializers.MSGPACK),
+    ("application/json, application/msgpack;q=0.5", "application/json"),
+    ("application/msgpack;q=0.5, */*", "application/json"),
+    ("application/msgpack;q=0", "application/json"),
+    ("*/*", "application/json"), ("application/*", "application/json"), ("", "application/json"),
+])
+def test_negotiate_media_type(accept, expected):
+    request = Request({"type": "http", "headers": [(b"accept", accept.encode())]})
+    assert serializers.negotiate(request) == expected
+
+
+@pytest.mark.parametrize("encoding", ["gzip", pytest.param("br", marks=needs_brotli)])
+def test_round_trip(client, encoding):
+    response = get(client, "/big", encoding)
+    assert response.headers["Content-Encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"] == 'W/"abc"'
+    assert response.content == BIG
+    assert int(response.headers["Content-Length"]) < len(BIG)
+
+
+def test_small_and_unwanted_bodies_go_out_as_they_are(client):
+    for response in (get(client, "/small", "gzip"), get(client, "/big", "identity")):
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["ETag"] == '"abc"'
+    assert get(client, "/small", "gzip").content == SMALL
+
+
+def test_streams_are_compressed_chunk_by_chunk(client):
+    response = get(client, "/stream", "gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert response.content == BIG * 3
+
+
+def test_event_streams_and_encoded_bodies_pass_through(client):
+    events = get(client, "/events", "gzip")
+    assert "Content-Encoding" not in events.headers
+    assert events.content == BIG * 3
+
+    encoded = client.get("/encoded", headers={"Accept-Encoding": "br"})
+    assert encoded.headers["Content-Encoding"] == "gzip"
+    assert encoded.content == BIG
+
+
+# The real /api/live stream through the app's middleware stack: SSE frames
+# arrive uncompressed, one at a time
+def test_live_stream_is_not_compressed(monkeypatch):
+    monkeypatch.setattr(live.hub, "queue_size", 2)
+
+    async def run():
+        messages, started = [], asyncio.Event()
+
+        async def receive():
+            await asyncio.Event().wait()  # the client never disconnects
+
+        async def send(message):
+            messages.append(message)
+            started.set()
+
+        scope = {"type": "http", "method": "GET", "path": "/api/live", "query_string": b"tables=larvae_logs",
+                 "headers": [(b"accept-encoding", b"gzip, br")], "client": ("127.0.0.1", 1)}
+        request = asyncio.create_task(datalog(scope, receive, send))
+        await started.wait()
+        for _ in range(3):  # one past the queue, so the stream ends with resync
+            await live.hub.publish(live.reload_event_for("larvae_logs"))
+        await request
+        return messages
+
+    messages = asyncio.run(run())
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    assert b"content-encoding" not in headers
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    change = b'event: change\ndata: {"table":"larvae_logs","op":"reload"}\n\n'
+    assert body == b"retry: 5000\n\n" + change * 2 + live.RESYNC
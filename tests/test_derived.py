@@ -0,0 +1,19 @@
+import numpy as np
+
+from app import derived
+
+
+def test_larvae_count_is_none_where_it_is_undefined():
+    assert derived.larvae_count(10, 50, 5) == 453592
+    assert derived.larvae_count(10, 50, 0) == 0
+    assert derived.larvae_count(float("nan"), 50, 5) is None
+    assert derived.larvae_count(None, 50, 5) is None
+    assert derived.larvae_count(float("inf"), 50, 5) is None
+
+    counts = derived.larvae_count([10, float("nan"), 1e308, 10], [50, 50, 1e308, 50], [5, 5, 5, 0])
+    assert derived.to_list(counts) == [453592, None, None, 0]
+    assert derived.larvae_count([10, 20], [50, 50], [5, 5]).dtype == np.int64
+
+    metrics = derived.larvae_metrics([10, None], [50, 50], [5, 5], [2, 2], [3, 3])
+    assert derived.to_list(metrics["larvae_count"]) == [453592, None]
+    assert derived.to_list(metrics["feed_per_larvae"]) == [2.0, 0.0]
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import make_url
+
+from app import export
+from app.models import LarvaeLog
+
+ROWS = 100_000
+# Streaming any format grows peak RSS by well under this; fetching the
+# 100k rows in one go grows it by over 100 MiB on its own
+MAX_GROWTH_MIB = 40
+
+# Exports a table through the ASGI app in a fresh interpreter, throwing the
+# body away as it arrives, and prints peak RSS (MiB) before and after plus
+# the bytes sent. A subprocess, because peak RSS only ever goes up: in the
+# test process it would be whatever the seeding peaked at.
+EXPORT = """
+import asyncio, resource, sys
+from app.main import app
+
+def peak():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def export(query):
+    sent = 0
+    requested = False
+    async def receive():
+        nonlocal requested
+        if requested:  # the client never disconnects
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b""}
+    async def send(message):
+        nonlocal sent
+        if message["type"] == "http.response.body":
+            sent += len(message.get("body", b""))
+    await app({"type": "http", "method": "GET", "path": "/api/export/larvae_logs", "headers": [],
+               "query_string": query.encode(), "client": ("127.0.0.1", 1)}, receive, send)
+    return sent
+
+async def main():
+    async with app.router.lifespan_context(app):
+        await export(f"format={sys.argv[1]}&to=2000-01-01T00:00:00Z")  # imports, pool
+        before = peak()
+        sent = await export(f"format={sys.argv[1]}")
+        print(before, peak(), sent)
+
+asyncio.run(main())
+"""
+
+
+def seed(url: str, count: int):
+    url = make_url(url)
+    url = url.set(drivername="sqlite" if url.get_backend_name() == "sqlite" else "postgresql+psycopg2")
+    engine = create_engine(url)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        for offset in range(0, count, 10_000):
+            conn.execute(insert(LarvaeLog), [
+                dict(id=uuid.uuid4(), timestamp=start + timedelta(seconds=i), username=f"user{i % 7}",
+                     days_of_age=i % 30, larva_weight=5, larva_pct=50, lb_larvae=10, lb_feed=2.5,
+                     lb_water=3.25, screen_refeed=False, row_number=str(i % 40),
+                     notes="checked the trays before feeding", larvae_count=453592,
+                     feed_per_larvae=2.5, water_feed_ratio=1.3, post_feed_condition="ok", version=1)
+                for i in range(offset, min(offset + 10_000, count))
+            ])
+    engine.dispose()
+
+
+def test_large_export_streams_in_bounded_memory(database_url, tmp_path):
+    seed(database_url, ROWS)
+    env = {**os.environ, "DATABASE_URL": database_url, "INGEST_SPILL_DIR": str(tmp_path / "spill")}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    for fmt in export.FORMATS:
+        if (fmt == "parquet" and export.pa is None) or (fmt == "msgpack" and export.msgpack is None):
+            continue
+        result = subprocess.run([sys.executable, "-c", EXPORT, fmt], env=env, cwd=root,
+                                capture_output=True, text=True, check=True)
+        before, after, sent = result.stdout.split()[-3:]
+
+        assert int(sent) > 2**20, fmt
+        assert float(after) - float(before) < MAX_GROWTH_MIB, f"{fmt}: {result.stdout}"
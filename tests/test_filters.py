@@ -0,0 +1,63 @@
+import pytest
+from starlette.datastructures import QueryParams
+
+from app import filters
+from app.models import LarvaeLog, MicrowaveLog
+from conftest import LARVAE
+
+
+def sql(model, query: str) -> list:
+    return [str(clause.compile(compile_kwargs={"literal_binds": True}))
+            for clause in filters.parse(model, QueryParams(query))]
+
+
+def test_values_become_typed_predicates():
+    assert sql(LarvaeLog, "username=a&days_of_age_min=3&lb_feed_max=2.5&screen_refeed=true") == [
+        "larvae_logs.days_of_age >= 3", "larvae_logs.lb_feed <= 2.5",
+        "larvae_logs.screen_refeed = true", "larvae_logs.username = 'a'"]
+    assert sql(LarvaeLog, "from=2026-01-01T00:00:00%2B00:00&to=2026-02-01") == [
+        "larvae_logs.timestamp >= '2026-01-01 00:00:00+00:00'", "larvae_logs.timestamp < '2026-02-01 00:00:00'"]
+
+
+def test_repeated_parameters_are_an_in_list_and_commas_are_kept():
+    assert sql(LarvaeLog, "username=a&username=b") == ["larvae_logs.username IN ('a', 'b')"]
+    assert sql(LarvaeLog, "username=smith,j") == ["larvae_logs.username = 'smith,j'"]
+
+
+def test_empty_parameters_are_ignored():
+    assert sql(LarvaeLog, "username=&days_of_age=&from=&lb_feed_min=") == []
+    assert sql(LarvaeLog, "_=123&skip=5&cursor=&include=total") == []
+    assert sql(LarvaeLog, "username=&username=a") == ["larvae_logs.username = 'a'"]
+
+
+# A typo, or a filter for another table, is refused rather than dropped
+@pytest.mark.parametrize("model, query", [(LarvaeLog, "usernme=zzz"), (LarvaeLog, "usernme="),
+                                          (MicrowaveLog, "days_of_age=3"), (LarvaeLog, "notes_min=1"),
+                                          (LarvaeLog, "username_max=a"), (LarvaeLog, "__=1")])
+def test_unknown_parameters_are_refused(model, query):
+    with pytest.raises(ValueError, match=f"Unknown query parameter: {query.split('=')[0]}$"):
+        filters.parse(model, QueryParams(query))
+
+
+@pytest.mark.parametrize("query", ["days_of_age=seven", "screen_refeed=maybe", "from=yesterday",
+                                   "lb_feed_min=x", "&".join(["username=a"] * (filters.MAX_VALUES + 1))])
+def test_bad_values_are_refused(query):
+    with pytest.raises(ValueError):
+        filters.parse(LarvaeLog, QueryParams(query))
+
+
+def test_list_endpoint_filters(client):
+    client.post("/api/logs/bulk", json=[{**LARVAE, "username": name} for name in ("a", "b", "smith,j")])
+
+    def names(query):
+        response = client.get(f"/api/logs?{query}")
+        assert response.status_code == 200, response.text
+        return sorted(log["username"] for log in response.json())
+
+    assert names("username=") == ["a", "b", "smith,j"]
+    assert names("days_of_age=&_=123") == ["a", "b", "smith,j"]
+    assert names("username=smith,j") == ["smith,j"]
+    assert names("username=a&username=b") == ["a", "b"]
+    assert client.get("/api/logs?days_of_age=x").status_code == 400
+    response = client.get("/api/logs?usernme=zzz")
+    assert response.status_code == 400 and "usernme" in response.json()["detail"]
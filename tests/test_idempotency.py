@@ -0,0 +1,91 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, update
+
+from app import database, idempotency
+from app.models import IdempotencyKey, LarvaeLog
+from conftest import LARVAE
+
+BODY = json.dumps(LARVAE).encode()
+HEADERS = {"Content-Type": "application/json"}
+
+
+def post(client, key, body=BODY):
+    return client.post("/api/logs", content=body, headers={**HEADERS, "Idempotency-Key": key})
+
+
+def count(client, model, *where):
+    async def run():
+        async with database.SessionLocal() as db:
+            return (await db.execute(select(func.count()).select_from(model).where(*where))).scalar_one()
+    return client.portal.call(run)
+
+
+# Another worker's claim on `key`, taken `age` seconds ago, that it never finished
+def abandoned_claim(client, key, age=0.0):
+    async def run():
+        async with database.SessionLocal() as db:
+            assert await idempotency.claim(db, key, idempotency.fingerprint("POST", "/api/logs", b"", BODY),
+                                           lease=60) is None
+            await db.execute(update(IdempotencyKey).where(IdempotencyKey.key == key).values(
+                expires_at=datetime.now(timezone.utc) + timedelta(seconds=60 - age)))
+            await db.commit()
+    client.portal.call(run)
+
+
+def test_retry_replays_the_stored_response(client):
+    key = str(uuid.uuid4())
+    first = post(client, key)
+    assert first.status_code == 200 and "idempotent-replayed" not in first.headers
+
+    retry = post(client, key)
+    assert retry.status_code == 200 and retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert count(client, LarvaeLog) == 1
+
+    # Stored for the full TTL once answered, not just the claim's lease
+    expires_at = client.portal.call(lambda: _expires_at(key))
+    assert expires_at - datetime.now(timezone.utc) > timedelta(hours=23)
+
+
+async def _expires_at(key):
+    async with database.SessionLocal() as db:
+        expires_at = (await db.execute(select(IdempotencyKey.expires_at).where(IdempotencyKey.key == key))).scalar_one()
+    return expires_at if expires_at.tzinfo else expires_at.replace(tzinfo=timezone.utc)
+
+
+def test_key_reused_for_a_different_request_is_422(client):
+    key = str(uuid.uuid4())
+    assert post(client, key).status_code == 200
+    other = json.dumps({**LARVAE, "lb_feed": 9}).encode()
+    assert post(client, key, other).status_code == 422
+    assert count(client, LarvaeLog) == 1
+
+
+def test_retry_while_the_original_runs_is_409(client):
+    key = str(uuid.uuid4())
+    abandoned_claim(client, key)
+    assert post(client, key).status_code == 409
+    assert count(client, LarvaeLog) == 0
+
+
+# The worker holding the claim died; once the lease is up a retry runs
+def test_abandoned_claim_is_taken_over_after_its_lease(client):
+    key = str(uuid.uuid4())
+    abandoned_claim(client, key, age=61)
+    response = post(client, key)
+    assert response.status_code == 200 and "idempotent-replayed" not in response.headers
+    assert count(client, LarvaeLog) == 1
+
+
+def test_failed_request_releases_its_key(client):
+    key = str(uuid.uuid4())
+    bad = json.dumps({"username": "a"}).encode()
+    assert post(client, key, bad).status_code == 400
+    assert count(client, IdempotencyKey, IdempotencyKey.key == key) == 0
+
+    # Run again rather than replayed
+    response = post(client, key, bad)
+    assert response.status_code == 400 and "idempotent-replayed" not in response.headers
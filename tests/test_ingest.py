@@ -0,0 +1,64 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from app.ingest import SpillFile, check_values
+from app.models import ContainerLogPrepupae, LarvaeLog
+
+
+def test_ingest_rejects_values_the_columns_cannot_hold(client):
+    readings = [{"username": "s", "temperature": 1000}, {"username": "s", "humidity": "nan"},
+                {"username": "s", "notes": {"a": 1}}, {"username": "x" * 101},
+                {"username": "s", "egg_nests_replaced": 2**31}, {"username": "s", "temperature": "21.5"}]
+    response = client.post("/api/ingest/prepupae", json=readings)
+
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 1
+    assert [error["index"] for error in response.json()["errors"]] == [0, 1, 2, 3, 4]
+    assert "temperature" in response.json()["errors"][0]["detail"]
+
+
+@pytest.mark.parametrize("values", [{"lb_feed": float("nan")}, {"lb_water": "3"}, {"lb_feed": True}])
+def test_float_columns_are_checked(values):
+    with pytest.raises(ValueError):
+        check_values(LarvaeLog, values)
+
+
+# Readings that get past the checks but fail in the database (here, put on
+# the queue directly without a username) go to quarantine, and the rest of
+# their batch is still written
+def test_flush_quarantines_rows_the_database_refuses(client):
+    queue = client.app.state.ingest
+    now = datetime.now(timezone.utc)
+    queue.put(ContainerLogPrepupae, [dict(username="s", temperature=20.0, timestamp=now),
+                                     dict(username=None, temperature=21.0, timestamp=now),
+                                     dict(username="s", temperature=22.0, timestamp=now)])
+    client.portal.call(queue.flush)
+
+    logs = client.get("/api/container-logs/prepupae").json()
+    assert sorted(float(log["temperature"]) for log in logs) == [20.0, 22.0]
+    assert queue.size() == 0 and queue.spill.read() == []
+    with open(queue.spill.quarantine_path) as f:
+        quarantined = [json.loads(line) for line in f]
+    assert [record["values"]["temperature"] for record in quarantined] == [21.0]
+    assert quarantined[0]["table"] == "container_logs_prepupae" and quarantined[0]["error"]
+
+
+def test_spill_slots_are_per_process_and_orphans_are_adopted(tmp_path):
+    record = {"table": "container_logs_prepupae",
+              "values": {"id": "2c5b3a3e-5a6f-4f0e-9d0a-2b7f6f1f0c11", "timestamp": "2026-01-01T00:00:00+00:00"}}
+    first, second = SpillFile(str(tmp_path)), SpillFile(str(tmp_path))
+    assert [os.path.basename(spill.directory) for spill in (first, second)] == ["worker-0", "worker-1"]
+
+    second.append([record])
+    second.close()
+    first.close()
+
+    # One process now, in worker-0; it takes over worker-1's journal
+    restarted = SpillFile(str(tmp_path))
+    assert os.path.basename(restarted.directory) == "worker-0"
+    assert [values["id"].hex for _, values in restarted.read()] == ["2c5b3a3e5a6f4f0e9d0a2b7f6f1f0c11"]
+    assert os.listdir(tmp_path / "worker-1") == ["lock"]
+    restarted.close()
@@ -0,0 +1,84 @@
+import asyncio
+
+import orjson
+
+from app import live
+from conftest import LARVAE
+
+
+def frames(subscription) -> list:
+    out = []
+    while not subscription.queue.empty():
+        out.append(subscription.queue.get_nowait())
+    return out
+
+
+def test_events_fan_out_to_subscribers_of_their_table():
+    hub = live.Hub(queue_size=10)
+    larvae, both = hub.subscribe(["larvae_logs"]), hub.subscribe(["larvae_logs", "microwave_logs"])
+    microwave = hub.subscribe(["microwave_logs"])
+
+    asyncio.run(hub.publish(live.reload_event_for("larvae_logs")))
+    sent = frames(larvae)
+    assert sent == [b'event: change\ndata: {"table":"larvae_logs","op":"reload"}\n\n']
+    assert frames(both)[0] is sent[0]  # encoded once, shared
+    assert frames(microwave) == []
+
+    hub.unsubscribe(larvae)
+    asyncio.run(hub.publish(live.reload_event_for("larvae_logs")))
+    assert frames(larvae) == [] and len(frames(both)) == 1
+
+
+def test_subscribers_are_capped():
+    hub = live.Hub(max_subscribers=1)
+    assert hub.subscribe(["larvae_logs"]) is not None
+    assert hub.subscribe(["larvae_logs"]) is None
+
+
+# A subscriber that falls behind gets what was queued, then "resync", and
+# is dropped; the others keep getting events
+def test_overflow_sends_resync_and_closes():
+    hub = live.Hub(queue_size=2)
+    slow, fast = hub.subscribe(["larvae_logs"]), hub.subscribe(["larvae_logs"])
+
+    async def run():
+        for _ in range(3):
+            await hub.publish(live.reload_event_for("larvae_logs"))
+            frames(fast)
+        return [chunk async for chunk in hub.stream(slow, heartbeat=60)]
+
+    chunks = asyncio.run(run())
+    assert slow.overflowed and not fast.overflowed
+    assert chunks[0] == b"retry: 5000\n\n" and chunks[-1] == live.RESYNC
+    assert len(chunks) == 4
+    assert hub.subscribers == {fast}
+
+
+def test_idle_stream_sends_heartbeats():
+    hub = live.Hub()
+    subscription = hub.subscribe(["larvae_logs"])
+
+    async def run():
+        stream = hub.stream(subscription, heartbeat=0.01)
+        chunks = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return chunks
+
+    assert asyncio.run(run()) == [b"retry: 5000\n\n", live.HEARTBEAT]
+    assert not hub.subscribers
+
+
+def test_writes_are_published(client):
+    subscription = live.hub.subscribe(["larvae_logs"])
+    try:
+        created = client.post("/api/logs", json=LARVAE).json()
+        client.put(f"/api/logs/{created['id']}", json={"days_of_age": 9})
+        client.delete(f"/api/logs/{created['id']}")
+        events = [orjson.loads(frame.split(b"data: ", 1)[1]) for frame in frames(subscription)]
+    finally:
+        live.hub.unsubscribe(subscription)
+
+    assert [event["op"] for event in events] == ["insert", "update", "delete"]
+    assert events[0]["rows"][0]["id"] == created["id"]
+    assert events[1]["rows"][0]["days_of_age"] == 9
+    assert events[2]["ids"] == [created["id"]]
@@ -0,0 +1,69 @@
+from conftest import LARVAE
+
+
+def test_update_converts_payload_values(client):
+    log_id = client.post("/api/logs", json={**LARVAE, "row_number": 4}).json()["id"]
+
+    response = client.put(f"/api/logs/{log_id}",
+                          json={"days_of_age": "7", "row_number": 5, "screen_refeed": "true", "lb_feed": "4"})
+    assert response.status_code == 200, response.text
+    log = response.json()
+    assert (log["days_of_age"], log["row_number"], log["screen_refeed"], log["lb_feed"]) == (7, "5", True, 4.0)
+    assert log["feed_per_larvae"] == round(4 * 453592 / log["larvae_count"], 1)
+
+
+def test_update_rejects_bad_values(client):
+    log_id = client.post("/api/logs", json=LARVAE).json()["id"]
+
+    for payload in [{"days_of_age": "seven"}, {"username": None}, {"notes": {"a": 1}}, {"screen_refeed": "maybe"}]:
+        response = client.put(f"/api/logs/{log_id}", json=payload)
+        assert response.status_code == 422, payload
+        assert next(iter(payload)) in response.json()["detail"]
+    assert client.get(f"/api/logs/{log_id}").json()["days_of_age"] == LARVAE["days_of_age"]
+
+
+def test_microwave_update_converts_payload_values(client):
+    log_id = client.post("/api/microwave-logs", json={"username": "m", "lb_larvae_per_tub": 10}).json()["id"]
+
+    response = client.put(f"/api/microwave-logs/{log_id}",
+                          json={"tubs_live_larvae": "4", "lb_dried_larvae": "10", "notes": 3})
+    assert response.status_code == 200, response.text
+    log = response.json()
+    assert (log["tubs_live_larvae"], log["lb_dried_larvae"], log["notes"]) == (4, 10.0, "3")
+    assert log["yield_percentage"] == 25.0
+
+    assert client.put(f"/api/microwave-logs/{log_id}", json={"tubs_live_larvae": "four"}).status_code == 422
+    assert client.put("/api/microwave-logs/not-a-uuid", json={}).status_code == 400
+
+
+def test_container_and_microwave_creates_convert_payload_values(client):
+    response = client.post("/api/container-logs/prepupae", json={"username": 5, "notes": 12, "temperature": "21.5"})
+    assert response.status_code == 200, response.text
+    log = response.json()
+    assert (log["username"], log["notes"], float(log["temperature"])) == ("5", "12", 21.5)
+
+    response = client.post("/api/microwave-logs", json={"username": 7, "num_ramp_up_tubs": "3"})
+    assert response.status_code == 200, response.text
+    assert (response.json()["username"], response.json()["num_ramp_up_tubs"]) == ("7", 3)
+
+
+def test_container_and_microwave_creates_reject_bad_values(client):
+    for path, payload in [("/api/container-logs/prepupae", {"username": "a", "temperature": 1000}),
+                          ("/api/container-logs/prepupae", {"username": "a", "humidity": "nan"}),
+                          ("/api/container-logs/neonates", {"username": "a", "notes": {"a": 1}}),
+                          ("/api/container-logs/neonates", {"username": "a", "bait_tubs_replaced": 2**31}),
+                          ("/api/microwave-logs", {"username": "x" * 101}),
+                          ("/api/microwave-logs", {"username": None}),
+                          ("/api/microwave-logs", {"username": "a", "belt_speed": True})]:
+        response = client.post(path, json=payload)
+        assert response.status_code == 400, (path, payload)
+    assert client.get("/api/container-logs/prepupae").json() == []
+
+
+def test_bulk_reports_bad_rows_and_writes_the_rest(client):
+    response = client.post("/api/container-logs/prepupae/bulk",
+                           json=[{"username": "a", "temperature": 20}, {"username": "a", "temperature": 1000},
+                                 {"username": 3}])
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 2
+    assert [error["index"] for error in response.json()["errors"]] == [1]
@@ -0,0 +1,74 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import make_url
+
+from app import migrate
+from app.models import LarvaeLog
+from conftest import LARVAE
+
+ROWS = 22
+PAGE = 5
+
+
+def engine_for(url: str):
+    url = make_url(url)
+    return create_engine(url.set(drivername="sqlite" if url.get_backend_name() == "sqlite"
+                                 else "postgresql+psycopg2"))
+
+
+# Follow next_cursor from the newest row to the end
+def all_pages(client) -> list:
+    ids, cursor, pages = [], "", 0
+    while cursor is not None:
+        assert pages <= ROWS, "next_cursor never ran out"
+        response = client.get("/api/logs", params={"cursor": cursor, "limit": PAGE})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        ids += [row["id"] for row in body["items"]]
+        cursor, pages = body["next_cursor"], pages + 1
+    return ids
+
+
+def test_cursor_pages_through_equal_timestamps(client, database_url):
+    engine = engine_for(database_url)
+    timestamp = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(LarvaeLog), [dict(LARVAE, id=uuid.uuid4(), timestamp=timestamp, version=1)
+                                         for _ in range(ROWS)])
+    engine.dispose()
+
+    ids = all_pages(client)
+    assert len(ids) == len(set(ids)) == ROWS
+
+
+def test_cursor_pages_through_rows_created_together(client):
+    assert client.post("/api/logs/bulk", json=[LARVAE] * ROWS).json()["inserted"] == ROWS
+    ids = all_pages(client)
+    assert len(ids) == len(set(ids)) == ROWS
+
+
+# Rows stamped by SQLite's CURRENT_TIMESTAMP default (to the second, no
+# fraction) before migration 0007 page like any others after it
+@pytest.mark.parametrize("database_url", ["sqlite"], indirect=True)
+def test_second_precision_sqlite_timestamps_are_migrated(database_url, client):
+    config = Config(migrate.ALEMBIC_INI)
+    command.downgrade(config, "0006")
+    engine = engine_for(database_url)
+    with engine.begin() as conn:
+        for _ in range(ROWS):
+            conn.execute(text("INSERT INTO larvae_logs (id, username, days_of_age, larva_weight, larva_pct, "
+                              "lb_larvae, lb_feed, lb_water, version) VALUES (:id, 'a', 3, 5, 50, 10, 2, 3, 1)"),
+                         {"id": uuid.uuid4().hex})
+    command.upgrade(config, "head")
+    with engine.connect() as conn:
+        stamps = conn.execute(text('SELECT DISTINCT length("timestamp") FROM larvae_logs')).scalars().all()
+    engine.dispose()
+
+    assert stamps == [len("2026-01-01 00:00:00.000000")]
+    ids = all_pages(client)
+    assert len(ids) == len(set(ids)) == ROWS
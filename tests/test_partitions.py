@@ -0,0 +1,31 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.main import app
+
+
+def upkeep(statement: str) -> bool:
+    return (statement.lstrip().upper().startswith(("CREATE", "ALTER", "DROP"))
+            or "pg_inherits" in statement or "advisory" in statement)
+
+
+# Partitions are the deploy's and the cron job's business (app/migrate.py,
+# python -m app.partitions): starting and stopping a worker runs no DDL and
+# doesn't even look at them
+def test_worker_startup_leaves_partitions_alone(database_url, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_SPILL_DIR", str(tmp_path / "spill"))
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        with TestClient(app):
+            pass
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    assert not [statement for statement in statements if upkeep(statement)]
+
@@ -0,0 +1,51 @@
+import pytest
+
+from app import database, profiling
+from conftest import LARVAE
+
+# Queries per request for the hot endpoints, with enough rows in place that
+# a per-row query (N+1) would blow the budget. A write takes a sync version,
+# writes the row and updates its rollups; sync reads the version counter,
+# each log table and the tombstones.
+ROWS = 30
+
+
+@pytest.fixture
+def seeded(client):
+    response = client.post("/api/logs/bulk", json=[{**LARVAE, "username": f"u{i % 3}"} for i in range(ROWS)])
+    assert response.json()["inserted"] == ROWS
+    return client
+
+
+def test_list_and_get_take_one_query(seeded):
+    client = seeded
+    with profiling.query_budget(database.engine, 1):
+        logs = client.get("/api/logs").json()
+    assert len(logs) == ROWS
+
+    with profiling.query_budget(database.engine, 1):
+        assert len(client.get("/api/logs?username=u1&cursor=").json()["items"]) == ROWS // 3
+    with profiling.query_budget(database.engine, 1):
+        assert client.get(f"/api/logs/{logs[0]['id']}").status_code == 200
+    # A repeat is served from the list cache
+    with profiling.query_budget(database.engine, 0):
+        client.get("/api/logs")
+
+
+def test_writes_stay_within_budget(seeded):
+    client = seeded
+    with profiling.query_budget(database.engine, 3):
+        log_id = client.post("/api/logs", json=LARVAE).json()["id"]
+    with profiling.query_budget(database.engine, 5):  # SQLite reads the old row first
+        assert client.put(f"/api/logs/{log_id}", json={"lb_feed": 3}).status_code == 200
+    with profiling.query_budget(database.engine, 5):
+        assert client.delete(f"/api/logs/{log_id}").status_code == 204
+
+
+def test_sync_takes_a_query_per_source(seeded):
+    client = seeded
+    with profiling.query_budget(database.engine, 6):
+        first = client.get("/api/sync?limit=10").json()
+    assert first["more"]
+    with profiling.query_budget(database.engine, 6):
+        assert len(client.get(f"/api/sync?since={first['token']}").json()["changes"]["larvae_logs"]) == ROWS - 10
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, select, text, update
+from sqlalchemy.engine import make_url
+
+from app import database, derived, rollups
+from app.models import LarvaeLog, LarvaeRollup, MicrowaveRollup
+from conftest import LARVAE
+
+
+def rollup_rows(client):
+    async def load():
+        async with database.SessionLocal() as db:
+            columns = LarvaeRollup.__table__.columns
+            return (await db.execute(select(*columns).order_by(*LarvaeRollup.__table__.primary_key.columns))).all()
+    return client.portal.call(load)
+
+
+# Stale derived values, with rollups that agree with them (as after a
+# change to a formula)
+def make_stale(client):
+    async def corrupt():
+        async with database.SessionLocal() as db:
+            columns = LarvaeLog.__table__.columns
+            old = (await db.execute(select(*columns))).all()
+            await db.execute(update(LarvaeLog).values(larvae_count=1, feed_per_larvae=0))
+            new = (await db.execute(select(*columns))).all()
+            await rollups.apply(db, LarvaeLog, old=[row._mapping for row in old], new=[row._mapping for row in new])
+            await db.commit()
+    client.portal.call(corrupt)
+
+
+def test_recompute_moves_rollups_with_the_rows(client):
+    for name in "abc":
+        client.post("/api/logs", json={**LARVAE, "username": name})
+    logs, fresh = client.get("/api/logs").json(), rollup_rows(client)
+    make_stale(client)
+    assert rollup_rows(client) != fresh
+
+    response = client.post("/api/admin/recompute/larvae_logs")
+    assert response.status_code == 200, response.text
+    assert response.json() == {"table": "larvae_logs", "updated": 3}
+    assert [log["larvae_count"] for log in client.get("/api/logs").json()] == [log["larvae_count"] for log in logs]
+    assert rollup_rows(client) == fresh
+
+    # DECIMAL sums on the microwave side
+    log = client.post("/api/microwave-logs", json={"username": "m", "belt_speed": 4, "lb_larvae_per_tub": 10})
+    client.put(f"/api/microwave-logs/{log.json()['id']}", json={"tubs_live_larvae": 4, "lb_dried_larvae": 10})
+    response = client.post("/api/admin/recompute/microwave_logs")
+    assert response.status_code == 200, response.text
+    assert response.json()["updated"] == 1
+
+
+# Clearing a yield input through PUT clears the yield, as a recompute of
+# the same row does, and the rollups follow
+def test_clearing_an_input_clears_the_yield(client):
+    log_id = client.post("/api/microwave-logs", json={"username": "m", "lb_larvae_per_tub": 10}).json()["id"]
+    filled = client.put(f"/api/microwave-logs/{log_id}", json={"tubs_live_larvae": 4, "lb_dried_larvae": 10})
+    assert filled.json()["yield_percentage"] == 25.0
+
+    response = client.put(f"/api/microwave-logs/{log_id}", json={"lb_dried_larvae": None})
+    assert response.status_code == 200, response.text
+    assert (response.json()["lb_dried_larvae"], response.json()["yield_percentage"]) == (None, None)
+
+    async def yield_rollups():
+        async with database.SessionLocal() as db:
+            return (await db.execute(select(MicrowaveRollup.count_yield_percentage,
+                                            MicrowaveRollup.sum_yield_percentage))).all()
+
+    cleared = client.portal.call(yield_rollups)
+    assert cleared and all(tuple(row) == (0, 0) for row in cleared)
+    assert client.post("/api/admin/recompute/microwave_logs").status_code == 200
+    assert client.get("/api/microwave-logs").json()[0]["yield_percentage"] is None
+    assert client.portal.call(yield_rollups) == cleared
+
+
+def test_recompute_reports_rollup_failures_and_rolls_the_batch_back(client, monkeypatch):
+    client.post("/api/logs", json=LARVAE)
+    make_stale(client)
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("rollups unavailable")
+
+    monkeypatch.setattr(rollups, "apply", fail)
+    response = client.post("/api/admin/recompute/larvae_logs")
+    assert response.status_code == 500
+    assert "rollups" in response.json()["detail"] and "rolled back" in response.json()["detail"]
+    assert client.get("/api/logs").json()[0]["larvae_count"] == 1
+
+
+# A PUT's transaction holds the row while the recompute reaches it. The
+# recompute has to wait and compute from the PUT's inputs, rather than
+# write metrics from the row as it was over the PUT's change.
+@pytest.mark.parametrize("database_url", ["postgresql"], indirect=True)
+def test_recompute_waits_for_a_concurrent_update(client, database_url):
+    log_id = client.post("/api/logs", json=LARVAE).json()["id"]
+    make_stale(client)
+
+    engine = create_engine(make_url(database_url).set(drivername="postgresql+psycopg2"))
+    with engine.connect() as writer:
+        writer.execute(text("UPDATE larvae_logs SET lb_feed = 8 WHERE id = :id"), {"id": log_id})
+        responses = []
+        recompute = threading.Thread(target=lambda: responses.append(
+            client.post("/api/admin/recompute/larvae_logs")))
+        recompute.start()
+        time.sleep(0.5)
+        assert recompute.is_alive()  # blocked on the row
+        writer.commit()
+        recompute.join(10)
+    engine.dispose()
+
+    assert responses[0].status_code == 200, responses[0].text
+    log = client.get(f"/api/logs/{log_id}").json()
+    expected = derived.larvae_metrics(log["lb_larvae"], log["larva_pct"], log["larva_weight"], 8.0, log["lb_water"])
+    assert (log["lb_feed"], log["feed_per_larvae"]) == (8.0, expected["feed_per_larvae"])
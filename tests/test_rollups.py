@@ -0,0 +1,124 @@
+import os
+import subprocess
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, delete, event, insert, select
+from sqlalchemy.engine import make_url
+
+from app import database, rollups
+from app.models import LarvaeLog, LarvaeRollup, MicrowaveRollup
+from conftest import LARVAE
+
+# date_trunc follows the session's TimeZone, so on Postgres run the app's
+# sessions in a zone that's off UTC by a fraction of an hour: any bucket
+# computed in it rather than in UTC starts at :30. SQLite has no session
+# zone; there this checks the strftime path against the Python one.
+@pytest.fixture
+def kolkata(client, database_url):
+    if not database_url.startswith("postgresql"):
+        yield client
+        return
+
+    def set_timezone(dbapi_connection, record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SET TimeZone = 'Asia/Kolkata'")
+        cursor.close()
+
+    event.listen(database.engine.sync_engine, "connect", set_timezone)
+    client.portal.call(database.engine.dispose)  # reconnect with it
+    yield client
+    event.remove(database.engine.sync_engine, "connect", set_timezone)
+
+
+# SQLite hands datetimes back naive; they're UTC
+def utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def rollup_rows():
+    async def load():
+        async with database.SessionLocal() as db:
+            return {rollup.__tablename__: [tuple(row) for row in (await db.execute(
+                select(*rollup.__table__.columns).order_by(*rollup.__table__.primary_key.columns))).all()]
+                for rollup in (LarvaeRollup, MicrowaveRollup)}
+    return load
+
+
+async def rebuild():
+    async with database.SessionLocal() as db:
+        await rollups.rebuild(db)
+        await db.commit()
+
+
+async def clear_rollups():
+    async with database.SessionLocal() as db:
+        await db.execute(delete(LarvaeRollup))
+        await db.commit()
+
+
+def test_incremental_rollups_match_a_full_rebuild(kolkata):
+    client = kolkata
+    ids = [client.post("/api/logs", json={**LARVAE, "username": name}).json()["id"] for name in "abc"]
+    assert client.put(f"/api/logs/{ids[0]}", json={"lb_feed": 7, "username": "b"}).status_code == 200
+    assert client.delete(f"/api/logs/{ids[2]}").status_code == 204
+    microwave = client.post("/api/microwave-logs", json={"username": "m", "belt_speed": 4, "lb_larvae_per_tub": 10})
+    client.put(f"/api/microwave-logs/{microwave.json()['id']}", json={"tubs_live_larvae": 4, "lb_dried_larvae": 10})
+
+    incremental = client.portal.call(rollup_rows())
+    client.portal.call(rebuild)
+    assert client.portal.call(rollup_rows()) == incremental
+
+    buckets = [row[1] for rows in incremental.values() for row in rows]
+    assert buckets and all(utc(bucket).minute == 0 for bucket in buckets)
+    day = [row[1] for row in incremental["larvae_rollups"] if row[0] == "day"][0]
+    assert utc(day).hour == 0
+
+
+# Rows spread over hours and days, written behind the app's back: a rebuild
+# (the endpoint, then python -m app.rollups on emptied rollups) buckets them
+# in SQL exactly as apply() would in Python
+def test_rebuild_buckets_like_apply(client, database_url):
+    start = datetime(2026, 3, 7, 22, 59, 59, 999999, tzinfo=timezone.utc)
+    rows = [dict(LARVAE, id=uuid.uuid4(), timestamp=start + timedelta(minutes=37 * i), username=f"u{i % 2}",
+                 lb_feed=i, larvae_count=i * 10, feed_per_larvae=None if i % 3 else i / 2, version=1)
+            for i in range(200)]
+    url = make_url(database_url)
+    engine = create_engine(url.set(drivername="sqlite" if url.get_backend_name() == "sqlite"
+                                   else "postgresql+psycopg2"))
+    with engine.begin() as conn:
+        conn.execute(insert(LarvaeLog), rows)
+    engine.dispose()
+
+    expected = sorted(
+        (size, bucket, username, *[delta[name] for name in rollups.value_columns(
+            rollups.SPECS[LarvaeLog])])
+        for (size, bucket, username), delta in rollups._deltas(rollups.SPECS[LarvaeLog], [], rows).items())
+
+    def larvae_rollups():
+        return sorted((size, utc(bucket), username, *values)
+                      for size, bucket, username, *values in client.portal.call(rollup_rows())["larvae_rollups"])
+
+    response = client.post("/api/admin/rollups/rebuild")
+    assert response.status_code == 200, response.text
+    assert larvae_rollups() == pytest.approx(expected)
+
+    client.portal.call(clear_rollups)
+    subprocess.run([sys.executable, "-m", "app.rollups"], check=True, capture_output=True,
+                   env={**os.environ, "DATABASE_URL": database_url})
+    assert larvae_rollups() == pytest.approx(expected)
+
+
+# From the rollups (an aligned range) and from the log table (a ragged one)
+def test_analytics_buckets_are_utc(kolkata):
+    client = kolkata
+    client.post("/api/logs", json=LARVAE)
+
+    for query in ["bucket=hour", "bucket=day", "bucket=hour&from=2000-01-01T00:00:01Z",
+                  "bucket=day&from=2000-01-01T00:00:01Z", "bucket=week"]:
+        series = client.get(f"/api/analytics/larvae?{query}").json()["series"]
+        assert len(series) == 1, query
+        bucket = utc(datetime.fromisoformat(series[0]["bucket"]))
+        assert (bucket.minute, bucket.hour if "hour" not in query else 0) == (0, 0), query
@@ -0,0 +1,38 @@
+import uuid
+
+import orjson
+import pytest
+from sqlalchemy import select
+
+from app import database, serializers
+from app.models import LarvaeLog
+from conftest import LARVAE
+
+
+def test_asyncpg_uuids_serialize_as_strings():
+    pgproto = pytest.importorskip("asyncpg.pgproto.pgproto")
+    value = pgproto.UUID(str(uuid.uuid4()))
+
+    assert orjson.loads(orjson.dumps({"id": value}, default=serializers._default)) == {"id": str(value)}
+    row = [value] + [None] * (len(LarvaeLog.__table__.columns) - 1)
+    assert serializers.serialize_row(LarvaeLog, row)["id"] == str(value)
+
+
+# On Postgres the rows come from asyncpg, with its own UUID type
+def test_rows_serialize_through_every_read_path(client):
+    created = client.post("/api/logs", json=LARVAE)
+    assert created.status_code == 200
+    log_id = created.json()["id"]
+
+    async def fetch():
+        async with database.SessionLocal() as db:
+            return (await db.execute(select(*LarvaeLog.__table__.columns))).one()
+
+    row = client.portal.call(fetch)
+    assert serializers.serialize_row(LarvaeLog, row)["id"] == log_id
+
+    assert client.get(f"/api/logs/{log_id}").json()["id"] == log_id
+    assert [log["id"] for log in client.get("/api/logs").json()] == [log_id]
+    assert client.get("/api/sync").json()["changes"]["larvae_logs"][0]["id"] == log_id
+    assert client.delete(f"/api/logs/{log_id}").status_code == 204
+    assert client.get("/api/sync").json()["deleted"] == {"larvae_logs": [log_id]}
@@ -0,0 +1,128 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import make_url
+
+from app import series
+from app.admission import AdmissionMiddleware
+from app.core.config import settings
+from app.models import ContainerLogPrepupae
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+ROWS = 1000
+POINTS = 50
+
+
+# ROWS readings a minute apart; temperature peaks mid-range and the first
+# and last readings are the lowest and highest humidity
+def seed(url: str):
+    url = make_url(url)
+    engine = create_engine(url.set(drivername="sqlite" if url.get_backend_name() == "sqlite"
+                                   else "postgresql+psycopg2"))
+    with engine.begin() as conn:
+        conn.execute(insert(ContainerLogPrepupae), [
+            dict(id=uuid.uuid4(), timestamp=START + timedelta(minutes=i), username="s",
+                 temperature=20 + (5 if i == ROWS // 2 else i % 3), humidity=40 + i * 0.05, version=1)
+            for i in range(ROWS)
+        ])
+    engine.dispose()
+
+
+def get_series(client, query):
+    response = client.get(f"/api/container-logs/prepupae/series?{query}")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def at(minutes: int) -> str:
+    return (START + timedelta(minutes=minutes)).isoformat(timespec="milliseconds")
+
+
+def test_lttb_keeps_the_point_budget_and_the_ends():
+    x = np.arange(ROWS, dtype=float)
+    y = np.sin(x / 10)
+    kept = series.lttb(x, y, POINTS)
+    assert len(kept) == POINTS
+    assert kept[0] == 0 and kept[-1] == ROWS - 1
+    assert np.all(np.diff(kept) > 0)
+    assert len(series.lttb(x[:10], y[:10], POINTS)) == 10
+
+
+def test_lttb_series(client, database_url):
+    seed(database_url)
+    body = get_series(client, f"method=lttb&points={POINTS}")
+
+    assert body["raw_points"] == ROWS
+    for name in series.COLUMNS:
+        points = body["series"][name]
+        assert len(points["t"]) == len(points["value"]) == POINTS
+        assert points["t"][0] == at(0) and points["t"][-1] == at(ROWS - 1)
+    assert 25 in body["series"]["temperature"]["value"]  # the peak survives
+    humidity = body["series"]["humidity"]["value"]
+    assert humidity[0] == 40 and humidity[-1] == round(40 + (ROWS - 1) * 0.05, 2)
+
+
+def test_minmax_series(client, database_url):
+    seed(database_url)
+    body = get_series(client, f"method=minmax&points={POINTS}")
+
+    assert body["raw_points"] == ROWS
+    for name in series.COLUMNS:
+        buckets = body["series"][name]
+        assert len(buckets["t"]) == len(buckets["min"]) == len(buckets["max"]) == len(buckets["avg"]) == POINTS
+        assert buckets["t"][0] == at(0)
+    temperature = body["series"]["temperature"]
+    assert max(temperature["max"]) == 25 and min(temperature["min"]) == 20
+    humidity = body["series"]["humidity"]
+    assert humidity["min"][0] == 40 and humidity["max"][-1] == round(40 + (ROWS - 1) * 0.05, 2)
+    assert all(low <= avg <= high for low, avg, high in zip(humidity["min"], humidity["avg"], humidity["max"]))
+
+    empty = get_series(client, "method=minmax&username=nobody")
+    assert empty["raw_points"] == 0 and empty["series"]["humidity"]["t"] == []
+
+
+def test_lttb_refuses_too_many_rows(client, database_url, monkeypatch):
+    seed(database_url)
+    monkeypatch.setattr(settings, "SERIES_MAX_ROWS", ROWS - 1)
+
+    response = client.get("/api/container-logs/prepupae/series?method=lttb")
+    assert response.status_code == 413
+    assert "minmax" in response.json()["detail"]
+    assert get_series(client, "method=minmax")["raw_points"] == ROWS
+    assert get_series(client, f"method=lttb&to={quote(at(ROWS // 2))}")["raw_points"] == ROWS // 2
+
+
+def test_series_count_as_expensive():
+    release = asyncio.Event()
+
+    async def slow(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def call(app, path):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        await app({"type": "http", "method": "GET", "path": path, "query_string": b"",
+                   "client": ("1.1.1.1", 1234), "headers": []}, receive, send)
+        return sent[0]["status"]
+
+    async def run():
+        app = AdmissionMiddleware(slow, rate=0, expensive_limit=1)
+        running = asyncio.create_task(call(app, "/api/container-logs/neonates/series"))
+        await asyncio.sleep(0)
+        rejected = await call(app, "/api/container-logs/prepupae/series")
+        release.set()
+        return await running, rejected, await call(app, "/api/container-logs/prepupae")
+
+    assert asyncio.run(run()) == (200, 503, 200)
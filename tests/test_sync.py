@@ -0,0 +1,71 @@
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+
+from app import database
+from conftest import LARVAE
+
+pytestmark = pytest.mark.parametrize("database_url", ["postgresql"], indirect=True)
+
+BUMP = "UPDATE sync_state SET version = version + 1 WHERE id = 1 RETURNING version"
+TOMBSTONE = "INSERT INTO sync_tombstones (table_name, row_id, version) VALUES ('microwave_logs', :id, :version)"
+
+
+# A second connection to the test database, for writes that land while the
+# app is in the middle of a sync read
+@pytest.fixture
+def writer(database_url):
+    engine = create_engine(make_url(database_url).set(drivername="postgresql+psycopg2"))
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+def sync(client, since):
+    response = client.get(f"/api/sync?since={since}")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_sync_skips_no_version_committed_mid_read(client, writer):
+    log_id = client.post("/api/logs", json=LARVAE).json()["id"]
+    token = sync(client, 0)["token"]
+    row_id = uuid.uuid4()
+    written = []
+
+    # Once the larvae_logs query has run, commit an update to that table and
+    # then a tombstone, which the tombstone query (run last) can see
+    def write(conn, cursor, statement, parameters, context, executemany):
+        if "FROM larvae_logs" in statement and not written:
+            written.append(True)
+            with writer.begin():
+                version = writer.execute(text(BUMP)).scalar_one()
+                writer.execute(text("UPDATE larvae_logs SET notes = 'late', version = :version"), {"version": version})
+            with writer.begin():
+                writer.execute(text(TOMBSTONE), {"id": row_id, "version": writer.execute(text(BUMP)).scalar_one()})
+
+    event.listen(database.engine.sync_engine, "after_cursor_execute", write)
+    try:
+        first = sync(client, token)
+    finally:
+        event.remove(database.engine.sync_engine, "after_cursor_execute", write)
+    assert first["changes"] == {} and first["deleted"] == {} and first["token"] == token
+
+    second = sync(client, first["token"])
+    assert [log["notes"] for log in second["changes"]["larvae_logs"]] == ["late"]
+    assert second["changes"]["larvae_logs"][0]["id"] == log_id
+    assert second["deleted"] == {"microwave_logs": [str(row_id)]}
+
+
+def test_sync_waits_for_versions_still_in_flight(client, writer):
+    token = sync(client, 0)["token"]
+    row_id = uuid.uuid4()
+
+    transaction = writer.begin()
+    writer.execute(text(TOMBSTONE), {"id": row_id, "version": writer.execute(text(BUMP)).scalar_one()})
+    assert sync(client, token) == {"token": token, "more": False, "changes": {}, "deleted": {}}
+    transaction.commit()
+
+    assert sync(client, token)["deleted"] == {"microwave_logs": [str(row_id)]}
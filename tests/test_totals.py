@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from conftest import LARVAE
+
+# include=total in each of its modes: a bounded exact count, the hourly
+# rollups, and (on Postgres) the planner's estimate. EXACT_LIMIT is small so
+# a few rows are enough to get past the bounded count.
+EXACT_LIMIT = 5
+ROWS = 20
+
+
+@pytest.fixture
+def seeded(client, monkeypatch):
+    monkeypatch.setattr(settings, "LIST_TOTAL_EXACT_LIMIT", EXACT_LIMIT)
+    rows = [{**LARVAE, "username": f"u{i % 2}", "days_of_age": i} for i in range(ROWS)]
+    assert client.post("/api/logs/bulk", json=rows).json()["inserted"] == ROWS
+    return client
+
+
+# Run SQL on the test database behind the app's back (rollups untouched)
+def execute(database_url, sql):
+    url = make_url(database_url)
+    engine = create_engine(url.set(drivername="sqlite" if url.get_backend_name() == "sqlite"
+                                   else "postgresql+psycopg2"))
+    with engine.begin() as conn:
+        conn.execute(text(sql))
+    engine.dispose()
+
+
+def total(client, query):
+    response = client.get(f"/api/logs?limit=1&include=total{query}")
+    assert response.status_code == 200, response.text
+    return int(response.headers["X-Total-Count"]), response.headers["X-Total-Approximate"]
+
+
+def test_small_totals_are_counted(client):
+    client.post("/api/logs/bulk", json=[LARVAE] * 3)
+    assert total(client, "") == (3, "false")
+    assert total(client, "&username=nobody") == (0, "false")
+
+
+# Rows deleted without touching the rollups show which path answered
+def test_username_totals_come_from_the_rollups(seeded, database_url):
+    execute(database_url, "DELETE FROM larvae_logs WHERE days_of_age < 4")
+    assert total(seeded, "") == (ROWS, "false")
+    assert total(seeded, "&username=u1") == (ROWS // 2, "false")
+
+
+# Retention drops old rows and keeps their rollups, so a range reaching
+# past its cutoff is counted from the table instead
+def test_rollups_are_skipped_past_the_retention_cutoff(seeded, database_url, monkeypatch):
+    monkeypatch.setattr(settings, "PARTITION_RETENTION_MONTHS", 1)
+    execute(database_url, "DELETE FROM larvae_logs WHERE days_of_age < 4")
+    counted, approximate = total(seeded, "")
+    if approximate == "false":
+        assert counted == ROWS - 4
+    else:  # Postgres: the planner's estimate
+        assert counted > EXACT_LIMIT
+
+
+@pytest.mark.parametrize("database_url", ["postgresql"], indirect=True)
+def test_other_filters_get_the_planner_estimate(seeded, database_url):
+    execute(database_url, "ANALYZE larvae_logs")
+    counted, approximate = total(seeded, "&days_of_age_min=0")
+    assert approximate == "true"
+    assert counted > EXACT_LIMIT